@@ -2,6 +2,10 @@ from flask import Flask
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from .extensions import db
+from .conexoes import opcoes_engine, instalar_telemetria
+from .replica import instalar_roteamento_replica
+from .versao_dados import instalar_versao_dados
+from .cache_respostas import instalar_cache_respostas
 import os
 
 jwt = JWTManager()
@@ -12,8 +16,22 @@ def create_app(test_config=None):
     # 🔹 Config padrão
     app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL")
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["DATABASE_REPLICA_URL"] = os.getenv("DATABASE_REPLICA_URL")  # opcional
+    app.config["DATABASE_REPLICA_JANELA"] = int(os.getenv("DATABASE_REPLICA_JANELA", 5))  # segundos
     app.config["JWT_SECRET_KEY"] = os.getenv("SECRET_KEY")
     app.config["JWT_ACCESS_TOKEN_EXPIRES"] = 60 * 60 * 24 * 30  # 30 dias
+    app.config["REGISTRO_PAGINA_PADRAO"] = int(os.getenv("REGISTRO_PAGINA_PADRAO", 50))
+    app.config["USUARIO_CACHE_TTL"] = int(os.getenv("USUARIO_CACHE_TTL", 60))  # segundos
+    app.config["USUARIO_CACHE_MAXIMO"] = int(os.getenv("USUARIO_CACHE_MAXIMO", 10000))
+    # Cache de agregados: memoria (por processo), redis (REDIS_URL, vários workers) ou desligado
+    app.config["RESPOSTAS_CACHE"] = os.getenv("RESPOSTAS_CACHE", "memoria")
+    app.config["RESPOSTAS_CACHE_TTL"] = int(os.getenv("RESPOSTAS_CACHE_TTL", 300))  # segundos
+    app.config["RESPOSTAS_CACHE_MAXIMO"] = int(os.getenv("RESPOSTAS_CACHE_MAXIMO", 5000))
+    # Redis (opcional): janela de escritas da réplica e cache de respostas entre workers
+    app.config["REDIS_URL"] = os.getenv("REDIS_URL")
+    # Voo único: requisições idênticas simultâneas esperam um só cálculo (até N segundos)
+    app.config["RESPOSTAS_VOO_UNICO"] = os.getenv("RESPOSTAS_VOO_UNICO", "1").strip().lower() in ("1", "true", "sim", "yes", "on")
+    app.config["RESPOSTAS_VOO_ESPERA"] = float(os.getenv("RESPOSTAS_VOO_ESPERA", 10))
 
     if test_config:
         app.config.update(test_config)
@@ -22,8 +40,32 @@ def create_app(test_config=None):
     if not app.config.get("SQLALCHEMY_DATABASE_URI"):
         raise RuntimeError("SQLALCHEMY_DATABASE_URI não foi configurado.")
 
+    # 🔹 Pool de conexões (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    # DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS, DB_MAX_CONEXOES / WEB_CONCURRENCY)
+    app.config.setdefault(
+        "SQLALCHEMY_ENGINE_OPTIONS",
+        opcoes_engine(app.config["SQLALCHEMY_DATABASE_URI"])
+    )
+
     db.init_app(app)
+    with app.app_context():
+        instalar_telemetria(app, db.engine)
+
+    # 🔹 Réplica de leitura (opcional): GETs dos blueprints de dados vão para ela
+    instalar_roteamento_replica(app)
+    # 🔹 Versão dos dados por usuário: ETag nos GETs e 304 antes de qualquer agregado
+    instalar_versao_dados(app)
+    # 🔹 Cache de respostas dos agregados (chaveado pela versão dos dados, invalidado nas
+    # escritas) e voo único para cálculos idênticos simultâneos
+    instalar_cache_respostas(app)
     jwt.init_app(app)
+
+    # 🔹 Cache de ids de usuários válidos (current_user sem SELECT a cada requisição)
+    from app.usuario_atual import CacheUsuariosValidos
+    app.extensions["cache_usuarios"] = CacheUsuariosValidos(
+        ttl=app.config["USUARIO_CACHE_TTL"],
+        tamanho_maximo=app.config["USUARIO_CACHE_MAXIMO"]
+    )
     CORS(app)
 
     # 🔹 Blueprints
@@ -42,9 +84,17 @@ def create_app(test_config=None):
     from app.routes import parcelas_bp
     app.register_blueprint(parcelas_bp)
 
-    if not app.config.get("TESTING"):
-        with app.app_context():
-            from . import models
-            db.create_all()
+    # 🔹 Comandos de CLI
+    from app.fechamento import fechar_meses_command
+    app.cli.add_command(fechar_meses_command)
+    from app.contadores import contadores_categoria_command
+    app.cli.add_command(contadores_categoria_command)
+    from app.particionamento import particoes_registro_command
+    app.cli.add_command(particoes_registro_command)
+    from app.cronograma import parcelas_cronograma_command
+    app.cli.add_command(parcelas_cronograma_command)
+    # Esquema versionado: `flask migrar` roda uma vez por deploy; o boot não toca no esquema
+    from app.migracoes import migrar_command
+    app.cli.add_command(migrar_command)
 
     return app
\ No newline at end of file
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+from flask import current_app, g, request
+from flask_jwt_extended import get_jwt_identity
+from app.extensions import cliente_redis
+from app.voo_unico import TelemetriaRespostas, VooUnico
+
+METODOS_ESCRITA = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+######################################## BACKENDS ########################################
+# Chave = (usuário, endpoint, parâmetros) + versão dos dados e data (ver chave_resposta).
+# Os dois backends guardam o corpo JSON já serializado e mantêm um índice das
+# chaves de cada usuário, para a invalidação apagar só as dele.
+class CacheRespostasLRU:
+    # Por processo, com TTL e limite LRU (como o cache de usuários válidos)
+    def __init__(self, ttl=300, tamanho_maximo=5000):
+        self.ttl = ttl
+        self.tamanho_maximo = tamanho_maximo
+        self._itens = OrderedDict()  # chave -> (usuario_id, expira_em, corpo)
+        self._por_usuario = {}
+        self._lock = threading.Lock()
+
+    def obter(self, usuario_id, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            if item[1] < time.monotonic():
+                self._remover(chave)
+                return None
+            self._itens.move_to_end(chave)
+            return item[2]
+
+    def guardar(self, usuario_id, chave, corpo):
+        with self._lock:
+            self._itens[chave] = (usuario_id, time.monotonic() + self.ttl, corpo)
+            self._itens.move_to_end(chave)
+            self._por_usuario.setdefault(usuario_id, set()).add(chave)
+            while len(self._itens) > self.tamanho_maximo:
+                self._remover(next(iter(self._itens)))
+
+    def invalidar_usuario(self, usuario_id):
+        with self._lock:
+            for chave in self._por_usuario.pop(usuario_id, ()):
+                self._itens.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._por_usuario.clear()
+
+    def __len__(self):
+        return len(self._itens)
+
+    def _remover(self, chave):
+        usuario_id = self._itens.pop(chave)[0]
+        chaves = self._por_usuario.get(usuario_id)
+        if chaves is not None:
+            chaves.discard(chave)
+            if not chaves:
+                del self._por_usuario[usuario_id]
+
+
+class CacheRespostasRedis:
+    # Compartilhado entre workers. Usa só get/set(ex=)/sadd/smembers/expire/delete:
+    # serve o cliente do redis-py ou qualquer servidor compatível (Valkey, KeyDB...)
+    def __init__(self, cliente, ttl=300, prefixo="finango:respostas"):
+        self.cliente = cliente
+        self.ttl = ttl
+        self.prefixo = prefixo
+
+    def _indice(self, usuario_id):
+        return f"{self.prefixo}:{usuario_id}:chaves"
+
+    def _chave(self, usuario_id, chave):
+        return f"{self.prefixo}:{usuario_id}:{chave}"
+
+    def _reserva(self, usuario_id, chave):
+        return f"{self.prefixo}:{usuario_id}:{chave}:calculando"
+
+    def obter(self, usuario_id, chave):
+        return self.cliente.get(self._chave(usuario_id, chave))
+
+    def guardar(self, usuario_id, chave, corpo):
+        completa = self._chave(usuario_id, chave)
+        self.cliente.set(completa, corpo, ex=self.ttl)
+        # O índice vive um TTL além da última chave guardada
+        self.cliente.sadd(self._indice(usuario_id), completa)
+        self.cliente.expire(self._indice(usuario_id), self.ttl)
+
+    def invalidar_usuario(self, usuario_id):
+        indice = self._indice(usuario_id)
+        chaves = list(self.cliente.smembers(indice))
+        self.cliente.delete(indice, *chaves)
+
+    # Voo único entre processos: quem consegue a reserva (SET NX) calcula, os
+    # demais workers aguardam o resultado aparecer no cache
+    def reservar_calculo(self, usuario_id, chave, segundos):
+        milissegundos = max(int(segundos * 1000), 1)
+        return bool(self.cliente.set(self._reserva(usuario_id, chave), b"1", nx=True, px=milissegundos))
+
+    def calculo_em_andamento(self, usuario_id, chave):
+        return self.cliente.get(self._reserva(usuario_id, chave)) is not None
+
+    def liberar_calculo(self, usuario_id, chave):
+        self.cliente.delete(self._reserva(usuario_id, chave))
+
+
+def criar_cache_respostas(app):
+    config = app.config
+    backend = config["RESPOSTAS_CACHE"]
+    ttl = config["RESPOSTAS_CACHE_TTL"]
+    if backend == "memoria":
+        return CacheRespostasLRU(ttl=ttl, tamanho_maximo=config["RESPOSTAS_CACHE_MAXIMO"])
+    if backend == "redis":
+        if not config.get("REDIS_URL"):
+            raise RuntimeError("RESPOSTAS_CACHE=redis exige REDIS_URL.")
+        return CacheRespostasRedis(cliente_redis(app), ttl=ttl)
+    if backend == "desligado":
+        return None
+    raise RuntimeError(f"RESPOSTAS_CACHE inválido: {backend!r} (use memoria, redis ou desligado).")
+######################################## BACKENDS ########################################
+
+
+######################################## CACHE DE AGREGADOS ########################################
+def cache_respostas():
+    return current_app.extensions.get("cache_respostas")
+
+
+def telemetria_respostas():
+    return current_app.extensions["telemetria_respostas"]
+
+
+def chave_resposta(usuario_id, versao, hoje=None):
+    # A versão dos dados (lida antes da rota) entra na chave: um resultado calculado
+    # antes de uma escrita concorrente nunca é servido depois dela, mesmo que seja
+    # guardado após a invalidação. A data cobre "mês atual" e cronogramas automáticos.
+    hoje = hoje or date.today()
+    parametros = sorted(request.args.items(multi=True)) + sorted((request.view_args or {}).items())
+    bruta = json.dumps([usuario_id, versao, hoje.isoformat(), request.endpoint, parametros], default=str)
+    return hashlib.sha256(bruta.encode()).hexdigest()[:32]
+
+
+def _resposta_json(corpo, status=200, mimetype="application/json"):
+    return current_app.response_class(corpo, status=status, mimetype=mimetype)
+
+
+def _calcular(view, args, kwargs, cache, voo_unico, usuario_id, chave):
+    # (corpo, status, mimetype): só bytes são repassados às requisições coalescidas
+    reservado = False
+    if voo_unico is not None and hasattr(cache, "reservar_calculo"):
+        reservado = cache.reservar_calculo(usuario_id, chave, voo_unico.espera)
+        if not reservado:
+            corpo = voo_unico.aguardar_outro_processo(
+                lambda: cache.obter(usuario_id, chave),
+                lambda: cache.calculo_em_andamento(usuario_id, chave),
+            )
+            if corpo is not None:
+                return corpo, 200, "application/json"
+
+    try:
+        resposta = current_app.make_response(view(*args, **kwargs))
+        telemetria_respostas().registrar("calculos")
+        if resposta.status_code == 200 and cache is not None:
+            cache.guardar(usuario_id, chave, resposta.get_data())
+        return resposta.get_data(), resposta.status_code, resposta.mimetype
+    finally:
+        if reservado:
+            cache.liberar_calculo(usuario_id, chave)
+
+
+def resposta_em_cache(view):
+    # Usar abaixo de @jwt_required(): só respostas 200 são guardadas; requisições
+    # idênticas simultâneas compartilham um único cálculo (voo único)
+    @wraps(view)
+    def envolver(*args, **kwargs):
+        cache = cache_respostas()
+        voo_unico = current_app.extensions.get("voo_unico")
+        versao = g.get("versao_dados")
+        if versao is None or (cache is None and voo_unico is None):
+            return view(*args, **kwargs)
+
+        usuario_id = int(get_jwt_identity())
+        chave = chave_resposta(usuario_id, versao)
+        if cache is not None:
+            corpo = cache.obter(usuario_id, chave)
+            if corpo is not None:
+                telemetria_respostas().registrar("hits")
+                return _resposta_json(corpo)
+
+        def calcular():
+            return _calcular(view, args, kwargs, cache, voo_unico, usuario_id, chave)
+
+        if voo_unico is None:
+            return _resposta_json(*calcular())
+        return _resposta_json(*voo_unico.executar(chave, calcular))
+    return envolver
+
+
+def instalar_cache_respostas(app):
+    telemetria = app.extensions["telemetria_respostas"] = TelemetriaRespostas()
+    if app.config["RESPOSTAS_VOO_UNICO"]:
+        app.extensions["voo_unico"] = VooUnico(espera=app.config["RESPOSTAS_VOO_ESPERA"], telemetria=telemetria)
+
+    cache = criar_cache_respostas(app)
+    if cache is None:
+        return
+    app.extensions["cache_respostas"] = cache
+
+    @app.after_request
+    def invalidar_apos_escrita(response):
+        # Escrita bem-sucedida (contas, gastos, parcelas, perfil, importação):
+        # apaga só as chaves do usuário que escreveu
+        if request.method in METODOS_ESCRITA and response.status_code < 400:
+            try:
+                usuario_id = get_jwt_identity()
+            except RuntimeError:
+                usuario_id = None
+            if usuario_id is not None:
+                cache_respostas().invalidar_usuario(int(usuario_id))
+        return response
+######################################## CACHE DE AGREGADOS ########################################
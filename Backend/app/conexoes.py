@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+def _env_int(nome, padrao, env):
+    valor = env.get(nome)
+    return int(valor) if valor not in (None, "") else padrao
+
+
+def _env_bool(nome, padrao, env):
+    valor = env.get(nome)
+    if valor in (None, ""):
+        return padrao
+    return valor.strip().lower() in ("1", "true", "sim", "yes", "on")
+
+
+######################################## OPÇÕES DO ENGINE ########################################
+# SQLALCHEMY_ENGINE_OPTIONS a partir do ambiente. Com DB_MAX_CONEXOES (orçamento
+# total de conexões do Postgres) o pool é dividido entre os WEB_CONCURRENCY workers
+# e o overflow padrão vai a zero, para que a soma dos workers nunca passe do limite.
+def opcoes_engine(uri, env=None):
+    env = os.environ if env is None else env
+    if not uri or uri.startswith("sqlite"):
+        # SQLite usa pool próprio (StaticPool/SingletonThreadPool)
+        return {}
+
+    workers = max(1, _env_int("WEB_CONCURRENCY", 1, env))
+    orcamento = _env_int("DB_MAX_CONEXOES", None, env)
+
+    if orcamento is not None:
+        pool_size = _env_int("DB_POOL_SIZE", max(1, orcamento // workers), env)
+        max_overflow = _env_int("DB_MAX_OVERFLOW", 0, env)
+    else:
+        pool_size = _env_int("DB_POOL_SIZE", 5, env)
+        max_overflow = _env_int("DB_MAX_OVERFLOW", 10, env)
+
+    opcoes = {
+        "poolclass": PoolMonitorado,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 30, env),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800, env),
+        # Descarta conexões mortas (ex.: restart do Postgres) antes de entregá-las
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True, env),
+    }
+
+    statement_timeout = _env_int("DB_STATEMENT_TIMEOUT_MS", 0, env)
+    if statement_timeout > 0 and uri.startswith("postgres"):
+        opcoes["connect_args"] = {"options": f"-c statement_timeout={statement_timeout}"}
+
+    return opcoes
+######################################## OPÇÕES DO ENGINE ########################################
+
+
+######################################## TELEMETRIA DO POOL ########################################
+class TelemetriaPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.conexoes_abertas = 0
+        self.invalidacoes = 0
+        self.timeouts = 0
+        self.esperas = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+
+    def registrar(self, campo):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def registrar_espera(self, segundos):
+        with self._lock:
+            self.esperas += 1
+            self.espera_total += segundos
+            self.espera_max = max(self.espera_max, segundos)
+
+    def resumo(self, pool):
+        with self._lock:
+            dados = {
+                "pool": type(pool).__name__,
+                "em_uso": self.checkouts - self.checkins,
+                "checkouts": self.checkouts,
+                "conexoes_abertas": self.conexoes_abertas,
+                "invalidacoes": self.invalidacoes,
+                "timeouts": self.timeouts,
+                "espera_ms": {
+                    "total": round(self.espera_total * 1000, 2),
+                    "max": round(self.espera_max * 1000, 2),
+                    "media": round(self.espera_total * 1000 / self.esperas, 2) if self.esperas else 0.0,
+                },
+            }
+
+        if isinstance(pool, QueuePool):
+            dados.update({
+                "tamanho": pool.size(),
+                "ociosas": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "max_overflow": pool._max_overflow,
+            })
+        return dados
+
+
+class PoolMonitorado(QueuePool):
+    # QueuePool que mede quanto cada checkout esperou (fila cheia, pre-ping,
+    # abertura de conexão) e conta os timeouts de pool_timeout.
+    telemetria = None
+
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            if self.telemetria is not None:
+                self.telemetria.registrar("timeouts")
+            raise
+        finally:
+            if self.telemetria is not None:
+                self.telemetria.registrar_espera(time.perf_counter() - inicio)
+
+    def recreate(self):
+        # engine.dispose() recria o pool: a telemetria acompanha
+        novo = super().recreate()
+        novo.telemetria = self.telemetria
+        return novo
+
+
+def instalar_telemetria(app, engine):
+    telemetria = TelemetriaPool()
+    app.extensions["telemetria_pool"] = telemetria
+
+    if isinstance(engine.pool, PoolMonitorado):
+        engine.pool.telemetria = telemetria
+
+    # Eventos de pool valem para qualquer classe e sobrevivem ao recreate()
+    event.listen(engine, "checkout", lambda *args: telemetria.registrar("checkouts"))
+    event.listen(engine, "checkin", lambda *args: telemetria.registrar("checkins"))
+    event.listen(engine, "connect", lambda *args: telemetria.registrar("conexoes_abertas"))
+    event.listen(engine, "invalidate", lambda *args: telemetria.registrar("invalidacoes"))
+    return telemetria
+######################################## TELEMETRIA DO POOL ########################################
@@ -0,0 +1,186 @@
+from datetime import date
+from decimal import Decimal
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func
+from app.extensions import db
+from app.models import GastoCategoriaMes, RegistroDiario
+from app.versao_dados import incrementar_versoes
+
+
+######################################## CONTADORES POR CATEGORIA ########################################
+# Soma e quantidade por (usuario_id, ano, mes, categoria), atualizadas por delta na
+# mesma transação de adicionar/alterar/deletar gasto. Os gráficos leem no máximo
+# 7 linhas por mês, independentemente do tamanho do histórico do usuário.
+def _decimal(valor):
+    return Decimal(str(valor or 0)).quantize(Decimal("0.01"))
+
+
+def _insert_upsert():
+    dialeto = db.session.get_bind().dialect.name
+    if dialeto == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialeto == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+
+def aplicar_delta_categoria(usuario_id, data_registro, categoria, valor, quantidade):
+    valor = _decimal(valor)
+    if valor == 0 and quantidade == 0:
+        return
+
+    chave = {
+        "usuario_id": usuario_id,
+        "ano": data_registro.year,
+        "mes": data_registro.month,
+        "categoria": categoria or "",
+    }
+
+    insert = _insert_upsert()
+    if insert is not None:
+        # Upsert atômico: concorrência no mesmo contador não perde incrementos
+        tabela = GastoCategoriaMes.__table__
+        stmt = insert(tabela).values(**chave, total=valor, quantidade=quantidade)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["usuario_id", "ano", "mes", "categoria"],
+            set_={
+                "total": tabela.c.total + stmt.excluded.total,
+                "quantidade": tabela.c.quantidade + stmt.excluded.quantidade,
+            },
+        )
+        db.session.execute(stmt)
+        return
+
+    contador = GastoCategoriaMes.query.filter_by(**chave).with_for_update().first()
+    if contador is None:
+        db.session.add(GastoCategoriaMes(**chave, total=valor, quantidade=quantidade))
+    else:
+        contador.total = contador.total + valor
+        contador.quantidade = contador.quantidade + quantidade
+
+
+def registrar_gasto(gasto):
+    aplicar_delta_categoria(gasto.usuario_id, gasto.data_registro, gasto.categoria, gasto.valor, 1)
+
+
+def registrar_gastos_lote(usuario_id, linhas):
+    # Agrupa o lote por (ano, mes, categoria) antes do upsert: um delta por
+    # contador afetado, e não um por linha inserida
+    deltas = {}
+    for linha in linhas:
+        chave = (linha["data_registro"].year, linha["data_registro"].month, linha["categoria"])
+        total, quantidade = deltas.get(chave, (Decimal("0.00"), 0))
+        deltas[chave] = (total + _decimal(linha["valor"]), quantidade + 1)
+
+    for (ano, mes, categoria), (total, quantidade) in deltas.items():
+        aplicar_delta_categoria(usuario_id, date(ano, mes, 1), categoria, total, quantidade)
+
+
+def remover_gasto(gasto):
+    aplicar_delta_categoria(gasto.usuario_id, gasto.data_registro, gasto.categoria, -_decimal(gasto.valor), -1)
+
+
+def alterar_gasto_contadores(gasto, categoria_antiga, valor_antigo):
+    # Delta = novo - antigo; se a categoria mudou, move a linha inteira de contador
+    if categoria_antiga == gasto.categoria:
+        aplicar_delta_categoria(
+            gasto.usuario_id, gasto.data_registro, gasto.categoria,
+            _decimal(gasto.valor) - _decimal(valor_antigo), 0
+        )
+        return
+    # Linhas de contador sempre na mesma ordem (por categoria): duas edições que
+    # trocam categorias em sentidos opostos não travam uma à outra (deadlock)
+    deltas = sorted([
+        (categoria_antiga or "", -_decimal(valor_antigo), -1),
+        (gasto.categoria or "", _decimal(gasto.valor), 1),
+    ])
+    for categoria, valor, quantidade in deltas:
+        aplicar_delta_categoria(gasto.usuario_id, gasto.data_registro, categoria, valor, quantidade)
+
+
+def _contadores_reais(usuario_id=None):
+    ano_col = db.extract('year', RegistroDiario.data_registro)
+    mes_col = db.extract('month', RegistroDiario.data_registro)
+    consulta = db.session.query(
+        RegistroDiario.usuario_id, ano_col, mes_col, RegistroDiario.categoria,
+        func.sum(RegistroDiario.valor), func.count(RegistroDiario.id)
+    )
+    if usuario_id is not None:
+        consulta = consulta.filter(RegistroDiario.usuario_id == usuario_id)
+    consulta = consulta.group_by(RegistroDiario.usuario_id, ano_col, mes_col, RegistroDiario.categoria)
+
+    return {
+        (uid, int(ano), int(mes), categoria or ""): (_decimal(total), int(quantidade))
+        for uid, ano, mes, categoria, total, quantidade in consulta
+    }
+
+
+def _contadores_salvos(usuario_id=None):
+    consulta = GastoCategoriaMes.query
+    if usuario_id is not None:
+        consulta = consulta.filter_by(usuario_id=usuario_id)
+    return {
+        (c.usuario_id, c.ano, c.mes, c.categoria): (_decimal(c.total), int(c.quantidade))
+        for c in consulta
+    }
+
+
+def verificar_contadores(usuario_id=None):
+    # Lista de (chave, esperado, salvo) para cada contador divergente do bruto
+    reais = _contadores_reais(usuario_id)
+    salvos = {
+        chave: valores
+        for chave, valores in _contadores_salvos(usuario_id).items()
+        if valores != (Decimal("0.00"), 0)
+    }
+    vazio = (Decimal("0.00"), 0)
+    return [
+        (chave, reais.get(chave, vazio), salvos.get(chave, vazio))
+        for chave in sorted(set(reais) | set(salvos), key=str)
+        if reais.get(chave, vazio) != salvos.get(chave, vazio)
+    ]
+
+
+def reconstruir_contadores(usuario_id=None):
+    consulta = GastoCategoriaMes.query
+    if usuario_id is not None:
+        consulta = consulta.filter_by(usuario_id=usuario_id)
+    afetados = {uid for (uid,) in consulta.with_entities(GastoCategoriaMes.usuario_id).distinct()}
+    consulta.delete(synchronize_session=False)
+
+    reais = _contadores_reais(usuario_id)
+    afetados.update(uid for (uid, _, _, _) in reais)
+    db.session.add_all([
+        GastoCategoriaMes(
+            usuario_id=uid, ano=ano, mes=mes, categoria=categoria,
+            total=total, quantidade=quantidade
+        )
+        for (uid, ano, mes, categoria), (total, quantidade) in reais.items()
+    ])
+    # Totais por categoria podem ter mudado: invalida ETag e cache de respostas
+    incrementar_versoes(afetados)
+    db.session.commit()
+    return len(reais)
+######################################## CONTADORES POR CATEGORIA ########################################
+
+
+@click.command("contadores-categoria")
+@click.option("--usuario-id", type=int, default=None, help="Restringe a um usuário.")
+@click.option("--reconstruir", is_flag=True, help="Recria os contadores a partir de registro_diario.")
+@with_appcontext
+def contadores_categoria_command(usuario_id, reconstruir):
+    """Verifica (ou reconstrói) os contadores de gasto por categoria."""
+    if reconstruir:
+        total = reconstruir_contadores(usuario_id)
+        click.echo(f"{total} contador(es) reconstruído(s).")
+        return
+
+    divergencias = verificar_contadores(usuario_id)
+    for chave, esperado, salvo in divergencias:
+        click.echo(f"{chave}: esperado={esperado} salvo={salvo}")
+    click.echo(f"{len(divergencias)} divergência(s) encontrada(s).")
+    if divergencias:
+        raise SystemExit(1)
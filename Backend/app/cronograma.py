@@ -0,0 +1,142 @@
+import calendar
+from datetime import date
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import Date, and_, case, extract, literal, not_, or_, update
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from app.extensions import db
+from app.models import Parcelamento
+from app.versao_dados import incrementar_versoes
+
+
+######################################## ARITMÉTICA DE DATAS ########################################
+class somar_meses(FunctionElement):
+    # data + n meses, limitado ao último dia do mês (31/01 + 1 mês = 28/02 ou 29/02)
+    type = Date()
+    name = "somar_meses"
+    inherit_cache = True
+
+
+@compiles(somar_meses, "postgresql")
+def _somar_meses_postgresql(elemento, compilador, **kw):
+    data, meses = (compilador.process(arg, **kw) for arg in elemento.clauses)
+    return f"CAST({data} + make_interval(months => CAST({meses} AS INTEGER)) AS DATE)"
+
+
+@compiles(somar_meses, "sqlite")
+def _somar_meses_sqlite(elemento, compilador, **kw):
+    # O modificador '+N months' do SQLite transborda (31/01 + 1 mês = 03/03):
+    # o MIN com o último dia do mês de destino faz o mesmo corte do Postgres
+    data, meses = (compilador.process(arg, **kw) for arg in elemento.clauses)
+    dia = f"CAST(strftime('%d', {data}) AS INTEGER)"
+    return (
+        f"MIN("
+        f"date({data}, 'start of month', '+' || ({meses}) || ' months', '+' || ({dia} - 1) || ' days'), "
+        f"date({data}, 'start of month', '+' || (({meses}) + 1) || ' months', '-1 day'))"
+    )
+######################################## ARITMÉTICA DE DATAS ########################################
+
+
+######################################## CRONOGRAMA DE PARCELAS ########################################
+# No modo automático, data_inicio e parcelas_totais determinam o progresso: a
+# parcela k vence em data_inicio + k meses e conta como paga a partir desse dia.
+# As expressões abaixo calculam isso no próprio SELECT, com "hoje" como parâmetro;
+# parcelas_restantes/ativo gravados só mudam pelo UPDATE noturno (atualizar_cronogramas).
+def _dia_corte(hoje):
+    # No último dia do mês vencem também as parcelas de dia 29-31 cortadas para ele
+    return 31 if hoje.day == calendar.monthrange(hoje.year, hoje.month)[1] else hoje.day
+
+
+def parcelas_pagas_cronograma(hoje=None):
+    hoje = hoje or date.today()
+    inicio = Parcelamento.data_inicio
+    meses = (hoje.year * 12 + hoje.month) - (extract("year", inicio) * 12 + extract("month", inicio))
+    vencidas = meses + case((extract("day", inicio) <= _dia_corte(hoje), 1), else_=0)
+    return case(
+        (vencidas < 0, 0),
+        (vencidas > Parcelamento.parcelas_totais, Parcelamento.parcelas_totais),
+        else_=vencidas,
+    )
+
+
+def _segue_cronograma():
+    return and_(Parcelamento.automatico == True, Parcelamento.data_inicio.isnot(None))
+
+
+def parcelas_restantes_efetivas(hoje=None):
+    return case(
+        (_segue_cronograma(), Parcelamento.parcelas_totais - parcelas_pagas_cronograma(hoje)),
+        else_=Parcelamento.parcelas_restantes,
+    )
+
+
+def parcelas_pagas_efetivas(hoje=None):
+    return Parcelamento.parcelas_totais - parcelas_restantes_efetivas(hoje)
+
+
+def proximo_vencimento(hoje=None):
+    # Próxima parcela em aberto (data_inicio + pagas meses); nula se quitado ou encerrado
+    restantes = parcelas_restantes_efetivas(hoje)
+    return case(
+        (
+            and_(Parcelamento.ativo == True, restantes > 0),
+            somar_meses(Parcelamento.data_inicio, parcelas_pagas_efetivas(hoje)),
+        ),
+        else_=literal(None, Date()),
+    )
+
+
+def filtro_parcelas_ativas(hoje=None):
+    # Parcelamento automático sai dos ativos no dia em que vence a última parcela,
+    # mesmo antes do UPDATE noturno; `ativo` continua na condição (índice parcial)
+    return and_(
+        Parcelamento.ativo == True,
+        or_(not_(_segue_cronograma()), parcelas_restantes_efetivas(hoje) > 0),
+    )
+
+
+def filtro_parcelas_encerradas(hoje=None):
+    return or_(
+        Parcelamento.ativo == False,
+        and_(_segue_cronograma(), parcelas_restantes_efetivas(hoje) <= 0),
+    )
+
+
+def progresso_parcela(data_inicio, parcelas_totais, hoje=None):
+    # Mesma regra em Python, para valores ainda não gravados (criação)
+    hoje = hoje or date.today()
+    meses = (hoje.year * 12 + hoje.month) - (data_inicio.year * 12 + data_inicio.month)
+    vencidas = meses + (1 if data_inicio.day <= _dia_corte(hoje) else 0)
+    pagas = min(max(vencidas, 0), parcelas_totais)
+    return pagas, parcelas_totais - pagas
+
+
+def atualizar_cronogramas(hoje=None):
+    # Um único UPDATE para todos os usuários; só regrava as linhas cujo progresso mudou
+    restantes = Parcelamento.parcelas_totais - parcelas_pagas_cronograma(hoje)
+    stmt = (
+        update(Parcelamento)
+        .where(
+            _segue_cronograma(),
+            Parcelamento.ativo == True,
+            Parcelamento.parcelas_restantes != restantes,
+        )
+        .values(parcelas_restantes=restantes, ativo=restantes > 0)
+        .returning(Parcelamento.usuario_id)
+        .execution_options(synchronize_session=False)
+    )
+    afetados = db.session.execute(stmt).scalars().all()
+    # Os donos das linhas regravadas têm ETag e cache de respostas invalidados
+    incrementar_versoes(afetados)
+    db.session.commit()
+    return len(afetados)
+######################################## CRONOGRAMA DE PARCELAS ########################################
+
+
+@click.command("parcelas-cronograma")
+@with_appcontext
+def parcelas_cronograma_command():
+    """Grava o progresso dos parcelamentos automáticos (rodar uma vez por noite)."""
+    atualizados = atualizar_cronogramas()
+    click.echo(f"{atualizados} parcelamento(s) atualizado(s).")
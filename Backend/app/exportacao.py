@@ -0,0 +1,139 @@
+import csv
+import io
+import zlib
+from sqlalchemy import literal, null, select
+from app.extensions import db
+from app.models import ContaFixa, Parcelamento, RegistroDiario
+
+EXPORTACAO_LOTE = 10000
+
+# Esquema único para as três tabelas: cada linha diz de onde veio em "tipo" e
+# deixa nulas as colunas que não se aplicam a ela
+COLUNAS_EXPORTACAO = [
+    "tipo", "id", "descricao", "categoria", "valor", "data",
+    "dia_vencimento", "valor_total", "parcelas_totais", "parcelas_restantes", "ativo",
+]
+
+
+######################################## LEITURA EM LOTES ########################################
+# Cada SELECT já devolve as 11 colunas na ordem de COLUNAS_EXPORTACAO (tipo
+# literal e NULLs no SQL), então os lotes seguem direto para o escritor.
+# yield_per + partitions(): cursor do lado do servidor no Postgres, no máximo
+# EXPORTACAO_LOTE linhas em memória por vez.
+def _lotes(stmt):
+    resultado = db.session.execute(stmt.execution_options(yield_per=EXPORTACAO_LOTE))
+    for particao in resultado.partitions():
+        yield particao
+
+
+def lotes_exportacao(usuario_id, de=None, ate=None):
+    # O período filtra os registros diários; contas fixas e parcelamentos saem inteiros
+    registros = select(
+        literal("registro"), RegistroDiario.id, RegistroDiario.descricao, RegistroDiario.categoria,
+        RegistroDiario.valor, RegistroDiario.data_registro,
+        null(), null(), null(), null(), null()
+    ).where(RegistroDiario.usuario_id == usuario_id)
+    if de:
+        registros = registros.where(RegistroDiario.data_registro >= de)
+    if ate:
+        # Inclusivo sem ate + 1 dia: o gerador roda já com a resposta em streaming,
+        # e um OverflowError em 9999-12-31 cortaria o arquivo no meio
+        registros = registros.where(RegistroDiario.data_registro <= ate)
+    registros = registros.order_by(RegistroDiario.data_registro, RegistroDiario.id)
+
+    contas = select(
+        literal("conta_fixa"), ContaFixa.id, ContaFixa.nome, null(), ContaFixa.valor, null(),
+        ContaFixa.dia_vencimento, null(), null(), null(), ContaFixa.ativa
+    ).where(ContaFixa.usuario_id == usuario_id).order_by(ContaFixa.id)
+
+    parcelas = select(
+        literal("parcelamento"), Parcelamento.id, Parcelamento.descricao, null(),
+        Parcelamento.valor_parcela, Parcelamento.data_inicio, null(), Parcelamento.valor_total,
+        Parcelamento.parcelas_totais, Parcelamento.parcelas_restantes, Parcelamento.ativo
+    ).where(Parcelamento.usuario_id == usuario_id).order_by(Parcelamento.id)
+
+    yield from _lotes(registros)
+    yield from _lotes(contas)
+    yield from _lotes(parcelas)
+######################################## LEITURA EM LOTES ########################################
+
+
+######################################## CSV COMPACTADO ########################################
+def gerar_csv_gzip(lotes):
+    # Cada lote vira texto CSV e passa pelo mesmo compressor (wbits=31 => formato gzip)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    texto = io.StringIO()
+    escritor = csv.writer(texto)
+
+    escritor.writerow(COLUNAS_EXPORTACAO)
+    for lote in lotes:
+        escritor.writerows(lote)
+        bloco = compressor.compress(texto.getvalue().encode("utf-8"))
+        texto.seek(0)
+        texto.truncate()
+        if bloco:
+            yield bloco
+
+    yield compressor.compress(texto.getvalue().encode("utf-8")) + compressor.flush()
+######################################## CSV COMPACTADO ########################################
+
+
+######################################## PARQUET ########################################
+class _SaidaIncremental:
+    # Destino do ParquetWriter que só acumula bytes até o próximo dreno
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+        self.closed = False
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drenar(self):
+        dados = b"".join(self._partes)
+        self._partes = []
+        return dados
+
+
+def gerar_parquet(lotes):
+    # Um row group por lote: o writer grava o grupo e os bytes saem em seguida
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = pa.schema([
+        ("tipo", pa.string()),
+        ("id", pa.int64()),
+        ("descricao", pa.string()),
+        ("categoria", pa.string()),
+        ("valor", pa.decimal128(12, 2)),
+        ("data", pa.date32()),
+        ("dia_vencimento", pa.int32()),
+        ("valor_total", pa.decimal128(12, 2)),
+        ("parcelas_totais", pa.int32()),
+        ("parcelas_restantes", pa.int32()),
+        ("ativo", pa.bool_()),
+    ])
+
+    saida = _SaidaIncremental()
+    with pq.ParquetWriter(saida, esquema, compression="snappy") as escritor:
+        for lote in lotes:
+            colunas = list(zip(*lote))
+            tabela = pa.Table.from_arrays(
+                [pa.array(coluna, type=campo.type) for coluna, campo in zip(colunas, esquema)],
+                schema=esquema
+            )
+            escritor.write_table(tabela, row_group_size=len(lote))
+            yield saida.drenar()
+    yield saida.drenar()
+######################################## PARQUET ########################################
@@ -1,3 +1,32 @@
+from flask import current_app, g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 
-db = SQLAlchemy()
\ No newline at end of file
+
+class SessaoRoteada(Session):
+    # Leituras marcadas com g.usar_replica vão para o engine da réplica (quando
+    # configurado); flush e DML (INSERT/UPDATE/DELETE) sempre vão para o primário.
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and has_app_context()
+            and g.get("usar_replica")
+            and not self._flushing
+            and not getattr(clause, "is_dml", False)
+        ):
+            replica = current_app.extensions.get("engine_replica")
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={"class_": SessaoRoteada})
+
+
+def cliente_redis(app):
+    # Um cliente (com seu pool de conexões) por app, compartilhado pela janela de
+    # escritas da réplica e pelo cache de respostas; só com REDIS_URL configurado
+    if "redis" not in app.extensions:
+        import redis  # dependência opcional, só para implantações com vários workers
+        app.extensions["redis"] = redis.Redis.from_url(app.config["REDIS_URL"])
+    return app.extensions["redis"]
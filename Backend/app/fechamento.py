@@ -0,0 +1,175 @@
+from datetime import date
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func
+from app.cronograma import progresso_parcela
+from app.extensions import db
+from app.models import ContaFixa, HistoricoFatura, Parcelamento, RegistroDiario, Usuario
+from app.services import intervalo_mes
+from app.versao_dados import incrementar_versoes
+
+
+######################################## FECHAMENTO DE MÊS ########################################
+# Consolida cada mês já encerrado em HistoricoFatura. Leituras históricas passam a
+# vir dessa tabela; só o mês corrente (aberto) continua varrendo registro_diario.
+def mes_fechado(ano, mes, hoje=None):
+    hoje = hoje or date.today()
+    return (ano, mes) < (hoje.year, hoje.month)
+
+
+def _proximo_mes(ano, mes):
+    return (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+
+def _mes_anterior(ano, mes):
+    return (ano - 1, 12) if mes == 1 else (ano, mes - 1)
+
+
+def _parcela_vigente(parcela, ano, mes, hoje):
+    # A parcela conta no mês se o mês está dentro do cronograma e o plano não foi
+    # excluído nem quitado antes do fechamento (ativo=False). No automático,
+    # ativo=False também marca o fim natural do cronograma, que não tira a
+    # parcela do último mês.
+    if not parcela.data_inicio:
+        return False
+    indice = (ano - parcela.data_inicio.year) * 12 + (mes - parcela.data_inicio.month)
+    if not 0 <= indice < parcela.parcelas_totais:
+        return False
+    if parcela.ativo:
+        return True
+    if parcela.automatico:
+        return progresso_parcela(parcela.data_inicio, parcela.parcelas_totais, hoje)[1] == 0
+    return False
+
+
+def _retrato(usuario, ano, mes, hoje):
+    # Contas fixas, parcelas e salário não têm histórico: só valem para o mês que
+    # acabou de encerrar, lidos no fechamento dele
+    contas = float(
+        db.session.query(func.sum(ContaFixa.valor))
+        .filter_by(usuario_id=usuario.id, ativa=True)
+        .scalar() or 0
+    )
+    parcelas = sum(
+        float(p.valor_parcela)
+        for p in Parcelamento.query.filter_by(usuario_id=usuario.id)
+        if _parcela_vigente(p, ano, mes, hoje)
+    )
+    return {
+        "salario_mensal": round(float(usuario.salario_mensal or 0), 2),
+        "total_contas_fixas": round(contas, 2),
+        "total_parcelamentos": round(parcelas, 2),
+    }
+
+
+def _saldo(linha):
+    retrato = (linha.salario_mensal, linha.total_contas_fixas, linha.total_parcelamentos)
+    if linha.total_gastos_registro is None or any(valor is None for valor in retrato):
+        return None
+    return round(
+        float(linha.salario_mensal) - float(linha.total_gastos_registro)
+        - float(linha.total_contas_fixas) - float(linha.total_parcelamentos), 2
+    )
+
+
+def fechar_meses_pendentes(hoje=None, usuario_id=None):
+    hoje = hoje or date.today()
+    limite, _ = intervalo_mes(hoje.month, hoje.year)
+    recem_encerrado = _mes_anterior(hoje.year, hoje.month)
+
+    usuarios = Usuario.query
+    if usuario_id is not None:
+        usuarios = usuarios.filter(Usuario.id == usuario_id)
+
+    # 1. Gastos de todos os meses fechados em uma única consulta agrupada
+    filtros = [RegistroDiario.data_registro < limite]
+    if usuario_id is not None:
+        filtros.append(RegistroDiario.usuario_id == usuario_id)
+    ano_col = db.extract('year', RegistroDiario.data_registro)
+    mes_col = db.extract('month', RegistroDiario.data_registro)
+    gastos = {}
+    for uid, ano, mes, total in (
+        db.session.query(RegistroDiario.usuario_id, ano_col, mes_col, func.sum(RegistroDiario.valor))
+        .filter(*filtros)
+        .group_by(RegistroDiario.usuario_id, ano_col, mes_col)
+    ):
+        gastos[(uid, int(ano), int(mes))] = float(total or 0)
+
+    historico = HistoricoFatura.query
+    if usuario_id is not None:
+        historico = historico.filter(HistoricoFatura.usuario_id == usuario_id)
+    existentes = {(linha.usuario_id, linha.ano, linha.mes): linha for linha in historico}
+
+    consolidados, afetados = 0, set()
+    for usuario in usuarios:
+        meses_usuario = [(ano, mes) for (uid, ano, mes) in gastos if uid == usuario.id]
+        if not meses_usuario:
+            continue
+
+        # 2. De janeiro do primeiro ano com gastos até o último mês fechado, sem lacunas
+        ano, mes = min(meses_usuario)[0], 1
+        while mes_fechado(ano, mes, hoje):
+            total_gastos = round(gastos.get((usuario.id, ano, mes), 0.0), 2)
+            linha = existentes.get((usuario.id, ano, mes))
+            if linha is None:
+                # Meses fechados com atraso ficam sem retrato (campos nulos)
+                retrato = _retrato(usuario, ano, mes, hoje) if (ano, mes) == recem_encerrado else {}
+                linha = HistoricoFatura(
+                    usuario_id=usuario.id, ano=ano, mes=mes, total_gastos_registro=total_gastos, **retrato
+                )
+                linha.saldo_final = _saldo(linha)
+                db.session.add(linha)
+                consolidados += 1
+                afetados.add(usuario.id)
+            elif linha.total_gastos_registro is None:
+                # Reaberto por escrita retroativa: refaz o total, mantém o retrato
+                linha.total_gastos_registro = total_gastos
+                linha.saldo_final = _saldo(linha)
+                consolidados += 1
+                afetados.add(usuario.id)
+            ano, mes = _proximo_mes(ano, mes)
+
+    # Leituras históricas mudam de fonte: ETag e cache de respostas desses usuários caem
+    incrementar_versoes(afetados)
+    db.session.commit()
+    return consolidados
+
+
+def invalidar_fechamento(usuario_id, data_registro, hoje=None):
+    # Escrita em mês já fechado: anula o total consolidado (leitura volta ao bruto
+    # até o próximo fechamento), preservando o retrato de contas, parcelas e
+    # salário. Deve rodar na mesma transação da escrita.
+    if not data_registro or not mes_fechado(data_registro.year, data_registro.month, hoje):
+        return
+    HistoricoFatura.query.filter_by(
+        usuario_id=usuario_id,
+        ano=data_registro.year,
+        mes=data_registro.month,
+    ).update({"total_gastos_registro": None, "saldo_final": None}, synchronize_session=False)
+
+
+def gastos_consolidados_ano(usuario_id, ano, hoje=None):
+    # Retorna ({mes: total}, primeiro mês não consolidado) para o ano pedido.
+    # Meses a partir do primeiro buraco são lidos do bruto pelo chamador.
+    linhas = HistoricoFatura.query.filter_by(usuario_id=usuario_id, ano=ano).all()
+    consolidados = {
+        linha.mes: float(linha.total_gastos_registro)
+        for linha in linhas
+        if linha.total_gastos_registro is not None and mes_fechado(ano, linha.mes, hoje)
+    }
+
+    primeiro_aberto = 1
+    while primeiro_aberto in consolidados:
+        primeiro_aberto += 1
+
+    return {mes: total for mes, total in consolidados.items() if mes < primeiro_aberto}, primeiro_aberto
+######################################## FECHAMENTO DE MÊS ########################################
+
+
+@click.command("fechar-meses")
+@click.option("--usuario-id", type=int, default=None, help="Fecha apenas os meses deste usuário.")
+@with_appcontext
+def fechar_meses_command(usuario_id):
+    """Consolida os meses encerrados em historico_fatura."""
+    criados = fechar_meses_pendentes(usuario_id=usuario_id)
+    click.echo(f"{criados} mês(es) consolidado(s).")
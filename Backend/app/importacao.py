@@ -0,0 +1,285 @@
+import csv
+import hashlib
+import re
+import unicodedata
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import select
+from app.extensions import db
+from app.models import RegistroDiario
+from app.contadores import registrar_gastos_lote
+from app.fechamento import invalidar_fechamento
+from app.services import CATEGORIAS_VALIDAS
+
+IMPORTACAO_LOTE = 1000
+IMPORTACAO_MAX_ERROS = 50
+# Datas distintas com contador de ocorrências em memória (as menos recentes saem)
+IMPORTACAO_JANELA_DATAS = 62
+VALOR_MAXIMO = Decimal("99999999.99")  # Numeric(10, 2)
+DESCRICAO_MAXIMA = 150  # String(150)
+
+
+class ErroImportacao(Exception):
+    # Mensagens escritas para o usuário: só este erro chega ao cliente (400 na rota
+    # ou na lista "erros" do resumo); qualquer outro segue o caminho de erro interno
+    pass
+
+
+######################################## NORMALIZAÇÃO ########################################
+def _sem_acentos(texto):
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode()
+
+
+def _normalizar_chave(texto):
+    return _sem_acentos(str(texto)).strip().lower()
+
+
+def _data(valor):
+    valor = str(valor).strip()
+    for formato in ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d/%m/%y", "%Y%m%d"):
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            continue
+    raise ErroImportacao(f"data inválida: {valor!r}")
+
+
+def _valor(valor):
+    # Aceita "1.234,56", "1,234.56", "-50.00", "(50,00)" e "R$ 10,00"
+    texto = str(valor).replace("R$", "").replace(" ", "").strip()
+    negativo = texto.startswith("(") and texto.endswith(")")
+    texto = texto.strip("()")
+    if "," in texto and "." in texto:
+        if texto.rfind(",") > texto.rfind("."):
+            texto = texto.replace(".", "").replace(",", ".")
+        else:
+            texto = texto.replace(",", "")
+    elif "," in texto:
+        texto = texto.replace(",", ".")
+    try:
+        numero = Decimal(texto)
+    except InvalidOperation:
+        raise ErroImportacao(f"valor inválido: {valor!r}")
+    return -numero if negativo else numero
+
+
+# Palavras-chave por categoria, testadas em ordem sobre a descrição sem acentos
+REGRAS_CATEGORIA = [
+    ("Compras", ("MERCADO LIVRE", "MERCADOLIVRE", "AMAZON", "MAGALU", "SHOPEE", "AMERICANAS", "ALIEXPRESS")),
+    ("Alimentação", ("IFOOD", "RAPPI", "RESTAURANTE", "LANCHONETE", "PADARIA", "SUPERMERC", "MERCADO", "ACOUGUE", "PIZZA")),
+    ("Transporte", ("UBER", "99APP", "99 POP", "POSTO", "COMBUST", "ESTACIONAMENTO", "PEDAGIO", "METRO", "BILHETE")),
+    ("Saúde", ("FARMACIA", "DROGA", "HOSPITAL", "CLINICA", "LABORATORIO", "UNIMED", "ODONTO")),
+    ("Educação", ("ESCOLA", "FACULDADE", "UNIVERSIDADE", "CURSO", "UDEMY", "LIVRARIA")),
+    ("Lazer", ("NETFLIX", "SPOTIFY", "CINEMA", "INGRESSO", "STEAM", "DISNEY", "PRIME VIDEO")),
+]
+
+
+def categorizar(descricao, categoria_informada=None):
+    if categoria_informada:
+        for categoria in CATEGORIAS_VALIDAS:
+            if _normalizar_chave(categoria) == _normalizar_chave(categoria_informada):
+                return categoria
+    texto = _sem_acentos(descricao).upper()
+    for categoria, palavras in REGRAS_CATEGORIA:
+        if any(palavra in texto for palavra in palavras):
+            return categoria
+    return "Outros"
+######################################## NORMALIZAÇÃO ########################################
+
+
+######################################## LEITORES DE EXTRATO ########################################
+# Geradores sobre um iterador de linhas de texto: nunca materializam o arquivo.
+# Cada item é {"linha", "data", "valor", "descricao", "categoria", "id_externo"}
+# ou {"linha", "erro"}.
+COLUNAS_CSV = {
+    "data": ("data", "date", "data lancamento", "data_lancamento", "data_registro", "dt"),
+    "descricao": ("descricao", "historico", "description", "memo", "lancamento", "estabelecimento"),
+    "valor": ("valor", "amount", "value", "valor (r$)", "valor_rs"),
+    "categoria": ("categoria", "category"),
+}
+
+
+def ler_csv(linhas):
+    linhas = iter(linhas)
+    cabecalho = next(linhas, "")
+    delimitador = max(";,\t", key=cabecalho.count)
+    nomes = [_normalizar_chave(nome) for nome in next(csv.reader([cabecalho], delimiter=delimitador))]
+
+    posicoes = {}
+    for campo, aliases in COLUNAS_CSV.items():
+        for indice, nome in enumerate(nomes):
+            if nome in aliases:
+                posicoes[campo] = indice
+                break
+    if not {"data", "descricao", "valor"} <= set(posicoes):
+        raise ErroImportacao("Cabeçalho do CSV deve ter colunas de data, descrição e valor")
+
+    leitor = csv.reader(linhas, delimiter=delimitador)
+    for campos in leitor:
+        numero = leitor.line_num + 1  # +1: cabeçalho lido à parte
+        if not any(campo.strip() for campo in campos):
+            continue
+        try:
+            yield {
+                "linha": numero,
+                "data": _data(campos[posicoes["data"]]),
+                "valor": _valor(campos[posicoes["valor"]]),
+                "descricao": campos[posicoes["descricao"]],
+                "categoria": campos[posicoes["categoria"]] if "categoria" in posicoes else None,
+                "id_externo": None,
+            }
+        except ErroImportacao as e:
+            yield {"linha": numero, "erro": str(e)}
+        except IndexError:
+            yield {"linha": numero, "erro": "colunas ausentes"}
+
+
+PADRAO_TAG_OFX = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+def _tags_ofx(linhas):
+    # OFX (SGML ou XML) pode vir em uma linha só: tokeniza por tag, guardando
+    # apenas o trecho após o último "<" até o próximo pedaço chegar
+    resto = ""
+    for pedaco in linhas:
+        resto += pedaco
+        corte = resto.rfind("<")
+        if corte <= 0:
+            continue
+        completo, resto = resto[:corte], resto[corte:]
+        for fechamento, tag, valor in PADRAO_TAG_OFX.findall(completo):
+            yield fechamento == "/", tag.upper(), valor.strip()
+    for fechamento, tag, valor in PADRAO_TAG_OFX.findall(resto):
+        yield fechamento == "/", tag.upper(), valor.strip()
+
+
+def _transacao_ofx(numero, campos):
+    try:
+        return {
+            "linha": numero,
+            "data": _data(campos.get("DTPOSTED", "")[:8]),
+            "valor": _valor(campos.get("TRNAMT", "")),
+            "descricao": campos.get("MEMO") or campos.get("NAME") or "",
+            "categoria": None,
+            "id_externo": campos.get("FITID") or None,
+        }
+    except ErroImportacao as e:
+        return {"linha": numero, "erro": str(e)}
+
+
+def ler_ofx(linhas):
+    numero = 0
+    atual = None
+    for fechamento, tag, valor in _tags_ofx(linhas):
+        if tag == "STMTTRN":
+            if atual is not None:
+                yield _transacao_ofx(numero, atual)
+            atual = None if fechamento else {}
+            numero += not fechamento
+        elif atual is not None and not fechamento:
+            atual[tag] = valor
+    if atual is not None:
+        yield _transacao_ofx(numero, atual)
+######################################## LEITORES DE EXTRATO ########################################
+
+
+######################################## PIPELINE DE IMPORTAÇÃO ########################################
+def hash_conteudo(data_registro, valor, descricao, id_externo=None, ocorrencia=0):
+    # Com FITID (OFX) a identidade é o id do banco; sem ele, o conteúdo da linha e
+    # a ocorrência no dia (duas compras iguais no mesmo dia são lançamentos distintos).
+    # A data entra nas duas formas: com registro_diario particionado, o índice único
+    # é (usuario_id, hash_conteudo, data_registro) e só barra repetidos se o hash já
+    # determina a data
+    if id_externo:
+        base = f"id|{data_registro.isoformat()}|{id_externo}"
+    else:
+        base = f"{data_registro.isoformat()}|{valor:.2f}|{_normalizar_chave(descricao)}|{ocorrencia}"
+    return hashlib.sha256(base.encode()).hexdigest()
+
+
+def _gravar_lote(usuario_id, lote, resumo):
+    hashes = [linha["hash_conteudo"] for linha in lote]
+    existentes = set(db.session.execute(
+        select(RegistroDiario.hash_conteudo).where(
+            RegistroDiario.usuario_id == usuario_id,
+            RegistroDiario.hash_conteudo.in_(hashes)
+        )
+    ).scalars())
+
+    novos = {}
+    for linha in lote:
+        if linha["hash_conteudo"] in existentes or linha["hash_conteudo"] in novos:
+            resumo["duplicados"] += 1
+        else:
+            novos[linha["hash_conteudo"]] = linha
+    linhas = list(novos.values())
+
+    if linhas:
+        db.session.execute(RegistroDiario.__table__.insert(), linhas)
+        for ano, mes in {(linha["data_registro"].year, linha["data_registro"].month) for linha in linhas}:
+            invalidar_fechamento(usuario_id, date(ano, mes, 1))
+        registrar_gastos_lote(usuario_id, linhas)
+    # Commit por lote: transações curtas e progresso durável; reimportar o mesmo
+    # arquivo após uma falha só insere o que faltou (hash_conteudo)
+    db.session.commit()
+    resumo["importados"] += len(linhas)
+
+
+def importar_extrato(usuario_id, linhas, formato, despesas="negativas"):
+    leitor = ler_ofx(linhas) if formato == "ofx" else ler_csv(linhas)
+    resumo = {"importados": 0, "duplicados": 0, "ignorados": 0, "erros": []}
+
+    lote = []
+    ocorrencias = OrderedDict()  # data -> {(valor, descrição): vistas até aqui}
+    for item in leitor:
+        if "erro" in item:
+            resumo["ignorados"] += 1
+            if len(resumo["erros"]) < IMPORTACAO_MAX_ERROS:
+                resumo["erros"].append({"linha": item["linha"], "error": item["erro"]})
+            continue
+
+        # Extrato bancário: débitos são negativos. Fatura de cartão: gastos positivos.
+        valor = -item["valor"] if despesas == "negativas" else item["valor"]
+        if valor <= 0:
+            resumo["ignorados"] += 1
+            continue
+        if valor > VALOR_MAXIMO:
+            resumo["ignorados"] += 1
+            if len(resumo["erros"]) < IMPORTACAO_MAX_ERROS:
+                resumo["erros"].append({"linha": item["linha"], "error": "Valor excede o limite permitido"})
+            continue
+
+        descricao = " ".join(str(item["descricao"]).split())[:DESCRICAO_MAXIMA] or "Importado"
+        valor = valor.quantize(Decimal("0.01"))
+
+        # Ocorrências contadas por data numa janela das datas vistas por último:
+        # o mesmo dia em blocos separados (pendentes/compensados, ordem invertida)
+        # continua a contagem, e a memória não cresce com a extensão do extrato
+        contadores = ocorrencias.get(item["data"])
+        if contadores is None:
+            contadores = ocorrencias[item["data"]] = {}
+            if len(ocorrencias) > IMPORTACAO_JANELA_DATAS:
+                ocorrencias.popitem(last=False)
+        else:
+            ocorrencias.move_to_end(item["data"])
+        chave = (valor, _normalizar_chave(descricao))
+        ocorrencia = contadores.get(chave, 0)
+        contadores[chave] = ocorrencia + 1
+
+        lote.append({
+            "usuario_id": usuario_id,
+            "descricao": descricao,
+            "valor": valor,
+            "categoria": categorizar(descricao, item["categoria"]),
+            "data_registro": item["data"],
+            "hash_conteudo": hash_conteudo(item["data"], valor, descricao, item["id_externo"], ocorrencia),
+        })
+        if len(lote) >= IMPORTACAO_LOTE:
+            _gravar_lote(usuario_id, lote, resumo)
+            lote = []
+
+    if lote:
+        _gravar_lote(usuario_id, lote, resumo)
+    return resumo
+######################################## PIPELINE DE IMPORTAÇÃO ########################################
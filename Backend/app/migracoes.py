@@ -0,0 +1,293 @@
+from datetime import datetime, timezone
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import (
+    BigInteger, Boolean, Column, Date, DateTime, ForeignKey, Index, Integer, MetaData, Numeric, String, Table,
+    UniqueConstraint, extract, func, inspect, insert, select, text
+)
+from app.extensions import db
+
+TABELA_VERSAO = "versao_schema"
+# Chave do pg_advisory_lock: dois deploys simultâneos não aplicam a mesma migração
+CHAVE_LOCK_MIGRACAO = 7281901
+
+
+######################################## UTILITÁRIOS ########################################
+# Cada migração recebe a conexão já dentro da transação dela. Bancos criados pelo
+# antigo db.create_all() do boot já têm parte do esquema: as migrações criam só o
+# que falta (checkfirst), e esses bancos passam a ser versionados sem retrabalho.
+def _tabela(conexao, nome):
+    return Table(nome, MetaData(), autoload_with=conexao)
+
+
+def _tem_coluna(conexao, tabela, coluna):
+    return any(c["name"] == coluna for c in inspect(conexao).get_columns(tabela))
+
+
+def _criar_indice(conexao, nome, tabela, *colunas, unique=False, where=None, **opcoes):
+    tabela = _tabela(conexao, tabela)
+    if where is not None:
+        opcoes.update(postgresql_where=text(where), sqlite_where=text(where))
+    indice = Index(nome, *(tabela.c[coluna] for coluna in colunas), unique=unique, **opcoes)
+    indice.create(conexao, checkfirst=True)
+
+
+def _booleano(conexao, coluna):
+    # Predicado de índice parcial sobre coluna booleana em cada dialeto
+    return coluna if conexao.dialect.name == "postgresql" else f"{coluna} = 1"
+######################################## UTILITÁRIOS ########################################
+
+
+######################################## MIGRAÇÕES ########################################
+# Nunca altere uma migração já publicada: mudanças de esquema entram como uma nova
+# função no fim de MIGRACOES (e no models.py, que descreve o estado final).
+def _0001_esquema_inicial(conexao):
+    # Retrato das tabelas originais; não importa models.py de propósito
+    metadata = MetaData()
+    Table(
+        "usuario", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("nome", String(100), nullable=False),
+        Column("email", String(150), unique=True, nullable=False),
+        Column("senha_hash", String(50), nullable=False),
+        Column("salario_mensal", Numeric(10, 2), nullable=False),
+    )
+    Table(
+        "conta_fixa", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("usuario_id", Integer, ForeignKey("usuario.id"), nullable=False),
+        Column("nome", String(100), nullable=False),
+        Column("valor", Numeric(10, 2), nullable=False),
+        Column("dia_vencimento", Integer, nullable=False),
+        Column("ativa", Boolean),
+    )
+    Table(
+        "parcelamento", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("usuario_id", Integer, ForeignKey("usuario.id"), nullable=False),
+        Column("descricao", String(150), nullable=False),
+        Column("valor_total", Numeric(10, 2), nullable=False),
+        Column("valor_parcela", Numeric(10, 2), nullable=False),
+        Column("parcelas_totais", Integer, nullable=False),
+        Column("parcelas_restantes", Integer, nullable=False),
+        Column("data_inicio", Date, nullable=False),
+        Column("ativo", Boolean),
+    )
+    Table(
+        "registro_diario", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("usuario_id", Integer, ForeignKey("usuario.id"), nullable=False),
+        Column("descricao", String(150)),
+        Column("categoria", String(50)),
+        Column("valor", Numeric(10, 2), nullable=False),
+        Column("data_registro", Date, nullable=False),
+    )
+    Table(
+        "historico_fatura", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("usuario_id", Integer, ForeignKey("usuario.id"), nullable=False),
+        Column("ano", Integer, nullable=False),
+        Column("mes", Integer, nullable=False),
+        Column("total_gastos_registro", Numeric(10, 2), nullable=False),
+        Column("total_contas_fixas", Numeric(10, 2), nullable=False),
+        Column("total_parcelamentos", Numeric(10, 2), nullable=False),
+        Column("saldo_final", Numeric(10, 2), nullable=False),
+        UniqueConstraint("usuario_id", "ano", "mes", name="uq_usuario_mes_ano"),
+    )
+    metadata.create_all(conexao, checkfirst=True)
+
+
+def _0002_indices_consulta(conexao):
+    _criar_indice(
+        conexao, "ix_registro_diario_usuario_data", "registro_diario",
+        "usuario_id", "data_registro", "id", postgresql_include=["valor", "categoria"]
+    )
+    _criar_indice(
+        conexao, "ix_conta_fixa_usuario_ativa", "conta_fixa",
+        "usuario_id", where=_booleano(conexao, "ativa")
+    )
+    _criar_indice(
+        conexao, "ix_parcelamento_usuario_ativo", "parcelamento",
+        "usuario_id", where=_booleano(conexao, "ativo")
+    )
+    # Falha (e nada é aplicado) se já houver descrições duplicadas entre os ativos
+    _criar_indice(
+        conexao, "uq_parcelamento_usuario_descricao_ativo", "parcelamento",
+        "usuario_id", "descricao", unique=True, where=_booleano(conexao, "ativo")
+    )
+
+
+def _0003_registro_hash_conteudo(conexao):
+    if not _tem_coluna(conexao, "registro_diario", "hash_conteudo"):
+        conexao.execute(text("ALTER TABLE registro_diario ADD COLUMN hash_conteudo VARCHAR(64)"))
+    _criar_indice(
+        conexao, "uq_registro_diario_usuario_hash", "registro_diario",
+        "usuario_id", "hash_conteudo", unique=True, where="hash_conteudo IS NOT NULL"
+    )
+
+
+def _0004_gasto_categoria_mes(conexao):
+    metadata = MetaData()
+    Table("usuario", metadata, Column("id", Integer, primary_key=True))
+    contadores = Table(
+        "gasto_categoria_mes", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("usuario_id", Integer, ForeignKey("usuario.id"), nullable=False),
+        Column("ano", Integer, nullable=False),
+        Column("mes", Integer, nullable=False),
+        Column("categoria", String(50), nullable=False),
+        Column("total", Numeric(12, 2), nullable=False),
+        Column("quantidade", Integer, nullable=False),
+        UniqueConstraint("usuario_id", "ano", "mes", "categoria", name="uq_gasto_categoria_mes"),
+    )
+    if inspect(conexao).has_table("gasto_categoria_mes"):
+        return
+    contadores.create(conexao)
+
+    # Preenche os contadores com o histórico existente (um INSERT ... SELECT agrupado)
+    registros = _tabela(conexao, "registro_diario")
+    ano = extract("year", registros.c.data_registro)
+    mes = extract("month", registros.c.data_registro)
+    categoria = func.coalesce(registros.c.categoria, "")
+    conexao.execute(insert(contadores).from_select(
+        ["usuario_id", "ano", "mes", "categoria", "total", "quantidade"],
+        select(
+            registros.c.usuario_id, ano, mes, categoria,
+            func.sum(registros.c.valor), func.count(registros.c.id)
+        ).group_by(registros.c.usuario_id, ano, mes, categoria)
+    ))
+
+
+def _0005_historico_fatura_retrato(conexao):
+    # Fechamento de mês: contas, parcelas e salário são um retrato (nulos nos meses
+    # fechados com atraso) e o total de gastos fica nulo entre uma escrita
+    # retroativa e a reconsolidação do mês
+    anulaveis = ("total_gastos_registro", "total_contas_fixas", "total_parcelamentos", "saldo_final")
+    if not _tem_coluna(conexao, "historico_fatura", "salario_mensal"):
+        conexao.execute(text("ALTER TABLE historico_fatura ADD COLUMN salario_mensal NUMERIC(10, 2)"))
+
+    if conexao.dialect.name == "postgresql":
+        for coluna in anulaveis:
+            conexao.execute(text(f"ALTER TABLE historico_fatura ALTER COLUMN {coluna} DROP NOT NULL"))
+        return
+
+    # SQLite não altera restrições de coluna: recria a tabela e copia as linhas
+    metadata = MetaData()
+    Table("usuario", metadata, Column("id", Integer, primary_key=True))
+    nova = Table(
+        "historico_fatura_nova", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("usuario_id", Integer, ForeignKey("usuario.id"), nullable=False),
+        Column("ano", Integer, nullable=False),
+        Column("mes", Integer, nullable=False),
+        *(Column(coluna, Numeric(10, 2)) for coluna in anulaveis),
+        Column("salario_mensal", Numeric(10, 2)),
+        UniqueConstraint("usuario_id", "ano", "mes", name="uq_usuario_mes_ano"),
+    )
+    nova.create(conexao)
+    colunas = ", ".join(nova.c.keys())
+    conexao.execute(text(f"INSERT INTO historico_fatura_nova ({colunas}) SELECT {colunas} FROM historico_fatura"))
+    conexao.execute(text("DROP TABLE historico_fatura"))
+    conexao.execute(text("ALTER TABLE historico_fatura_nova RENAME TO historico_fatura"))
+
+
+def _0006_parcelamento_automatico(conexao):
+    if not _tem_coluna(conexao, "parcelamento", "automatico"):
+        conexao.execute(text(
+            "ALTER TABLE parcelamento ADD COLUMN automatico BOOLEAN NOT NULL DEFAULT FALSE"
+        ))
+
+
+def _0007_versao_dados_usuario(conexao):
+    metadata = MetaData()
+    Table("usuario", metadata, Column("id", Integer, primary_key=True))
+    Table(
+        "versao_dados_usuario", metadata,
+        Column("usuario_id", Integer, ForeignKey("usuario.id"), primary_key=True, autoincrement=False),
+        Column("versao", BigInteger, nullable=False),
+    )
+    metadata.tables["versao_dados_usuario"].create(conexao, checkfirst=True)
+
+
+MIGRACOES = [
+    (1, "esquema_inicial", _0001_esquema_inicial),
+    (2, "indices_consulta", _0002_indices_consulta),
+    (3, "registro_hash_conteudo", _0003_registro_hash_conteudo),
+    (4, "gasto_categoria_mes", _0004_gasto_categoria_mes),
+    (5, "historico_fatura_retrato", _0005_historico_fatura_retrato),
+    (6, "parcelamento_automatico", _0006_parcelamento_automatico),
+    (7, "versao_dados_usuario", _0007_versao_dados_usuario),
+]
+######################################## MIGRAÇÕES ########################################
+
+
+######################################## EXECUÇÃO ########################################
+_versao_metadata = MetaData()
+versao_schema = Table(
+    TABELA_VERSAO, _versao_metadata,
+    Column("versao", Integer, primary_key=True, autoincrement=False),
+    Column("nome", String(100), nullable=False),
+    Column("aplicada_em", DateTime, nullable=False),
+)
+
+
+def versoes_aplicadas(conexao):
+    if not inspect(conexao).has_table(TABELA_VERSAO):
+        return set()
+    return set(conexao.execute(select(versao_schema.c.versao)).scalars())
+
+
+def migracoes_pendentes(conexao):
+    aplicadas = versoes_aplicadas(conexao)
+    return [migracao for migracao in MIGRACOES if migracao[0] not in aplicadas]
+
+
+def aplicar_migracoes(engine, ate=None):
+    # Uma transação por migração (DDL é transacional no Postgres): se uma falhar,
+    # as anteriores continuam registradas e a próxima execução retoma dali
+    aplicadas = []
+    with engine.connect() as conexao:
+        postgres = conexao.dialect.name == "postgresql"
+        if postgres:
+            conexao.execute(text("SELECT pg_advisory_lock(:chave)"), {"chave": CHAVE_LOCK_MIGRACAO})
+            conexao.commit()
+        try:
+            with conexao.begin():
+                versao_schema.create(conexao, checkfirst=True)
+                pendentes = migracoes_pendentes(conexao)
+
+            for versao, nome, migracao in pendentes:
+                if ate is not None and versao > ate:
+                    break
+                with conexao.begin():
+                    migracao(conexao)
+                    conexao.execute(insert(versao_schema).values(
+                        versao=versao, nome=nome, aplicada_em=datetime.now(timezone.utc).replace(tzinfo=None)
+                    ))
+                aplicadas.append((versao, nome))
+        finally:
+            if postgres:
+                conexao.execute(text("SELECT pg_advisory_unlock(:chave)"), {"chave": CHAVE_LOCK_MIGRACAO})
+                conexao.commit()
+    return aplicadas
+######################################## EXECUÇÃO ########################################
+
+
+@click.command("migrar")
+@click.option("--ate", type=int, default=None, help="Aplica só até esta versão.")
+@click.option("--pendentes", is_flag=True, help="Apenas lista as migrações ainda não aplicadas.")
+@with_appcontext
+def migrar_command(ate, pendentes):
+    """Aplica as migrações de esquema pendentes (uma vez por deploy, fora dos workers)."""
+    if pendentes:
+        with db.engine.connect() as conexao:
+            lista = migracoes_pendentes(conexao)
+        for versao, nome, _ in lista:
+            click.echo(f"{versao:04d} {nome}")
+        click.echo(f"{len(lista)} migração(ões) pendente(s).")
+        return
+
+    aplicadas = aplicar_migracoes(db.engine, ate)
+    for versao, nome in aplicadas:
+        click.echo(f"{versao:04d} {nome} aplicada.")
+    click.echo(f"{len(aplicadas)} migração(ões) aplicada(s).")
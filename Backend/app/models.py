@@ -24,6 +24,12 @@ class Usuario(db.Model):
     historicos_fatura = db.relationship(
         "HistoricoFatura", backref="usuario", cascade="all, delete-orphan"
     )
+    gastos_categoria_mes = db.relationship(
+        "GastoCategoriaMes", backref="usuario", cascade="all, delete-orphan"
+    )
+    versao_dados = db.relationship(
+        "VersaoDadosUsuario", backref="usuario", cascade="all, delete-orphan"
+    )
 
      # Segurança
     def set_password(self, password):
@@ -44,6 +50,16 @@ class ContaFixa(db.Model):
     dia_vencimento = db.Column(db.Integer, nullable=False)
     ativa = db.Column(db.Boolean, default=True)
 
+    __table_args__ = (
+        # Índice parcial: só as contas ativas (soma_contas_fixas, listagem)
+        db.Index(
+            "ix_conta_fixa_usuario_ativa",
+            "usuario_id",
+            postgresql_where=db.text("ativa"),
+            sqlite_where=db.text("ativa = 1"),
+        ),
+    )
+
 
 class Parcelamento(db.Model):
     __tablename__ = "parcelamento"
@@ -58,10 +74,49 @@ class Parcelamento(db.Model):
     parcelas_restantes = db.Column(db.Integer, nullable=False)
     data_inicio = db.Column(db.Date, nullable=False)
     ativo = db.Column(db.Boolean, default=True)
+    # Cronograma automático: progresso calculado a partir de data_inicio (app/cronograma.py)
+    automatico = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+
+    __table_args__ = (
+        # Índices parciais sobre os parcelamentos em andamento
+        db.Index(
+            "ix_parcelamento_usuario_ativo",
+            "usuario_id",
+            postgresql_where=db.text("ativo"),
+            sqlite_where=db.text("ativo = 1"),
+        ),
+        # Uma descrição por usuário entre os ativos: a checagem de duplicidade
+        # de criar_parcela é feita pelo banco (IntegrityError => 409)
+        db.Index(
+            "uq_parcelamento_usuario_descricao_ativo",
+            "usuario_id",
+            "descricao",
+            unique=True,
+            postgresql_where=db.text("ativo"),
+            sqlite_where=db.text("ativo = 1"),
+        ),
+    )
 
 
 class RegistroDiario(db.Model):
     __tablename__ = "registro_diario"
+    __table_args__ = (
+        # Cobre agregados por período e a paginação keyset (INCLUDE só no Postgres)
+        db.Index(
+            "ix_registro_diario_usuario_data",
+            "usuario_id", "data_registro", "id",
+            postgresql_include=["valor", "categoria"],
+        ),
+        # Deduplicação de extratos importados (linhas manuais ficam com hash nulo)
+        db.Index(
+            "uq_registro_diario_usuario_hash",
+            "usuario_id",
+            "hash_conteudo",
+            unique=True,
+            postgresql_where=db.text("hash_conteudo IS NOT NULL"),
+            sqlite_where=db.text("hash_conteudo IS NOT NULL"),
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey("usuario.id"), nullable=False)
@@ -70,6 +125,7 @@ class RegistroDiario(db.Model):
     categoria = db.Column(db.String(50))
     valor = db.Column(db.Numeric(10, 2), nullable=False)
     data_registro = db.Column(db.Date, default=date.today, nullable=False)
+    hash_conteudo = db.Column(db.String(64))
 
 
 class HistoricoFatura(db.Model):
@@ -84,7 +140,39 @@ class HistoricoFatura(db.Model):
     ano = db.Column(db.Integer, nullable=False)
     mes = db.Column(db.Integer, nullable=False)
 
-    total_gastos_registro = db.Column(db.Numeric(10, 2), nullable=False)
-    total_contas_fixas = db.Column(db.Numeric(10, 2), nullable=False)
-    total_parcelamentos = db.Column(db.Numeric(10, 2), nullable=False)
-    saldo_final = db.Column(db.Numeric(10, 2), nullable=False)
+    # Nulo enquanto uma escrita retroativa deixa o mês pendente de reconsolidação
+    total_gastos_registro = db.Column(db.Numeric(10, 2))
+    # Retrato tirado ao fechar o mês recém-encerrado (app/fechamento.py); nulo
+    # nos meses fechados com atraso, que não têm como ser reconstruídos
+    salario_mensal = db.Column(db.Numeric(10, 2))
+    total_contas_fixas = db.Column(db.Numeric(10, 2))
+    total_parcelamentos = db.Column(db.Numeric(10, 2))
+    saldo_final = db.Column(db.Numeric(10, 2))
+
+
+class GastoCategoriaMes(db.Model):
+    # Contadores por usuário/mês/categoria, mantidos na mesma transação das escritas
+    # em registro_diario (ver app/contadores.py).
+    __tablename__ = "gasto_categoria_mes"
+    __table_args__ = (
+        db.UniqueConstraint("usuario_id", "ano", "mes", "categoria", name="uq_gasto_categoria_mes"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey("usuario.id"), nullable=False)
+
+    ano = db.Column(db.Integer, nullable=False)
+    mes = db.Column(db.Integer, nullable=False)
+    categoria = db.Column(db.String(50), nullable=False)
+
+    total = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+
+
+class VersaoDadosUsuario(db.Model):
+    # Sobe a cada escrita do usuário, na mesma transação (ver app/versao_dados.py);
+    # tabela própria e estreita para o UPDATE frequente não regravar a linha de usuario
+    __tablename__ = "versao_dados_usuario"
+
+    usuario_id = db.Column(db.Integer, db.ForeignKey("usuario.id"), primary_key=True)
+    versao = db.Column(db.BigInteger, nullable=False, default=0)
@@ -0,0 +1,168 @@
+from datetime import date
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import text
+from app.extensions import db
+
+TABELA = "registro_diario"
+PARTICAO_HISTORICO = "registro_diario_historico"
+PARTICAO_PADRAO = "registro_diario_padrao"
+GRANULARIDADES = ("mes", "ano")
+
+
+######################################## FAIXAS DE PARTIÇÃO ########################################
+# Particionamento declarativo (RANGE em data_registro), opcional e só no Postgres.
+# Os filtros semiabertos [inicio, fim) das rotas já permitem partition pruning.
+def inicio_periodo(dia, granularidade):
+    return date(dia.year, 1, 1) if granularidade == "ano" else date(dia.year, dia.month, 1)
+
+
+def proximo_periodo(inicio, granularidade):
+    if granularidade == "ano":
+        return date(inicio.year + 1, 1, 1)
+    return date(inicio.year + 1, 1, 1) if inicio.month == 12 else date(inicio.year, inicio.month + 1, 1)
+
+
+def nome_particao(inicio, granularidade):
+    if granularidade == "ano":
+        return f"{TABELA}_p{inicio.year}"
+    return f"{TABELA}_p{inicio.year}_{inicio.month:02d}"
+
+
+def faixas_particao(inicio, fim, granularidade):
+    # [(nome, de, ate), ...] cobrindo [inicio, fim) sem lacunas
+    faixas = []
+    atual = inicio_periodo(inicio, granularidade)
+    while atual < fim:
+        seguinte = proximo_periodo(atual, granularidade)
+        faixas.append((nome_particao(atual, granularidade), atual, seguinte))
+        atual = seguinte
+    return faixas
+######################################## FAIXAS DE PARTIÇÃO ########################################
+
+
+######################################## DDL ########################################
+def ddl_migracao(corte, granularidade):
+    # Converte a tabela existente sem copiar linhas: ela vira a partição histórica
+    # [MINVALUE, corte) e a tabela particionada assume o nome e a sequence do id.
+    # Chaves únicas de tabela particionada precisam conter a chave de partição;
+    # como hash_conteudo já inclui a data (importacao.hash_conteudo), o índice
+    # (usuario_id, hash_conteudo, data_registro) continua barrando reimportações.
+    return [
+        f"LOCK TABLE {TABELA} IN ACCESS EXCLUSIVE MODE",
+        f"ALTER TABLE {TABELA} RENAME TO {PARTICAO_HISTORICO}",
+        # A PK (id) antiga dá lugar à PK (id, data_registro) criada pelo ATTACH
+        f"ALTER TABLE {PARTICAO_HISTORICO} DROP CONSTRAINT IF EXISTS {TABELA}_pkey",
+        f"ALTER INDEX IF EXISTS ix_{TABELA}_usuario_data RENAME TO ix_{PARTICAO_HISTORICO}_usuario_data",
+        f"ALTER INDEX IF EXISTS uq_{TABELA}_usuario_hash RENAME TO uq_{PARTICAO_HISTORICO}_usuario_hash",
+        f"CREATE TABLE {TABELA} (LIKE {PARTICAO_HISTORICO} INCLUDING DEFAULTS) PARTITION BY RANGE (data_registro)",
+        f"ALTER TABLE {TABELA} ADD CONSTRAINT {TABELA}_pkey PRIMARY KEY (id, data_registro)",
+        f"ALTER TABLE {TABELA} ADD CONSTRAINT {TABELA}_usuario_id_fkey FOREIGN KEY (usuario_id) REFERENCES usuario (id)",
+        f"ALTER SEQUENCE IF EXISTS {TABELA}_id_seq OWNED BY {TABELA}.id",
+        f"CREATE INDEX ix_{TABELA}_usuario_data ON {TABELA} (usuario_id, data_registro, id) INCLUDE (valor, categoria)",
+        f"CREATE UNIQUE INDEX uq_{TABELA}_usuario_hash ON {TABELA} (usuario_id, hash_conteudo, data_registro) "
+        f"WHERE hash_conteudo IS NOT NULL",
+        # CHECK validado antes do ATTACH: o Postgres não precisa varrer de novo
+        f"ALTER TABLE {PARTICAO_HISTORICO} ADD CONSTRAINT {PARTICAO_HISTORICO}_faixa "
+        f"CHECK (data_registro IS NOT NULL AND data_registro < DATE '{corte.isoformat()}')",
+        f"ALTER TABLE {TABELA} ATTACH PARTITION {PARTICAO_HISTORICO} "
+        f"FOR VALUES FROM (MINVALUE) TO ('{corte.isoformat()}')",
+        f"CREATE TABLE {PARTICAO_PADRAO} PARTITION OF {TABELA} DEFAULT",
+        f"COMMENT ON TABLE {TABELA} IS 'particionado:{granularidade}'",
+    ]
+
+
+def ddl_nova_particao(nome, de, ate):
+    # Cria fora da tabela, traz o que caiu na partição DEFAULT e só então anexa:
+    # funciona mesmo se a manutenção atrasou e já há linhas nessa faixa
+    faixa = f"data_registro >= DATE '{de.isoformat()}' AND data_registro < DATE '{ate.isoformat()}'"
+    return [
+        f"CREATE TABLE {nome} (LIKE {TABELA} INCLUDING DEFAULTS)",
+        f"INSERT INTO {nome} SELECT * FROM {PARTICAO_PADRAO} WHERE {faixa}",
+        f"DELETE FROM {PARTICAO_PADRAO} WHERE {faixa}",
+        f"ALTER TABLE {TABELA} ATTACH PARTITION {nome} FOR VALUES FROM ('{de.isoformat()}') TO ('{ate.isoformat()}')",
+    ]
+
+
+def ddl_brin(nome):
+    # Partições antigas só recebem escritas raras: BRIN em data_registro cobre
+    # varreduras por período (fechamento, exportação) com índice de poucos KB
+    return f"CREATE INDEX IF NOT EXISTS brin_{nome}_data ON {nome} USING brin (data_registro) WITH (pages_per_range = 32)"
+######################################## DDL ########################################
+
+
+######################################## MANUTENÇÃO ########################################
+def granularidade_atual(conexao):
+    # None => tabela não particionada
+    comentario = conexao.execute(text(f"SELECT obj_description('{TABELA}'::regclass, 'pg_class')")).scalar()
+    if comentario and comentario.startswith("particionado:"):
+        return comentario.split(":", 1)[1]
+    return None
+
+
+def particoes_existentes(conexao):
+    return set(conexao.execute(text(
+        "SELECT filha.relname FROM pg_inherits "
+        "JOIN pg_class filha ON filha.oid = pg_inherits.inhrelid "
+        "JOIN pg_class pai ON pai.oid = pg_inherits.inhparent "
+        "WHERE pai.relname = :tabela"
+    ), {"tabela": TABELA}).scalars())
+
+
+def manter_particoes(conexao, granularidade=None, migrar=False, periodos_futuros=3, brin_apos=3, hoje=None):
+    hoje = hoje or date.today()
+    corte = None
+
+    atual = granularidade_atual(conexao)
+    if atual is None:
+        if not migrar:
+            raise click.ClickException(f"{TABELA} não é particionada; use --migrar para converter.")
+        atual = granularidade or "mes"
+        corte = inicio_periodo(hoje, atual)
+        for comando in ddl_migracao(corte, atual):
+            conexao.execute(text(comando))
+
+    # 1. Partições até `periodos_futuros` períodos à frente do atual
+    existentes = particoes_existentes(conexao)
+    fim = inicio_periodo(hoje, atual)
+    for _ in range(periodos_futuros + 1):
+        fim = proximo_periodo(fim, atual)
+    inicio = corte or inicio_periodo(hoje, atual)
+    criadas = []
+    for nome, de, ate in faixas_particao(inicio, fim, atual):
+        if nome not in existentes:
+            for comando in ddl_nova_particao(nome, de, ate):
+                conexao.execute(text(comando))
+            criadas.append(nome)
+
+    # 2. BRIN nas partições encerradas há mais de `brin_apos` períodos (e na histórica)
+    limite = inicio_periodo(hoje, atual)
+    for _ in range(brin_apos):
+        limite = inicio_periodo(date.fromordinal(limite.toordinal() - 1), atual)
+    antigas = [PARTICAO_HISTORICO] if PARTICAO_HISTORICO in existentes | set(criadas) else []
+    antigas += [
+        nome for nome, _, ate in faixas_particao(date(2000, 1, 1), limite, atual)
+        if nome in existentes and ate <= limite
+    ]
+    for nome in antigas:
+        conexao.execute(text(ddl_brin(nome)))
+
+    return atual, criadas, antigas
+######################################## MANUTENÇÃO ########################################
+
+
+@click.command("particoes-registro")
+@click.option("--migrar", is_flag=True, help="Converte registro_diario existente em tabela particionada.")
+@click.option("--granularidade", type=click.Choice(GRANULARIDADES), default=None, help="Usada só na conversão.")
+@click.option("--futuras", type=int, default=3, help="Períodos futuros a manter criados.")
+@click.option("--brin-apos", type=int, default=3, help="Períodos encerrados até ganhar índice BRIN.")
+@with_appcontext
+def particoes_registro_command(migrar, granularidade, futuras, brin_apos):
+    """Particiona registro_diario (opcional) e mantém partições futuras e BRIN."""
+    if db.engine.dialect.name != "postgresql":
+        raise click.ClickException("Particionamento disponível apenas no PostgreSQL.")
+
+    with db.engine.begin() as conexao:
+        atual, criadas, antigas = manter_particoes(conexao, granularidade, migrar, futuras, brin_apos)
+
+    click.echo(f"Particionamento por {atual}: {len(criadas)} partição(ões) criada(s), BRIN em {len(antigas)}.")
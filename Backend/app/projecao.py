@@ -0,0 +1,88 @@
+from datetime import date
+import numpy as np
+from sqlalchemy import Integer, cast, extract, func, select
+from app.extensions import db
+from app.models import ContaFixa, Parcelamento, Usuario
+from app.cronograma import filtro_parcelas_ativas, parcelas_pagas_efetivas, parcelas_restantes_efetivas
+
+PROJECAO_MESES_PADRAO = 12
+PROJECAO_MESES_MAXIMO = 120
+
+
+######################################## MATRIZ DE OBRIGAÇÕES ########################################
+# Linhas = meses projetados (0 = mês atual), colunas = parcelamentos. A célula
+# (m, k) vale valor_parcela[k] se o parcelamento k tem parcela a pagar no mês m:
+# as parcelas restantes caem em meses consecutivos a partir do próximo vencimento
+# (ou do mês atual, se o próximo vencimento já passou sem pagamento).
+def matriz_obrigacoes(inicio, restantes, valores, meses):
+    indices = np.arange(meses)[:, np.newaxis]
+    ativa = (indices >= inicio) & (indices < inicio + restantes)
+    return ativa * valores
+
+
+def projetar_fluxo(inicio, restantes, valores, meses, salario, contas_fixas):
+    # Vetores (meses,): obrigações com parcelas, saldo do mês e saldo acumulado
+    parcelas = matriz_obrigacoes(inicio, restantes, valores, meses).sum(axis=1)
+    saldo = salario - contas_fixas - parcelas
+    return parcelas, saldo, np.cumsum(saldo)
+######################################## MATRIZ DE OBRIGAÇÕES ########################################
+
+
+######################################## PROJEÇÃO DO USUÁRIO ########################################
+def _indice_mes(ano, mes):
+    return ano * 12 + mes - 1
+
+
+def projecao_parcelas(usuario_id, meses=PROJECAO_MESES_PADRAO, hoje=None):
+    hoje = hoje or date.today()
+    atual = _indice_mes(hoje.year, hoje.month)
+
+    base = db.session.execute(
+        select(
+            Usuario.salario_mensal,
+            select(func.coalesce(func.sum(ContaFixa.valor), 0))
+            .where(ContaFixa.usuario_id == usuario_id, ContaFixa.ativa == True)
+            .scalar_subquery(),
+        ).where(Usuario.id == usuario_id)
+    ).first()
+    if base is None:
+        return None
+    salario, contas_fixas = float(base[0] or 0), float(base[1] or 0)
+
+    # Mês (índice absoluto) da próxima parcela em aberto = início + parcelas pagas
+    proximo = cast(
+        extract("year", Parcelamento.data_inicio) * 12 + extract("month", Parcelamento.data_inicio) - 1
+        + parcelas_pagas_efetivas(hoje),
+        Integer
+    )
+    linhas = db.session.execute(
+        select(proximo, parcelas_restantes_efetivas(hoje), Parcelamento.valor_parcela).where(
+            Parcelamento.usuario_id == usuario_id,
+            Parcelamento.data_inicio.isnot(None),
+            filtro_parcelas_ativas(hoje),
+        )
+    ).all()
+
+    quantidade = len(linhas)
+    inicio = np.fromiter((linha[0] for linha in linhas), dtype=np.int64, count=quantidade) - atual
+    np.maximum(inicio, 0, out=inicio)
+    restantes = np.fromiter((linha[1] for linha in linhas), dtype=np.int64, count=quantidade)
+    valores = np.fromiter((linha[2] for linha in linhas), dtype=np.float64, count=quantidade)
+
+    parcelas, saldo, acumulado = projetar_fluxo(inicio, restantes, valores, meses, salario, contas_fixas)
+
+    return {
+        "salario_mensal": round(salario, 2),
+        "soma_contas_fixas": round(contas_fixas, 2),
+        "meses": [
+            {
+                "mes": f"{(atual + m) // 12:04d}-{(atual + m) % 12 + 1:02d}",
+                "parcelas": round(float(parcelas[m]), 2),
+                "saldo_previsto": round(float(saldo[m]), 2),
+                "saldo_acumulado": round(float(acumulado[m]), 2),
+            }
+            for m in range(meses)
+        ],
+        "total_parcelas": round(float(parcelas.sum()), 2),
+    }
+######################################## PROJEÇÃO DO USUÁRIO ########################################
@@ -0,0 +1,112 @@
+import threading
+import time
+from flask import g, request
+from flask_jwt_extended import decode_token, get_jwt_identity
+from sqlalchemy import create_engine
+from app.conexoes import opcoes_engine
+from app.extensions import cliente_redis
+
+# Blueprints cujas rotas GET só leem dados e podem ir para a réplica
+BLUEPRINTS_REPLICA = {"dashboard", "registro", "parcelas", "contas_fixas"}
+METODOS_ESCRITA = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+######################################## LEIA SUAS ESCRITAS ########################################
+# Após uma escrita bem-sucedida, as leituras do mesmo usuário ficam no primário
+# durante a janela (atraso de replicação). A próxima leitura pode cair em outro
+# worker: com REDIS_URL a janela fica no Redis, visível a todos; sem ele, fica na
+# memória do processo e só vale para implantações com um único worker.
+class JanelaEscritas:
+    def __init__(self, segundos=5, tamanho_maximo=10000):
+        self.segundos = segundos
+        self.tamanho_maximo = tamanho_maximo
+        self._ate = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, usuario_id):
+        agora = time.monotonic()
+        with self._lock:
+            self._ate[usuario_id] = agora + self.segundos
+            if len(self._ate) > self.tamanho_maximo:
+                self._ate = {uid: ate for uid, ate in self._ate.items() if ate > agora}
+
+    def ativa(self, usuario_id):
+        with self._lock:
+            ate = self._ate.get(usuario_id)
+        return ate is not None and ate > time.monotonic()
+
+
+class JanelaEscritasRedis:
+    # Uma chave por usuário com expiração = janela (o relógio é o do Redis)
+    def __init__(self, cliente, segundos=5, prefixo="finango:escrita"):
+        self.cliente = cliente
+        self.segundos = segundos
+        self.prefixo = prefixo
+
+    def registrar(self, usuario_id):
+        if self.segundos > 0:
+            self.cliente.set(f"{self.prefixo}:{usuario_id}", b"1", px=int(self.segundos * 1000))
+
+    def ativa(self, usuario_id):
+        return self.cliente.get(f"{self.prefixo}:{usuario_id}") is not None
+
+
+def criar_janela_escritas(app):
+    segundos = app.config["DATABASE_REPLICA_JANELA"]
+    if app.config.get("REDIS_URL"):
+        return JanelaEscritasRedis(cliente_redis(app), segundos=segundos)
+    return JanelaEscritas(segundos=segundos)
+######################################## LEIA SUAS ESCRITAS ########################################
+
+
+######################################## ROTEAMENTO DE LEITURAS ########################################
+def _identidade_atual():
+    # A identidade vem do JWT já validado pela rota (None em rotas públicas)
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        return None
+
+
+def _identidade_do_token():
+    # Antes da rota o JWT ainda não foi validado: decode_token confere a assinatura,
+    # mas aceita token expirado (o "sub" só decide primário x réplica; a
+    # autenticação, inclusive a expiração, continua no @jwt_required)
+    cabecalho = request.headers.get("Authorization", "")
+    if not cabecalho.startswith("Bearer "):
+        return None
+    try:
+        return decode_token(cabecalho[7:], allow_expired=True)["sub"]
+    except Exception:
+        return None
+
+
+def instalar_roteamento_replica(app):
+    # Engine próprio (fora de SQLALCHEMY_BINDS): a réplica não tem metadata nem
+    # create_all, só recebe as leituras roteadas pela SessaoRoteada
+    replica_url = app.config.get("DATABASE_REPLICA_URL")
+    if not replica_url:
+        return
+    app.extensions["engine_replica"] = create_engine(replica_url, **opcoes_engine(replica_url))
+
+    app.extensions["janela_escritas"] = criar_janela_escritas(app)
+
+    @app.before_request
+    def escolher_banco():
+        g.usar_replica = False
+        if request.method != "GET":
+            return
+        if request.blueprint not in BLUEPRINTS_REPLICA:
+            return
+        usuario_id = _identidade_do_token()
+        janela = app.extensions["janela_escritas"]
+        g.usar_replica = usuario_id is None or not janela.ativa(str(usuario_id))
+
+    @app.after_request
+    def registrar_escrita(response):
+        if request.method in METODOS_ESCRITA and response.status_code < 400:
+            usuario_id = _identidade_atual()
+            if usuario_id is not None:
+                app.extensions["janela_escritas"].registrar(str(usuario_id))
+        return response
+######################################## ROTEAMENTO DE LEITURAS ########################################
@@ -1,17 +1,31 @@
 import token
-from flask import Blueprint, app, request, jsonify, current_app
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask import Blueprint, app, request, jsonify, current_app, Response, stream_with_context
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, current_user
 from app import jwt
 from pydantic import BaseModel, ValidationError, constr
 from app.extensions import db
 from app.models import ContaFixa, RegistroDiario, Usuario, Parcelamento, HistoricoFatura
+from app.contadores import registrar_gasto, registrar_gastos_lote, remover_gasto, alterar_gasto_contadores
+from app.fechamento import gastos_consolidados_ano, invalidar_fechamento
+from app.cronograma import (
+    filtro_parcelas_ativas, filtro_parcelas_encerradas, parcelas_pagas_efetivas,
+    parcelas_restantes_efetivas, progresso_parcela, proximo_vencimento
+)
+from app.importacao import ErroImportacao, importar_extrato
+from app.projecao import PROJECAO_MESES_MAXIMO, PROJECAO_MESES_PADRAO, projecao_parcelas
+from app.exportacao import lotes_exportacao, gerar_csv_gzip, gerar_parquet
+from app.usuario_atual import cache_usuarios, resolver_usuario_atual, invalidar_usuario
+from app.cache_respostas import resposta_em_cache
+from app.services import CATEGORIAS_VALIDAS, intervalo_mes, intervalo_ano, filtro_registros_periodo, gastos_por_categoria, gastos_por_mes, matriz_anual, resumo_registros, resumo_dashboard
 from datetime import date, datetime, timedelta
-from sqlalchemy import func, text
+from sqlalchemy import func, select, text, tuple_, update
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 import time
 import re
-from sqlalchemy.exc import SQLAlchemyError
+import base64
+import codecs
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from flask_jwt_extended.exceptions import NoAuthorizationError, InvalidHeaderError
 # Total de rotas = 26 (28/04/2026)
 ######################################## BLUEPRINTS DE ROTAS ########################################
@@ -30,6 +44,114 @@ class LoginSchema(BaseModel):
 LOGIN_MAX_FAILED_ATTEMPTS = 5
 #######################################SCHEMA DE ROTAS########################################
 
+#######################################PARÂMETROS DE ROTAS########################################
+def parametro_completo():
+    # ?completo=true faz os endpoints de gráfico devolverem totais e percentuais juntos
+    return request.args.get("completo", "").strip().lower() in ("1", "true", "sim")
+
+def descricao_parcela_duplicada(erro):
+    # Só a violação do índice único parcial vira 409; NOT NULL, FK etc. não.
+    # O Postgres cita o nome do índice; o SQLite, só as colunas dele.
+    mensagem = str(getattr(erro, "orig", erro))
+    return (
+        "uq_parcelamento_usuario_descricao_ativo" in mensagem
+        or "parcelamento.usuario_id, parcelamento.descricao" in mensagem
+    )
+
+REGISTRO_PAGINA_MAXIMA = 500
+
+def codificar_cursor(data_registro, registro_id):
+    # Cursor opaco para o cliente: posição (data, id) do último item da página
+    bruto = f"{data_registro.isoformat()}|{registro_id}"
+    return base64.urlsafe_b64encode(bruto.encode()).decode()
+
+def decodificar_cursor(cursor):
+    try:
+        data_raw, id_raw = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return date.fromisoformat(data_raw), int(id_raw)
+    except Exception:
+        raise ValueError("cursor inválido")
+#######################################PARÂMETROS DE ROTAS########################################
+
+#######################################RESPOSTAS EM STREAMING########################################
+STREAM_LOTE = 500
+
+def parametro_stream():
+    # ?stream=true troca a lista montada em memória por uma resposta em streaming
+    return request.args.get("stream", "").strip().lower() in ("1", "true", "sim")
+
+def resposta_json_streaming(stmt, projecao, chave=None, extras=None):
+    # Lê as linhas em lotes (yield_per usa cursor do lado do servidor no Postgres)
+    # e escreve cada elemento do array JSON assim que é serializado.
+    def gerar():
+        dumps = current_app.json.dumps
+        yield '{"%s": [' % chave if chave else "["
+        primeiro = True
+        for linha in db.session.execute(stmt.execution_options(yield_per=STREAM_LOTE)):
+            yield ("" if primeiro else ",") + dumps(serializar_linha(projecao, linha))
+            primeiro = False
+        fim = "]"
+        for nome, valor in (extras or {}).items():
+            fim += ", %s: %s" % (dumps(nome), dumps(valor))
+        yield fim + ("}" if chave else "")
+
+    return Response(stream_with_context(gerar()), mimetype="application/json")
+#######################################RESPOSTAS EM STREAMING########################################
+
+#######################################SERIALIZAÇÃO########################################
+# Leitura sem hidratação de entidades: SELECT só das colunas projetadas (tuplas,
+# sem identity map nem instrumentação) e um único serializador campo -> conversor.
+def _dinheiro(valor):
+    return round(float(valor), 2)
+
+def _iso(valor):
+    return valor.isoformat()
+
+PROJECAO_GASTO = {
+    "id": (RegistroDiario.id, None),
+    "descricao": (RegistroDiario.descricao, None),
+    "valor": (RegistroDiario.valor, _dinheiro),
+    "categoria": (RegistroDiario.categoria, None),
+    "data_registro": (RegistroDiario.data_registro, None),
+}
+
+PROJECAO_CONTA = {
+    "id": (ContaFixa.id, None),
+    "nome": (ContaFixa.nome, None),
+    "valor": (ContaFixa.valor, _dinheiro),
+    "dia_vencimento": (ContaFixa.dia_vencimento, None),
+    "ativa": (ContaFixa.ativa, None),
+}
+
+def projecao_parcela(hoje=None):
+    # Progresso e próximo vencimento vêm do cronograma quando o parcelamento é automático
+    return {
+        "id": (Parcelamento.id, None),
+        "descricao": (Parcelamento.descricao, None),
+        "valor_total": (Parcelamento.valor_total, _dinheiro),
+        "valor_parcela": (Parcelamento.valor_parcela, _dinheiro),
+        "parcelas_totais": (Parcelamento.parcelas_totais, None),
+        "parcelas_restantes": (parcelas_restantes_efetivas(hoje), None),
+        "parcelas_pagas": (parcelas_pagas_efetivas(hoje), None),
+        "proximo_vencimento": (proximo_vencimento(hoje), _iso),
+        "data_inicio": (Parcelamento.data_inicio, _iso),
+        "ativo": (filtro_parcelas_ativas(hoje), None),
+        "automatico": (Parcelamento.automatico, None),
+    }
+
+def selecionar(projecao):
+    return select(*(coluna for coluna, _ in projecao.values()))
+
+def serializar_linha(projecao, linha):
+    return {
+        campo: conversor(valor) if conversor and valor is not None else valor
+        for (campo, (_, conversor)), valor in zip(projecao.items(), linha)
+    }
+
+def serializar_linhas(projecao, stmt):
+    return [serializar_linha(projecao, linha) for linha in db.session.execute(stmt)]
+#######################################SERIALIZAÇÃO########################################
+
 #######################################TRATAMENTO DE JWT EM ROTAS########################################
 @jwt.unauthorized_loader # Tratamento de Token Ausente
 def unauthorized_response(callback):
@@ -65,6 +187,26 @@ def invalid_header_error(e):
         "ok": False,
         "error": "Cabeçalho de autenticação inválido"
     }), 401
+
+@jwt.user_lookup_loader # Resolve current_user uma vez por requisição
+def carregar_usuario_atual(jwt_header, jwt_payload):
+    # Ids já validados vêm do cache (sem SELECT); os demais custam um get por PK
+    return resolver_usuario_atual(jwt_payload.get(current_app.config["JWT_IDENTITY_CLAIM"]))
+
+@jwt.user_lookup_error_loader # Tratamento de Usuário Inexistente
+def user_lookup_error(jwt_header, jwt_payload):
+    return jsonify({
+        "ok": False,
+        "error": "Usuário não encontrado ou sessão expirada"
+    }), 401
+
+@auth_bp.app_errorhandler(SQLAlchemyError) # Banco indisponível fora do try das rotas (ex.: resolução do usuário)
+def database_error(e):
+    db.session.rollback()
+    return jsonify({
+        "ok": False,
+        "error": "Erro temporário de conexão com o banco"
+    }), 503
 #######################################TRATAMENTO DE JWT EM ROTAS########################################
 
 
@@ -190,6 +332,8 @@ def login():
         identity=str(usuario.id), 
         expires_delta=timedelta(minutes=15) 
     )
+    # Login acabou de provar que o usuário existe: já entra no cache do current_user
+    cache_usuarios().adicionar(usuario.id)
 
     return jsonify({
         "message": "Login realizado com sucesso",
@@ -229,8 +373,8 @@ def get_user_info():
             
         user_id = int(raw_identity)
 
-        # 2. Busca com tratamento de erro de conexão/sessão
-        usuario = db.session.get(Usuario, user_id)
+        # 2. Usuário resolvido pelo user_lookup_loader (no máximo uma busca por requisição)
+        usuario = current_user.carregar()
 
         if usuario is None:
             # Retornamos 401 ou 404. Em sistemas financeiros, 401 é mais seguro 
@@ -285,7 +429,7 @@ def update_user():
             return jsonify({"error": "Tentativa de alteração não autorizada"}), 403
 
         # 3. Busca rigorosa no banco de dados
-        usuario = db.session.get(Usuario, int(user_id_from_token))
+        usuario = current_user.carregar()
 
         if not usuario:
             return jsonify({"error": "Usuário inexistente ou conta desativada"}), 404
@@ -315,6 +459,7 @@ def update_user():
 
         # 6. Persistência
         db.session.commit()
+        invalidar_usuario(usuario.id)
 
         return jsonify({
             "message": "Dados atualizados com sucesso",
@@ -356,8 +501,8 @@ def get_salario_mensal():
         if not user_id_from_token:
             return jsonify({"error": "Identidade do token inválida"}), 401
 
-        # 2. Busca segura usando db.session.get() (método atualizado)
-        usuario = db.session.get(Usuario, int(user_id_from_token))
+        # 2. Usuário resolvido pelo user_lookup_loader (no máximo uma busca por requisição)
+        usuario = current_user.carregar()
 
         if not usuario:
             return jsonify({"error": "Usuário não encontrado ou sessão expirada"}), 401
@@ -378,6 +523,7 @@ def get_salario_mensal():
 ############################## SOMA CONTAS FIXAS PARA DASHBOARD ##############################
 @dashboard_bp.route("/somacontasfixas", methods=["GET"])
 @jwt_required()
+@resposta_em_cache
 def soma_contas_fixas():
     try:
         # 1. Fonte da Verdade: Identidade do Token JWT (Anti-IDOR)
@@ -385,10 +531,7 @@ def soma_contas_fixas():
         if not user_id_from_token:
             return jsonify({"error": "Identidade do token inválida"}), 401
 
-        # 2. Verifica se o usuário existe
-        usuario = db.session.get(Usuario, int(user_id_from_token))
-        if not usuario:
-            return jsonify({"error": "Usuário não encontrado ou sessão expirada"}), 401
+        # 2. Existência do usuário já garantida pelo user_lookup_loader
 
         # 3. Soma segura com escopo restrito ao usuário logado
         soma = db.session.query(db.func.sum(ContaFixa.valor)).filter_by(
@@ -411,6 +554,7 @@ def soma_contas_fixas():
 ############################# TOTAL GASTO POR MÊS/ANO #################################
 @dashboard_bp.route("/total-gasto-mes-dashboard", methods=["GET"])
 @jwt_required()
+@resposta_em_cache
 def total_gasto_mes():
     try:
         # 1. Fonte da Verdade: JWT (Anti-IDOR)
@@ -428,23 +572,9 @@ def total_gasto_mes():
         if ano < 2000 or ano > 2100:
             return jsonify({"error": "Ano inválido"}), 400
 
-        # 2. Consulta restrita ao dono do token
-        total = db.session.query(func.sum(RegistroDiario.valor)).filter(
-            RegistroDiario.usuario_id == int(user_id_from_token),
-            db.extract('month', RegistroDiario.data_registro) == mes,
-            db.extract('year', RegistroDiario.data_registro) == ano
-        ).scalar() or 0
-
-        count = db.session.query(func.count(RegistroDiario.id)).filter(
-            RegistroDiario.usuario_id == int(user_id_from_token),
-            db.extract('month', RegistroDiario.data_registro) == mes,
-            db.extract('year', RegistroDiario.data_registro) == ano
-        ).scalar() or 0
-
-        return jsonify({
-            "total": round(float(total), 2),
-            "gastos": int(count)
-        }), 200
+        # 2. Consulta restrita ao dono do token (intervalo semiaberto usa o índice)
+        inicio, fim = intervalo_mes(mes, ano)
+        return jsonify(resumo_registros(int(user_id_from_token), inicio, fim)), 200
 
     except SQLAlchemyError:
         return jsonify({"error": "Erro temporário de conexão com o banco"}), 503
@@ -452,6 +582,34 @@ def total_gasto_mes():
         return jsonify({"error": "Erro interno ao calcular total"}), 500
 ############################# TOTAL GASTO POR MÊS/ANO #################################
 
+############################# RESUMO COMPLETO DO DASHBOARD #################################
+@dashboard_bp.route("/resumo", methods=["GET"])
+@jwt_required()
+@resposta_em_cache
+def resumo_dashboard_completo():
+    try:
+        # 1. Fonte da Verdade: JWT (Anti-IDOR)
+        user_id_from_token = get_jwt_identity()
+        if not user_id_from_token:
+            return jsonify({"error": "Identidade do token inválida"}), 401
+
+        hoje = datetime.now()
+
+        # 2. Um único statement (CTEs) substitui as quatro chamadas do dashboard
+        resumo = resumo_dashboard(int(user_id_from_token), hoje.month, hoje.year)
+        if resumo is None:
+            return jsonify({"error": "Usuário não encontrado ou sessão expirada"}), 401
+
+        return jsonify(resumo), 200
+
+    except ValueError:
+        return jsonify({"error": "Formato de token inválido"}), 400
+    except SQLAlchemyError:
+        return jsonify({"error": "Erro temporário de conexão com o banco"}), 503
+    except Exception:
+        return jsonify({"error": "Erro interno ao calcular resumo"}), 500
+############################# RESUMO COMPLETO DO DASHBOARD #################################
+
 ######################################## INFORMAÇÕES DO DASHBOARD ########################################
 
 
@@ -554,29 +712,18 @@ def listar_contas_fixas():
         if not user_id_from_token:
             return jsonify({"error": "Identidade do token inválida"}), 401
 
-        # 2. Verifica existência do usuário
-        user = db.session.get(Usuario, int(user_id_from_token))
-        if not user:
-            return jsonify({"error": "Usuário não encontrado ou sessão expirada"}), 401
+        # 2. Existência do usuário já garantida pelo user_lookup_loader
 
         # 3. Busca restrita ao dono do token
-        contas = (
-            ContaFixa.query
-            .filter_by(usuario_id=int(user_id_from_token))
+        stmt = (
+            selecionar(PROJECAO_CONTA)
+            .where(ContaFixa.usuario_id == int(user_id_from_token))
             .order_by(ContaFixa.id.desc())
-            .all()
         )
+        if parametro_stream():
+            return resposta_json_streaming(stmt, PROJECAO_CONTA)
 
-        return jsonify([
-            {
-                "id": conta.id,
-                "nome": conta.nome,
-                "valor": float(conta.valor),
-                "dia_vencimento": conta.dia_vencimento,
-                "ativa": conta.ativa,
-            }
-            for conta in contas
-        ]), 200
+        return jsonify(serializar_linhas(PROJECAO_CONTA, stmt)), 200
 
     except SQLAlchemyError:
         return jsonify({"error": "Erro temporário de conexão com o banco"}), 503
@@ -713,21 +860,49 @@ def mostrar_gastos():
         if not user_id_from_token:
             return jsonify({"error": "Identidade do token inválida"}), 401
 
-        # 2. Busca restrita ao dono do token
-        gastos = RegistroDiario.query.filter_by(usuario_id=int(user_id_from_token)).all()
-        if not gastos:
-            return jsonify({"gastos": []}), 200
+        # 2. Paginação por cursor (keyset) em (data_registro DESC, id DESC)
+        limite = request.args.get("limite", default=current_app.config.get("REGISTRO_PAGINA_PADRAO", 50), type=int)
+        if not 1 <= limite <= REGISTRO_PAGINA_MAXIMA:
+            return jsonify({"error": f"Limite deve ser entre 1 e {REGISTRO_PAGINA_MAXIMA}"}), 400
+
+        cursor = None
+        if request.args.get("cursor"):
+            try:
+                cursor = decodificar_cursor(request.args["cursor"])
+            except ValueError:
+                return jsonify({"error": "Cursor inválido"}), 400
+
+        try:
+            de = datetime.strptime(request.args["de"], '%Y-%m-%d').date() if request.args.get("de") else None
+            ate = datetime.strptime(request.args["ate"], '%Y-%m-%d').date() if request.args.get("ate") else None
+        except ValueError:
+            return jsonify({"error": "Data inválida. Use o formato YYYY-MM-DD"}), 400
+
+        # 3. Busca restrita ao dono do token; filtros de data usam o índice
+        stmt = selecionar(PROJECAO_GASTO).where(RegistroDiario.usuario_id == int(user_id_from_token))
+        if de:
+            stmt = stmt.where(RegistroDiario.data_registro >= de)
+        if ate:
+            # 'ate' é inclusivo; comparar a data direto evita ate + 1 dia (estoura em 9999-12-31)
+            stmt = stmt.where(RegistroDiario.data_registro <= ate)
+        if cursor:
+            stmt = stmt.where(tuple_(RegistroDiario.data_registro, RegistroDiario.id) < cursor)
+        stmt = stmt.order_by(RegistroDiario.data_registro.desc(), RegistroDiario.id.desc())
+
+        # 4. Modo streaming: devolve todo o intervalo sem montar a lista em memória
+        if parametro_stream():
+            return resposta_json_streaming(stmt, PROJECAO_GASTO, chave="gastos", extras={"next_cursor": None})
+
+        gastos = serializar_linhas(PROJECAO_GASTO, stmt.limit(limite + 1))
+
+        next_cursor = None
+        if len(gastos) > limite:
+            gastos = gastos[:limite]
+            next_cursor = codificar_cursor(gastos[-1]["data_registro"], gastos[-1]["id"])
 
         return jsonify({
-            "gastos": [
-                {
-                    "id": gasto.id,
-                    "descricao": gasto.descricao,
-                    "valor": float(gasto.valor),
-                    "categoria": gasto.categoria,
-                    "data_registro": gasto.data_registro
-                } for gasto in gastos
-            ]
+            "gastos": gastos,
+            "next_cursor": next_cursor
         }), 200
 
     except SQLAlchemyError:
@@ -737,6 +912,52 @@ def mostrar_gastos():
 ############################# MOSTRAR GASTOS #################################
 
 ############################# ADICIONAR GASTO DIÁRIO #################################
+def validar_gasto(data):
+    # Retorna (campos, None) ou (None, (mensagem, status)); usada pelo /adicionar e pelo lote
+    descricao = data.get("descricao")
+    valor = data.get("valor")
+    categoria = data.get("categoria")
+    data_registro = data.get("data_registro")
+
+    if not descricao or valor is None or not categoria or not data_registro:
+        return None, ("Dados obrigatórios ausentes", 400)
+
+    # Sanitização e limites (Anti-DoS)
+    descricao_limpa = str(descricao).strip()
+    if not descricao_limpa:
+        return None, ("Descrição não pode estar vazia", 400)
+    if len(descricao_limpa) > 300:
+        return None, ("Descrição excede o limite de 300 caracteres", 413)
+
+    # Validação de categoria (whitelist)
+    categoria_limpa = str(categoria).strip()
+    if categoria_limpa not in CATEGORIAS_VALIDAS:
+        return None, ("Categoria inválida. Escolha entre: " + ", ".join(CATEGORIAS_VALIDAS), 400)
+
+    # Tipagem e validação financeira
+    try:
+        valor_validado = float(valor)
+    except (ValueError, TypeError):
+        return None, ("Valor deve ser um número válido", 400)
+    if valor_validado < 0:
+        return None, ("Valor não pode ser negativo", 400)
+    if valor_validado > 999999999.99:
+        return None, ("Valor excede o limite permitido", 400)
+
+    # Validação de data
+    try:
+        data_registro_dt = datetime.fromisoformat(str(data_registro))
+    except ValueError:
+        return None, ("Data inválida. Use o formato ISO (YYYY-MM-DD ou YYYY-MM-DDTHH:MM:SS)", 400)
+
+    return {
+        "descricao": descricao_limpa,
+        "valor": valor_validado,
+        "categoria": categoria_limpa,
+        "data_registro": data_registro_dt,
+    }, None
+
+
 @registro_bp.route("/adicionar", methods=["POST"])
 @jwt_required()
 def adicionar_gasto_diario():
@@ -750,53 +971,17 @@ def adicionar_gasto_diario():
         if data is None or not isinstance(data, dict):
             return jsonify({"error": "Requisição inválida. O corpo deve ser um JSON válido."}), 400
 
-        descricao = data.get("descricao")
-        valor = data.get("valor")
-        categoria = data.get("categoria")
-        data_registro = data.get("data_registro")
-
-        if not descricao or valor is None or not categoria or not data_registro:
-            return jsonify({"error": "Dados obrigatórios ausentes"}), 400
-
-        # 2. Sanitização e limites (Anti-DoS)
-        descricao_limpa = str(descricao).strip()
-        if not descricao_limpa:
-            return jsonify({"error": "Descrição não pode estar vazia"}), 400
-        if len(descricao_limpa) > 300:
-            return jsonify({"error": "Descrição excede o limite de 300 caracteres"}), 413
-
-        # 3. Validação de categoria (whitelist)
-        categorias_validas = ["Alimentação", "Transporte", "Lazer", "Saúde", "Educação", "Compras", "Outros"]
-        categoria_limpa = str(categoria).strip()
-        if categoria_limpa not in categorias_validas:
-            return jsonify({"error": "Categoria inválida. Escolha entre: " + ", ".join(categorias_validas)}), 400
-
-        # 4. Tipagem e validação financeira
-        try:
-            valor_validado = float(valor)
-            if valor_validado < 0:
-                return jsonify({"error": "Valor não pode ser negativo"}), 400
-            if valor_validado > 999999999.99:
-                return jsonify({"error": "Valor excede o limite permitido"}), 400
-        except (ValueError, TypeError):
-            return jsonify({"error": "Valor deve ser um número válido"}), 400
-
-        # 5. Validação de data
-        try:
-            data_registro_dt = datetime.fromisoformat(str(data_registro))
-        except ValueError:
-            return jsonify({"error": "Data inválida. Use o formato ISO (YYYY-MM-DD ou YYYY-MM-DDTHH:MM:SS)"}), 400
+        # 2-5. Sanitização, whitelist de categoria, valor e data
+        campos, erro = validar_gasto(data)
+        if erro:
+            return jsonify({"error": erro[0]}), erro[1]
 
         # 6. Criação com ID do token (nunca do body)
-        gasto_diario = RegistroDiario(
-            usuario_id=int(user_id_from_token),
-            descricao=descricao_limpa,
-            valor=valor_validado,
-            categoria=categoria_limpa,
-            data_registro=data_registro_dt
-        )
+        gasto_diario = RegistroDiario(usuario_id=int(user_id_from_token), **campos)
 
         db.session.add(gasto_diario)
+        invalidar_fechamento(gasto_diario.usuario_id, gasto_diario.data_registro)
+        registrar_gasto(gasto_diario)
         db.session.commit()
 
         return jsonify({
@@ -819,6 +1004,167 @@ def adicionar_gasto_diario():
 ############################# ADICIONAR GASTO DIÁRIO #################################
 
 
+############################# ADICIONAR GASTOS EM LOTE #################################
+REGISTRO_LOTE_MAXIMO = 5000
+
+@registro_bp.route("/adicionar-lote", methods=["POST"])
+@jwt_required()
+def adicionar_gastos_lote():
+    try:
+        # 1. Fonte da Verdade: JWT (Anti-IDOR / Anti-Mass Assignment)
+        user_id_from_token = get_jwt_identity()
+        if not user_id_from_token:
+            return jsonify({"error": "Identidade do token inválida"}), 401
+        usuario_id = int(user_id_from_token)
+
+        data = request.get_json(silent=True)
+        itens = data.get("gastos") if isinstance(data, dict) else data
+        if not isinstance(itens, list):
+            return jsonify({"error": "Requisição inválida. Envie uma lista de gastos."}), 400
+        if not itens:
+            return jsonify({"error": "Lista de gastos vazia"}), 400
+        if len(itens) > REGISTRO_LOTE_MAXIMO:
+            return jsonify({"error": f"Lote excede o limite de {REGISTRO_LOTE_MAXIMO} gastos"}), 413
+
+        # 2. Validação item a item com as mesmas regras do /adicionar
+        resultados = [None] * len(itens)
+        indices_validos = []
+        linhas = []
+        for indice, item in enumerate(itens):
+            if not isinstance(item, dict):
+                resultados[indice] = {"indice": indice, "status": 400, "error": "Item deve ser um objeto JSON"}
+                continue
+            campos, erro = validar_gasto(item)
+            if erro:
+                resultados[indice] = {"indice": indice, "status": erro[1], "error": erro[0]}
+                continue
+            campos["data_registro"] = campos["data_registro"].date()
+            indices_validos.append(indice)
+            linhas.append({"usuario_id": usuario_id, **campos})
+
+        # 3. Um único INSERT multi-linha (executemany com RETURNING em lotes) na mesma transação
+        if linhas:
+            stmt = RegistroDiario.__table__.insert().returning(
+                RegistroDiario.id, sort_by_parameter_order=True
+            )
+            ids = db.session.execute(stmt, linhas).scalars().all()
+
+            for mes_afetado in {(linha["data_registro"].year, linha["data_registro"].month) for linha in linhas}:
+                invalidar_fechamento(usuario_id, date(*mes_afetado, 1))
+            registrar_gastos_lote(usuario_id, linhas)
+            db.session.commit()
+
+            for indice, gasto_id in zip(indices_validos, ids):
+                resultados[indice] = {"indice": indice, "status": 201, "id": gasto_id}
+
+        inseridos = len(linhas)
+        rejeitados = len(itens) - inseridos
+        status = 201 if not rejeitados else (207 if inseridos else 400)
+
+        return jsonify({
+            "message": f"{inseridos} gasto(s) criado(s), {rejeitados} rejeitado(s)",
+            "inseridos": inseridos,
+            "rejeitados": rejeitados,
+            "resultados": resultados
+        }), status
+
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({"error": "Erro de persistência no banco de dados"}), 500
+    except Exception:
+        db.session.rollback()
+        return jsonify({"error": "Erro interno ao criar gastos em lote"}), 500
+############################# ADICIONAR GASTOS EM LOTE #################################
+
+
+############################# IMPORTAR EXTRATO (CSV/OFX) #################################
+@registro_bp.route("/importar", methods=["POST"])
+@jwt_required()
+def importar_extrato_bancario():
+    try:
+        # 1. Fonte da Verdade: JWT (Anti-IDOR / Anti-Mass Assignment)
+        user_id_from_token = get_jwt_identity()
+        if not user_id_from_token:
+            return jsonify({"error": "Identidade do token inválida"}), 401
+
+        # 2. Arquivo via multipart (campo "arquivo") ou corpo bruto da requisição
+        arquivo = request.files.get("arquivo")
+        formato = request.args.get("formato", "").strip().lower()
+        if not formato and arquivo and arquivo.filename:
+            formato = arquivo.filename.rsplit(".", 1)[-1].lower()
+        if formato not in ("csv", "ofx"):
+            return jsonify({"error": "Formato inválido. Use csv ou ofx"}), 400
+
+        despesas = request.args.get("despesas", "negativas").strip().lower()
+        if despesas not in ("negativas", "positivas"):
+            return jsonify({"error": "Parâmetro despesas deve ser negativas ou positivas"}), 400
+
+        try:
+            leitor = codecs.getreader(request.args.get("encoding", "utf-8-sig"))
+        except LookupError:
+            return jsonify({"error": "Encoding inválido"}), 400
+
+        # 3. Leitura linha a linha do upload: memória constante para qualquer tamanho
+        fluxo = arquivo.stream if arquivo else request.stream
+        resumo = importar_extrato(int(user_id_from_token), leitor(fluxo, errors="replace"), formato, despesas)
+
+        return jsonify({
+            "message": f"{resumo['importados']} gasto(s) importado(s)",
+            **resumo
+        }), 201 if resumo["importados"] else 200
+
+    except ErroImportacao as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({"error": "Erro de persistência no banco de dados"}), 500
+    except Exception:
+        db.session.rollback()
+        return jsonify({"error": "Erro interno ao importar extrato"}), 500
+############################# IMPORTAR EXTRATO (CSV/OFX) #################################
+
+
+############################# EXPORTAR DADOS (CSV/PARQUET) #################################
+@registro_bp.route("/exportar", methods=["GET"])
+@jwt_required()
+def exportar_dados():
+    try:
+        # 1. Fonte da Verdade: JWT (Anti-IDOR)
+        user_id_from_token = get_jwt_identity()
+        if not user_id_from_token:
+            return jsonify({"error": "Identidade do token inválida"}), 401
+
+        formato = request.args.get("formato", "csv").strip().lower()
+        if formato not in ("csv", "parquet"):
+            return jsonify({"error": "Formato inválido. Use csv ou parquet"}), 400
+
+        try:
+            de = datetime.strptime(request.args["de"], '%Y-%m-%d').date() if request.args.get("de") else None
+            ate = datetime.strptime(request.args["ate"], '%Y-%m-%d').date() if request.args.get("ate") else None
+        except ValueError:
+            return jsonify({"error": "Data inválida. Use o formato YYYY-MM-DD"}), 400
+
+        # 2. Registros, contas fixas e parcelamentos lidos em lotes e escritos conforme chegam
+        lotes = lotes_exportacao(int(user_id_from_token), de, ate)
+        if formato == "csv":
+            corpo, mimetype, nome = gerar_csv_gzip(lotes), "application/gzip", "finango.csv.gz"
+        else:
+            corpo, mimetype, nome = gerar_parquet(lotes), "application/vnd.apache.parquet", "finango.parquet"
+
+        return Response(
+            stream_with_context(corpo),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f"attachment; filename={nome}"}
+        )
+
+    except SQLAlchemyError:
+        return jsonify({"error": "Erro temporário de conexão com o banco"}), 503
+    except Exception:
+        return jsonify({"error": "Erro interno ao exportar dados"}), 500
+############################# EXPORTAR DADOS (CSV/PARQUET) #################################
+
+
 ############################# ALTERAR GASTOS #################################
 @registro_bp.route("/alterar/<int:gasto_id>", methods=["PUT"])
 @jwt_required()
@@ -833,8 +1179,9 @@ def alterar_gasto(gasto_id):
         if not data or not isinstance(data, dict):
             return jsonify({"error": "JSON inválido ou ausente"}), 400
 
-        # 2. Busca o gasto
-        gasto = db.session.get(RegistroDiario, gasto_id)
+        # 2. Busca o gasto com FOR UPDATE: edições/remoções concorrentes do mesmo gasto
+        # esperam esta terminar e calculam o delta dos contadores a partir do valor novo
+        gasto = db.session.get(RegistroDiario, gasto_id, with_for_update=True, populate_existing=True)
         if not gasto:
             return jsonify({"error": "Gasto não encontrado"}), 404
 
@@ -842,6 +1189,8 @@ def alterar_gasto(gasto_id):
         if str(gasto.usuario_id) != str(user_id_from_token):
             return jsonify({"error": "Acesso não autorizado a este gasto"}), 403
 
+        categoria_antiga, valor_antigo = gasto.categoria, gasto.valor
+
         # 4. Validação e sanitização de descrição
         if "descricao" in data:
             descricao_limpa = str(data["descricao"]).strip()
@@ -865,12 +1214,13 @@ def alterar_gasto(gasto_id):
 
         # 6. Validação de categoria (whitelist)
         if "categoria" in data:
-            categorias_validas = ["Alimentação", "Transporte", "Lazer", "Saúde", "Educação", "Compras", "Outros"]
             categoria_limpa = str(data["categoria"]).strip()
-            if categoria_limpa not in categorias_validas:
+            if categoria_limpa not in CATEGORIAS_VALIDAS:
                 return jsonify({"error": "Categoria inválida"}), 400
             gasto.categoria = categoria_limpa
 
+        invalidar_fechamento(gasto.usuario_id, gasto.data_registro)
+        alterar_gasto_contadores(gasto, categoria_antiga, valor_antigo)
         db.session.commit()
 
         return jsonify({
@@ -902,8 +1252,9 @@ def deletar_gasto(gasto_id):
         if not user_id_from_token:
             return jsonify({"error": "Identidade do token inválida"}), 401
 
-        # 2. Busca o gasto
-        gasto = db.session.get(RegistroDiario, gasto_id)
+        # 2. Busca o gasto (FOR UPDATE, como em alterar_gasto: o valor descontado dos
+        # contadores é o que está gravado, não um lido antes de uma edição concorrente)
+        gasto = db.session.get(RegistroDiario, gasto_id, with_for_update=True, populate_existing=True)
         if not gasto:
             return jsonify({"error": "Gasto não encontrado"}), 404
 
@@ -912,6 +1263,8 @@ def deletar_gasto(gasto_id):
             return jsonify({"error": "Acesso não autorizado a este gasto"}), 403
 
         # 4. Deleção segura
+        invalidar_fechamento(gasto.usuario_id, gasto.data_registro)
+        remover_gasto(gasto)
         db.session.delete(gasto)
         db.session.commit()
 
@@ -940,17 +1293,19 @@ def deletar_gasto(gasto_id):
 
 
 ############################# TOTAL GASTO POR MÊS/ANO #################################
+@registro_bp.route("/total-gasto-mes", methods=["GET"])
 @registro_bp.route("/total-gasto-mes/<int:mes>/<int:ano>", methods=["GET"])
 @jwt_required()
-def total_gasto_mes():
+@resposta_em_cache
+def total_gasto_mes(mes=None, ano=None):
     try:
         # 1. Fonte da Verdade: JWT (Anti-IDOR)
         user_id_from_token = get_jwt_identity()
         if not user_id_from_token:
             return jsonify({"error": "Identidade do token inválida"}), 401
 
-        mes = request.args.get("mes", type=int) or datetime.now().month
-        ano = request.args.get("ano", type=int) or datetime.now().year
+        mes = mes or request.args.get("mes", type=int)
+        ano = ano or request.args.get("ano", type=int)
 
         if not mes or not ano:
             return jsonify({"error": "Mês e ano são obrigatórios"}), 400
@@ -959,23 +1314,9 @@ def total_gasto_mes():
         if ano < 2000 or ano > 2100:
             return jsonify({"error": "Ano inválido"}), 400
 
-        # 2. Consulta restrita ao dono do token
-        total = db.session.query(func.sum(RegistroDiario.valor)).filter(
-            RegistroDiario.usuario_id == int(user_id_from_token),
-            db.extract('month', RegistroDiario.data_registro) == mes,
-            db.extract('year', RegistroDiario.data_registro) == ano
-        ).scalar() or 0
-
-        count = db.session.query(func.count(RegistroDiario.id)).filter(
-            RegistroDiario.usuario_id == int(user_id_from_token),
-            db.extract('month', RegistroDiario.data_registro) == mes,
-            db.extract('year', RegistroDiario.data_registro) == ano
-        ).scalar() or 0
-
-        return jsonify({
-            "total": round(float(total), 2),
-            "gastos": int(count)
-        }), 200
+        # 2. Consulta restrita ao dono do token (intervalo semiaberto usa o índice)
+        inicio, fim = intervalo_mes(mes, ano)
+        return jsonify(resumo_registros(int(user_id_from_token), inicio, fim)), 200
 
     except SQLAlchemyError:
         return jsonify({"error": "Erro temporário de conexão com o banco"}), 503
@@ -984,17 +1325,19 @@ def total_gasto_mes():
 ############################# TOTAL GASTO POR MÊS/ANO #################################
 
 ############################# TOTAL GASTO POR CATEGORIA MÊS/ANO #################################
+@registro_bp.route("/total-gasto-categoria", methods=["GET"])
 @registro_bp.route("/total-gasto-categoria/<int:mes>/<int:ano>", methods=["GET"])
 @jwt_required()
-def total_gasto_categoria():
+@resposta_em_cache
+def total_gasto_categoria(mes=None, ano=None):
     try:
         # 1. Fonte da Verdade: JWT (Anti-IDOR)
         user_id_from_token = get_jwt_identity()
         if not user_id_from_token:
             return jsonify({"error": "Identidade do token inválida"}), 401
 
-        mes = request.args.get("mes", type=int) or datetime.now().month
-        ano = request.args.get("ano", type=int) or datetime.now().year
+        mes = mes or request.args.get("mes", type=int)
+        ano = ano or request.args.get("ano", type=int)
 
         if not mes or not ano:
             return jsonify({"error": "Mês e ano são obrigatórios"}), 400
@@ -1003,25 +1346,14 @@ def total_gasto_categoria():
         if ano < 2000 or ano > 2100:
             return jsonify({"error": "Ano inválido"}), 400
 
-        # 2. Consulta restrita ao dono do token
-        categorias = ["Alimentação", "Transporte", "Lazer", "Saúde", "Educação", "Compras", "Outros"]
-        resultados = db.session.query(
-            RegistroDiario.categoria,
-            func.sum(RegistroDiario.valor)
-        ).filter(
-            RegistroDiario.usuario_id == int(user_id_from_token),
-            db.extract('month', RegistroDiario.data_registro) == mes,
-            db.extract('year', RegistroDiario.data_registro) == ano
-        ).group_by(RegistroDiario.categoria).all()
+        # 2. Contadores por categoria do dono do token (no máximo 7 linhas)
+        totais, percentuais, total = gastos_por_categoria(int(user_id_from_token), mes, ano)
 
-        resultado = {categoria: 0.0 for categoria in categorias}
-        for categoria, total in resultados:
-            if categoria in resultado:
-                resultado[categoria] = round(float(total), 2)
+        resposta = {"total_por_categoria": totais}
+        if parametro_completo():
+            resposta.update({"percentual_por_categoria": percentuais, "total": total})
 
-        return jsonify({
-            "total_por_categoria": resultado
-        }), 200
+        return jsonify(resposta), 200
 
     except SQLAlchemyError:
         return jsonify({"error": "Erro temporário de conexão com o banco"}), 503
@@ -1030,17 +1362,19 @@ def total_gasto_categoria():
 ############################# TOTAL GASTO POR CATEGORIA MÊS/ANO #################################
 
 ############################# PERCENTUAL DE CATEGORIA MÊS/ANO #################################
+@registro_bp.route("/percentual-gasto-categoria", methods=["GET"])
 @registro_bp.route("/percentual-gasto-categoria/<int:mes>/<int:ano>", methods=["GET"])
 @jwt_required()
-def percentual_gasto_categoria():
+@resposta_em_cache
+def percentual_gasto_categoria(mes=None, ano=None):
     try:
         # 1. Fonte da Verdade: JWT (Anti-IDOR)
         user_id_from_token = get_jwt_identity()
         if not user_id_from_token:
             return jsonify({"error": "Identidade do token inválida"}), 401
 
-        mes = request.args.get("mes", type=int) or datetime.now().month
-        ano = request.args.get("ano", type=int) or datetime.now().year
+        mes = mes or request.args.get("mes", type=int)
+        ano = ano or request.args.get("ano", type=int)
 
         if not mes or not ano:
             return jsonify({"error": "Mês e ano são obrigatórios"}), 400
@@ -1049,32 +1383,14 @@ def percentual_gasto_categoria():
         if ano < 2000 or ano > 2100:
             return jsonify({"error": "Ano inválido"}), 400
 
-        # 2. Consulta restrita ao dono do token
-        categorias = ["Alimentação", "Transporte", "Lazer", "Saúde", "Educação", "Compras", "Outros"]
-
-        total = db.session.query(func.sum(RegistroDiario.valor)).filter(
-            RegistroDiario.usuario_id == int(user_id_from_token),
-            db.extract('month', RegistroDiario.data_registro) == mes,
-            db.extract('year', RegistroDiario.data_registro) == ano
-        ).scalar() or 0
+        # 2. Contadores por categoria do dono do token (no máximo 7 linhas)
+        totais, percentuais, total = gastos_por_categoria(int(user_id_from_token), mes, ano)
 
-        if total == 0:
-            return jsonify({"percentual_por_categoria": {cat: 0.0 for cat in categorias}}), 200
+        resposta = {"percentual_por_categoria": percentuais}
+        if parametro_completo():
+            resposta.update({"total_por_categoria": totais, "total": total})
 
-        resultado = {}
-        for categoria in categorias:
-            total_categoria = db.session.query(func.sum(RegistroDiario.valor)).filter(
-                RegistroDiario.usuario_id == int(user_id_from_token),
-                RegistroDiario.categoria == categoria,
-                db.extract('month', RegistroDiario.data_registro) == mes,
-                db.extract('year', RegistroDiario.data_registro) == ano
-            ).scalar() or 0
-            percentual = round((float(total_categoria) / float(total)) * 100, 2)
-            resultado[categoria] = percentual
-
-        return jsonify({
-            "percentual_por_categoria": resultado
-        }), 200
+        return jsonify(resposta), 200
 
     except SQLAlchemyError:
         return jsonify({"error": "Erro temporário de conexão com o banco"}), 503
@@ -1101,6 +1417,7 @@ def percentual_gasto_categoria():
 ############################# TOTAL GASTO POR ANO #################################
 @registro_bp.route("/total-gasto-ano", methods=["GET"])
 @jwt_required()
+@resposta_em_cache
 def total_gasto_ano():
     try:
         # 1. Fonte da Verdade: JWT (Anti-IDOR)
@@ -1114,21 +1431,9 @@ def total_gasto_ano():
         if ano < 2000 or ano > 2100:
             return jsonify({"error": "Ano inválido"}), 400
 
-        # 2. Consulta restrita ao dono do token
-        total = db.session.query(func.sum(RegistroDiario.valor)).filter(
-            RegistroDiario.usuario_id == int(user_id_from_token),
-            db.extract('year', RegistroDiario.data_registro) == ano
-        ).scalar() or 0
-
-        count = db.session.query(func.count(RegistroDiario.id)).filter(
-            RegistroDiario.usuario_id == int(user_id_from_token),
-            db.extract('year', RegistroDiario.data_registro) == ano
-        ).scalar() or 0
-
-        return jsonify({
-            "total": round(float(total), 2),
-            "gastos": int(count)
-        }), 200
+        # 2. Consulta restrita ao dono do token (intervalo semiaberto usa o índice)
+        inicio, fim = intervalo_ano(ano)
+        return jsonify(resumo_registros(int(user_id_from_token), inicio, fim)), 200
 
     except SQLAlchemyError:
         return jsonify({"error": "Erro temporário de conexão com o banco"}), 503
@@ -1136,9 +1441,50 @@ def total_gasto_ano():
         return jsonify({"error": "Erro interno ao calcular total"}), 500
 ############################# TOTAL GASTO POR ANO #################################
 
+############################# RESUMO DE GASTOS POR PERÍODO #################################
+@registro_bp.route("/resumo-periodo", methods=["GET"])
+@jwt_required()
+@resposta_em_cache
+def resumo_periodo():
+    try:
+        # 1. Fonte da Verdade: JWT (Anti-IDOR)
+        user_id_from_token = get_jwt_identity()
+        if not user_id_from_token:
+            return jsonify({"error": "Identidade do token inválida"}), 401
+
+        de_raw = request.args.get("de")
+        ate_raw = request.args.get("ate")
+        if not de_raw or not ate_raw:
+            return jsonify({"error": "Parâmetros 'de' e 'ate' são obrigatórios"}), 400
+
+        try:
+            de = datetime.strptime(de_raw, '%Y-%m-%d').date()
+            ate = datetime.strptime(ate_raw, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({"error": "Data inválida. Use o formato YYYY-MM-DD"}), 400
+
+        if de > ate:
+            return jsonify({"error": "'de' deve ser anterior ou igual a 'ate'"}), 400
+        if ate >= date.max:
+            # O intervalo semiaberto termina em ate + 1 dia, que não existe para 9999-12-31
+            return jsonify({"error": "'ate' fora do intervalo suportado"}), 400
+
+        # 2. 'ate' é inclusivo: o intervalo semiaberto termina no dia seguinte
+        resumo = resumo_registros(int(user_id_from_token), de, ate + timedelta(days=1))
+        resumo.update({"de": de.isoformat(), "ate": ate.isoformat()})
+
+        return jsonify(resumo), 200
+
+    except SQLAlchemyError:
+        return jsonify({"error": "Erro temporário de conexão com o banco"}), 503
+    except Exception:
+        return jsonify({"error": "Erro interno ao calcular resumo"}), 500
+############################# RESUMO DE GASTOS POR PERÍODO #################################
+
 ############################# TOTAL GASTO POR MÊS POR USUÁRIO DIVIDIDO POR MÊS DO ANO #################################
 @registro_bp.route("/total-gasto-mes-ano", methods=["GET"])
 @jwt_required()
+@resposta_em_cache
 def total_gasto_mes_ano():
     try:
         # 1. Fonte da Verdade: JWT (Anti-IDOR)
@@ -1152,17 +1498,11 @@ def total_gasto_mes_ano():
 
         user_id_int = int(user_id_from_token)
 
-        # 2. Consultas restritas ao dono do token
-        gastos_diarios = (
-            db.session.query(
-                db.extract('month', RegistroDiario.data_registro).label('mes'),
-                func.sum(RegistroDiario.valor).label('total')
-            )
-            .filter(RegistroDiario.usuario_id == user_id_int)
-            .filter(db.extract('year', RegistroDiario.data_registro) == ano)
-            .group_by('mes')
-            .all()
-        )
+        # 2. Meses fechados vêm de historico_fatura; o restante do ano, dos contadores
+        consolidados, primeiro_aberto = gastos_consolidados_ano(user_id_int, ano)
+        gastos_diarios = list(consolidados.items())
+        if primeiro_aberto <= 12:
+            gastos_diarios += gastos_por_mes(user_id_int, ano, primeiro_aberto)
 
         total_contas_fixas = (
             db.session.query(func.sum(ContaFixa.valor))
@@ -1185,6 +1525,36 @@ def total_gasto_mes_ano():
         return jsonify({"error": "Erro interno ao calcular totais"}), 500
 ############################# TOTAL GASTO POR MÊS POR USUÁRIO DIVIDIDO POR MÊS DO ANO #################################
 
+############################# MATRIZ ANUAL MÊS x CATEGORIA #################################
+@registro_bp.route("/matriz-anual", methods=["GET"])
+@jwt_required()
+@resposta_em_cache
+def matriz_anual_gastos():
+    try:
+        # 1. Fonte da Verdade: JWT (Anti-IDOR)
+        user_id_from_token = get_jwt_identity()
+        if not user_id_from_token:
+            return jsonify({"error": "Identidade do token inválida"}), 401
+
+        ano = request.args.get("ano", type=int) or datetime.now().year
+        if ano < 2000 or ano > 2100:
+            return jsonify({"error": "Ano inválido"}), 400
+
+        # 2. Uma tela de gráficos anual em uma requisição: valores[mes - 1][indice da categoria]
+        resposta, percentuais = matriz_anual(int(user_id_from_token), ano)
+
+        # 3. Percentuais só quando pedidos (?completo=1)
+        if parametro_completo():
+            resposta["percentuais"] = percentuais
+
+        return jsonify(resposta), 200
+
+    except SQLAlchemyError:
+        return jsonify({"error": "Erro temporário de conexão com o banco"}), 503
+    except Exception:
+        return jsonify({"error": "Erro interno ao calcular matriz anual"}), 500
+############################# MATRIZ ANUAL MÊS x CATEGORIA #################################
+
 ################################################## GASTOS DIÁRIOS ##################################################
 
 
@@ -1260,25 +1630,23 @@ def criar_parcela():
             except (ValueError, TypeError):
                 return jsonify({"error": "Parcelas restantes deve ser um número inteiro"}), 400
 
-        # 5. Validação de data
-        data_inicio = None
-        if data_inicio_raw:
-            try:
-                data_inicio = datetime.strptime(str(data_inicio_raw), '%Y-%m-%d').date()
-            except ValueError:
-                return jsonify({"error": "Data inválida. Use o formato YYYY-MM-DD"}), 400
-
-        # 6. Verificação de duplicidade (com ID do token)
-        parcelamento_existente = Parcelamento.query.filter_by(
-            usuario_id=int(user_id_from_token),
-            descricao=descricao_limpa,
-            ativo=True
-        ).first()
+        # 5. Validação de data (data_inicio é NOT NULL no banco)
+        if not data_inicio_raw:
+            return jsonify({"error": "Data de início é obrigatória"}), 400
+        try:
+            data_inicio = datetime.strptime(str(data_inicio_raw), '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({"error": "Data inválida. Use o formato YYYY-MM-DD"}), 400
 
-        if parcelamento_existente:
-            return jsonify({"error": "Já existe um parcelamento em andamento com esta descrição"}), 409
+        # 6. Cronograma automático: o progresso sai de data_inicio, não de /pagar
+        automatico = data.get("automatico", False)
+        if not isinstance(automatico, bool):
+            return jsonify({"error": "Campo automatico deve ser booleano"}), 400
+        if automatico:
+            _, parcelas_restantes_int = progresso_parcela(data_inicio, parcelas_totais_int)
 
-        # 7. Criação com ID do token
+        # 7. Criação com ID do token; duplicidade garantida pelo índice único
+        # parcial (usuario_id, descricao) WHERE ativo, sem SELECT prévio
         nova_parcela = Parcelamento(
             usuario_id=int(user_id_from_token),
             descricao=descricao_limpa,
@@ -1287,7 +1655,8 @@ def criar_parcela():
             parcelas_totais=parcelas_totais_int,
             parcelas_restantes=parcelas_restantes_int,
             data_inicio=data_inicio,
-            ativo=True
+            ativo=not automatico or parcelas_restantes_int > 0,
+            automatico=automatico
         )
 
         db.session.add(nova_parcela)
@@ -1303,10 +1672,16 @@ def criar_parcela():
                 "parcelas_totais": nova_parcela.parcelas_totais,
                 "parcelas_restantes": nova_parcela.parcelas_restantes,
                 "data_inicio": nova_parcela.data_inicio.isoformat() if nova_parcela.data_inicio else None,
-                "ativo": nova_parcela.ativo
+                "ativo": nova_parcela.ativo,
+                "automatico": nova_parcela.automatico
             }
         }), 201
 
+    except IntegrityError as erro:
+        db.session.rollback()
+        if descricao_parcela_duplicada(erro):
+            return jsonify({"error": "Já existe um parcelamento em andamento com esta descrição"}), 409
+        return jsonify({"error": "Dados do parcelamento violam uma restrição do banco"}), 400
     except SQLAlchemyError:
         db.session.rollback()
         return jsonify({"error": "Erro de persistência no banco de dados"}), 500
@@ -1324,23 +1699,15 @@ def mostrar_parcelas():
         if not current_user_id:
             return jsonify({"error": "Identidade do token inválida"}), 401
 
-        parcelas = Parcelamento.query.filter_by(
-            usuario_id=int(current_user_id),
-            ativo=True
-        ).all()
+        projecao = projecao_parcela()
+        stmt = selecionar(projecao).where(
+            Parcelamento.usuario_id == int(current_user_id),
+            filtro_parcelas_ativas()
+        )
+        if parametro_stream():
+            return resposta_json_streaming(stmt, projecao)
 
-        return jsonify([
-            {
-                "id": parcela.id,
-                "descricao": parcela.descricao,
-                "valor_total": round(float(parcela.valor_total), 2),
-                "valor_parcela": round(float(parcela.valor_parcela), 2),
-                "parcelas_totais": parcela.parcelas_totais,
-                "parcelas_restantes": parcela.parcelas_restantes,
-                "data_inicio": parcela.data_inicio.isoformat() if parcela.data_inicio else None,
-                "ativo": parcela.ativo
-            } for parcela in parcelas
-        ]), 200
+        return jsonify(serializar_linhas(projecao, stmt)), 200
 
     except SQLAlchemyError:
         return jsonify({"error": "Erro temporário de conexão com o banco"}), 503
@@ -1416,13 +1783,12 @@ def editar_parcela(parcela_id):
                 return jsonify({"error": "Valor total deve ser um número válido"}), 400
 
         if "data_inicio" in data:
-            if data["data_inicio"]:
-                try:
-                    parcela.data_inicio = datetime.strptime(str(data["data_inicio"]), '%Y-%m-%d').date()
-                except ValueError:
-                    return jsonify({"error": "Data inválida. Use o formato YYYY-MM-DD"}), 400
-            else:
-                parcela.data_inicio = None
+            if not data["data_inicio"]:
+                return jsonify({"error": "Data de início é obrigatória"}), 400
+            try:
+                parcela.data_inicio = datetime.strptime(str(data["data_inicio"]), '%Y-%m-%d').date()
+            except ValueError:
+                return jsonify({"error": "Data inválida. Use o formato YYYY-MM-DD"}), 400
 
         db.session.commit()
 
@@ -1440,6 +1806,11 @@ def editar_parcela(parcela_id):
             }
         }), 200
 
+    except IntegrityError as erro:
+        db.session.rollback()
+        if descricao_parcela_duplicada(erro):
+            return jsonify({"error": "Já existe um parcelamento em andamento com esta descrição"}), 409
+        return jsonify({"error": "Dados do parcelamento violam uma restrição do banco"}), 400
     except SQLAlchemyError:
         db.session.rollback()
         return jsonify({"error": "Erro de persistência no banco de dados"}), 500
@@ -1457,17 +1828,48 @@ def pagar_parcela(parcela_id):
         if not current_user_id:
             return jsonify({"error": "Identidade do token inválida"}), 401
 
-        parcela = db.session.get(Parcelamento, parcela_id)
-        if not parcela or str(parcela.usuario_id) != str(current_user_id):
-            return jsonify({"error": "Parcelamento não encontrado ou acesso negado"}), 404
-
-        if parcela.parcelas_restantes <= 0:
+        # UPDATE condicional e atômico: o decremento acontece no banco (sem lost update
+        # entre toques simultâneos) e o RETURNING devolve a linha já atualizada.
+        # No SET, parcelas_restantes ainda é o valor anterior.
+        stmt = (
+            update(Parcelamento)
+            .where(
+                Parcelamento.id == parcela_id,
+                Parcelamento.usuario_id == int(current_user_id),
+                Parcelamento.ativo == True,
+                Parcelamento.automatico == False,
+                Parcelamento.parcelas_restantes > 0
+            )
+            .values(
+                parcelas_restantes=Parcelamento.parcelas_restantes - 1,
+                ativo=Parcelamento.parcelas_restantes - 1 > 0
+            )
+            .returning(
+                Parcelamento.id, Parcelamento.descricao, Parcelamento.valor_total,
+                Parcelamento.valor_parcela, Parcelamento.parcelas_totais,
+                Parcelamento.parcelas_restantes, Parcelamento.data_inicio, Parcelamento.ativo
+            )
+            .execution_options(synchronize_session=False)
+        )
+        parcela = db.session.execute(stmt).first()
+
+        if parcela is None:
+            # Nada atualizado: só agora descobre se não existe, se foi excluído, se segue
+            # o cronograma automático ou se já foi quitado
+            existe = db.session.execute(
+                select(Parcelamento.automatico, Parcelamento.ativo, Parcelamento.parcelas_restantes).where(
+                    Parcelamento.id == parcela_id,
+                    Parcelamento.usuario_id == int(current_user_id)
+                )
+            ).first()
+            db.session.rollback()
+            # Excluído (ativo=False com parcelas em aberto) conta como inexistente
+            if existe is None or (not existe.ativo and existe.parcelas_restantes > 0):
+                return jsonify({"error": "Parcelamento não encontrado ou acesso negado"}), 404
+            if existe.automatico:
+                return jsonify({"error": "Parcelamento com cronograma automático não aceita pagamento manual"}), 409
             return jsonify({"error": "Todas as parcelas já foram pagas"}), 400
 
-        parcela.parcelas_restantes -= 1
-        if parcela.parcelas_restantes == 0:
-            parcela.ativo = False
-
         db.session.commit()
 
         return jsonify({
@@ -1506,7 +1908,7 @@ def resumo_parcelamentos():
             func.sum(Parcelamento.valor_parcela).label("soma_valores")
         ).filter(
             Parcelamento.usuario_id == int(current_user_id),
-            Parcelamento.ativo == True
+            filtro_parcelas_ativas()
         ).first()
 
         total_ativos = resumo.total_ativos or 0
@@ -1523,6 +1925,34 @@ def resumo_parcelamentos():
         return jsonify({"error": "Erro interno ao calcular resumo"}), 500
 ############################# RESUMO DE PARCELAS #################################
 
+############################# PROJEÇÃO DE PARCELAS #################################
+@parcelas_bp.route("/projecao", methods=["GET"])
+@jwt_required()
+def projecao_parcelamentos():
+    try:
+        current_user_id = get_jwt_identity()
+        if not current_user_id:
+            return jsonify({"error": "Identidade do token inválida"}), 401
+
+        try:
+            meses = int(request.args.get("meses", PROJECAO_MESES_PADRAO))
+        except (TypeError, ValueError):
+            return jsonify({"error": "Parâmetro meses deve ser um número inteiro"}), 400
+        if meses < 1 or meses > PROJECAO_MESES_MAXIMO:
+            return jsonify({"error": f"Parâmetro meses deve estar entre 1 e {PROJECAO_MESES_MAXIMO}"}), 400
+
+        projecao = projecao_parcelas(int(current_user_id), meses)
+        if projecao is None:
+            return jsonify({"error": "Usuário não encontrado"}), 404
+
+        return jsonify(projecao), 200
+
+    except SQLAlchemyError:
+        return jsonify({"error": "Erro temporário de conexão com o banco"}), 503
+    except Exception:
+        return jsonify({"error": "Erro interno ao projetar parcelas"}), 500
+############################# PROJEÇÃO DE PARCELAS #################################
+
 ############################# HISTÓRICO DE PARCELAMENTOS #################################
 @parcelas_bp.route("/historico", methods=["GET"])
 @jwt_required()
@@ -1532,23 +1962,15 @@ def historico_parcelamentos():
         if not current_user_id:
             return jsonify({"error": "Identidade do token inválida"}), 401
 
-        historico = Parcelamento.query.filter_by(
-            usuario_id=int(current_user_id),
-            ativo=False
-        ).order_by(Parcelamento.data_inicio.desc()).all()
+        projecao = projecao_parcela()
+        stmt = selecionar(projecao).where(
+            Parcelamento.usuario_id == int(current_user_id),
+            filtro_parcelas_encerradas()
+        ).order_by(Parcelamento.data_inicio.desc())
+        if parametro_stream():
+            return resposta_json_streaming(stmt, projecao)
 
-        return jsonify([
-            {
-                "id": parcela.id,
-                "descricao": parcela.descricao,
-                "valor_total": round(float(parcela.valor_total), 2),
-                "valor_parcela": round(float(parcela.valor_parcela), 2),
-                "parcelas_totais": parcela.parcelas_totais,
-                "parcelas_restantes": parcela.parcelas_restantes,
-                "data_inicio": parcela.data_inicio.isoformat() if parcela.data_inicio else None,
-                "ativo": parcela.ativo
-            } for parcela in historico
-        ]), 200
+        return jsonify(serializar_linhas(projecao, stmt)), 200
 
     except SQLAlchemyError:
         return jsonify({"error": "Erro temporário de conexão com o banco"}), 503
@@ -1588,6 +2010,19 @@ def health_db():
         }
     except Exception as e:
         return {"status": "error", "error": str(e)}, 500
+
+
+@auth_bp.route("/health-db/pool")
+def health_db_pool():
+    # Estado do pool deste worker: em uso, ociosas, overflow e espera por checkout
+    telemetria = current_app.extensions["telemetria_pool"]
+    return telemetria.resumo(db.engine.pool)
+
+
+@auth_bp.route("/health/respostas")
+def health_respostas():
+    # Agregados deste worker: hits do cache, cálculos feitos e requisições coalescidas
+    return current_app.extensions["telemetria_respostas"].resumo()
     
 @auth_bp.route("/health")
 def health():
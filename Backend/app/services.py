@@ -0,0 +1,201 @@
+from datetime import date
+from sqlalchemy import func, select, true
+from app.extensions import db
+from app.models import ContaFixa, GastoCategoriaMes, Parcelamento, RegistroDiario, Usuario
+from app.cronograma import filtro_parcelas_ativas
+
+CATEGORIAS_VALIDAS = ["Alimentação", "Transporte", "Lazer", "Saúde", "Educação", "Compras", "Outros"]
+
+
+######################################## INTERVALOS DE DATA ########################################
+# Intervalos semiabertos [inicio, fim): permitem que o Postgres use o índice
+# (usuario_id, data_registro) como range scan, ao contrário de EXTRACT(month/year).
+def intervalo_mes(mes, ano):
+    inicio = date(ano, mes, 1)
+    fim = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+    return inicio, fim
+
+
+def intervalo_ano(ano):
+    return date(ano, 1, 1), date(ano + 1, 1, 1)
+
+
+def filtro_registros_periodo(usuario_id, inicio, fim):
+    return (
+        RegistroDiario.usuario_id == usuario_id,
+        RegistroDiario.data_registro >= inicio,
+        RegistroDiario.data_registro < fim,
+    )
+######################################## INTERVALOS DE DATA ########################################
+
+
+######################################## AGREGADOS POR CATEGORIA ########################################
+# Lê os contadores de gasto_categoria_mes (no máximo uma linha por categoria) e
+# deriva totais e percentuais. O total geral inclui categorias fora da whitelist.
+def gastos_por_categoria(usuario_id, mes, ano):
+    linhas = db.session.query(
+        GastoCategoriaMes.categoria,
+        GastoCategoriaMes.total
+    ).filter(
+        GastoCategoriaMes.usuario_id == usuario_id,
+        GastoCategoriaMes.ano == ano,
+        GastoCategoriaMes.mes == mes
+    ).all()
+
+    brutos = {categoria: 0.0 for categoria in CATEGORIAS_VALIDAS}
+    total_geral = 0.0
+    for categoria, total in linhas:
+        valor = float(total or 0)
+        total_geral += valor
+        if categoria in brutos:
+            brutos[categoria] = valor
+
+    totais = {categoria: round(valor, 2) for categoria, valor in brutos.items()}
+    if total_geral == 0:
+        percentuais = {categoria: 0.0 for categoria in CATEGORIAS_VALIDAS}
+    else:
+        percentuais = {
+            categoria: round((valor / total_geral) * 100, 2)
+            for categoria, valor in brutos.items()
+        }
+
+    return totais, percentuais, round(total_geral, 2)
+
+
+def gastos_por_mes(usuario_id, ano, a_partir_de=1):
+    # Total por mês do ano a partir dos contadores: [(mes, total), ...]
+    return db.session.query(
+        GastoCategoriaMes.mes,
+        func.sum(GastoCategoriaMes.total)
+    ).filter(
+        GastoCategoriaMes.usuario_id == usuario_id,
+        GastoCategoriaMes.ano == ano,
+        GastoCategoriaMes.mes >= a_partir_de
+    ).group_by(GastoCategoriaMes.mes).all()
+
+
+def matriz_anual(usuario_id, ano):
+    # Matriz 12 x len(CATEGORIAS_VALIDAS) em formato colunar, de uma única consulta
+    # agrupada sobre os contadores (no máximo 12 linhas por categoria). Como em
+    # gastos_por_categoria, o total do mês inclui categorias fora da whitelist.
+    linhas = db.session.query(
+        GastoCategoriaMes.mes,
+        GastoCategoriaMes.categoria,
+        func.sum(GastoCategoriaMes.total)
+    ).filter(
+        GastoCategoriaMes.usuario_id == usuario_id,
+        GastoCategoriaMes.ano == ano
+    ).group_by(GastoCategoriaMes.mes, GastoCategoriaMes.categoria).all()
+
+    coluna = {categoria: indice for indice, categoria in enumerate(CATEGORIAS_VALIDAS)}
+    valores = [[0.0] * len(CATEGORIAS_VALIDAS) for _ in range(12)]
+    total_por_mes = [0.0] * 12
+    for mes, categoria, total in linhas:
+        valor = float(total or 0)
+        total_por_mes[mes - 1] += valor
+        if categoria in coluna:
+            valores[mes - 1][coluna[categoria]] += valor
+
+    total_por_categoria = [round(sum(linha[j] for linha in valores), 2) for j in range(len(CATEGORIAS_VALIDAS))]
+    percentuais = [
+        [round(valor / total * 100, 2) if total else 0.0 for valor in linha]
+        for linha, total in zip(valores, total_por_mes)
+    ]
+
+    return {
+        "ano": ano,
+        "meses": list(range(1, 13)),
+        "categorias": list(CATEGORIAS_VALIDAS),
+        "valores": [[round(valor, 2) for valor in linha] for linha in valores],
+        "total_por_mes": [round(total, 2) for total in total_por_mes],
+        "total_por_categoria": total_por_categoria,
+        "total": round(sum(total_por_mes), 2),
+    }, percentuais
+######################################## AGREGADOS POR CATEGORIA ########################################
+
+
+######################################## RESUMO DE REGISTROS ########################################
+# SUM, COUNT, MIN, MAX e AVG no mesmo SELECT: uma única varredura do intervalo no índice.
+def resumo_registros(usuario_id, inicio, fim):
+    linha = db.session.query(
+        func.sum(RegistroDiario.valor).label("total"),
+        func.count(RegistroDiario.id).label("gastos"),
+        func.min(RegistroDiario.valor).label("minimo"),
+        func.max(RegistroDiario.valor).label("maximo"),
+        func.avg(RegistroDiario.valor).label("media"),
+    ).filter(
+        *filtro_registros_periodo(usuario_id, inicio, fim)
+    ).one()
+
+    return {
+        "total": round(float(linha.total or 0), 2),
+        "gastos": int(linha.gastos or 0),
+        "minimo": round(float(linha.minimo or 0), 2),
+        "maximo": round(float(linha.maximo or 0), 2),
+        "media": round(float(linha.media or 0), 2),
+    }
+######################################## RESUMO DE REGISTROS ########################################
+
+
+######################################## RESUMO DO DASHBOARD ########################################
+# Salário, contas fixas ativas, gastos do mês e parcelamentos ativos em um único
+# statement (gastos vêm dos contadores por categoria): cada CTE agrega sem GROUP BY (sempre uma linha) e o SELECT final as
+# cruza com a linha do usuário. Usuário inexistente => nenhuma linha => None.
+def resumo_dashboard(usuario_id, mes, ano):
+    contas = (
+        select(func.coalesce(func.sum(ContaFixa.valor), 0).label("soma_contas_fixas"))
+        .where(ContaFixa.usuario_id == usuario_id, ContaFixa.ativa == True)
+        .cte("contas")
+    )
+    gastos = (
+        select(
+            func.coalesce(func.sum(GastoCategoriaMes.total), 0).label("total_gasto_mes"),
+            func.coalesce(func.sum(GastoCategoriaMes.quantidade), 0).label("gastos_mes"),
+        )
+        .where(
+            GastoCategoriaMes.usuario_id == usuario_id,
+            GastoCategoriaMes.ano == ano,
+            GastoCategoriaMes.mes == mes,
+        )
+        .cte("gastos")
+    )
+    parcelas = (
+        select(
+            func.count(Parcelamento.id).label("quantidade_ativos"),
+            func.coalesce(func.sum(Parcelamento.valor_parcela), 0).label("soma_total_mensal"),
+        )
+        .where(Parcelamento.usuario_id == usuario_id, filtro_parcelas_ativas())
+        .cte("parcelas")
+    )
+
+    stmt = (
+        select(
+            Usuario.salario_mensal,
+            contas.c.soma_contas_fixas,
+            gastos.c.total_gasto_mes,
+            gastos.c.gastos_mes,
+            parcelas.c.quantidade_ativos,
+            parcelas.c.soma_total_mensal,
+        )
+        .select_from(Usuario)
+        .join(contas, true())
+        .join(gastos, true())
+        .join(parcelas, true())
+        .where(Usuario.id == usuario_id)
+    )
+
+    linha = db.session.execute(stmt).first()
+    if linha is None:
+        return None
+
+    return {
+        "salario_mensal": round(float(linha.salario_mensal or 0), 2),
+        "soma_contas_fixas": round(float(linha.soma_contas_fixas or 0), 2),
+        "total_gasto_mes": round(float(linha.total_gasto_mes or 0), 2),
+        "gastos_mes": int(linha.gastos_mes or 0),
+        "parcelamentos": {
+            "quantidade_ativos": int(linha.quantidade_ativos or 0),
+            "soma_total_mensal": round(float(linha.soma_total_mensal or 0), 2),
+        },
+    }
+######################################## RESUMO DO DASHBOARD ########################################
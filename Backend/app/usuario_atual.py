@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from app.extensions import db
+from app.models import Usuario
+
+
+######################################## CACHE DE USUÁRIOS VÁLIDOS ########################################
+# Ids de usuários que já se provaram existentes, com TTL e limite LRU. É por
+# processo: remoções feitas em outro worker só são vistas aqui após o TTL.
+class CacheUsuariosValidos:
+    def __init__(self, ttl=60, tamanho_maximo=10000):
+        self.ttl = ttl
+        self.tamanho_maximo = tamanho_maximo
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def contem(self, usuario_id):
+        with self._lock:
+            expira_em = self._ids.get(usuario_id)
+            if expira_em is None:
+                return False
+            if expira_em < time.monotonic():
+                del self._ids[usuario_id]
+                return False
+            self._ids.move_to_end(usuario_id)
+            return True
+
+    def adicionar(self, usuario_id):
+        with self._lock:
+            self._ids[usuario_id] = time.monotonic() + self.ttl
+            self._ids.move_to_end(usuario_id)
+            while len(self._ids) > self.tamanho_maximo:
+                self._ids.popitem(last=False)
+
+    def invalidar(self, usuario_id):
+        with self._lock:
+            self._ids.pop(usuario_id, None)
+
+    def limpar(self):
+        with self._lock:
+            self._ids.clear()
+######################################## CACHE DE USUÁRIOS VÁLIDOS ########################################
+
+
+######################################## USUÁRIO ATUAL ########################################
+class UsuarioAtual:
+    # Valor de current_user: o id já validado e, se foi preciso ir ao banco para
+    # validá-lo, a entidade carregada nessa mesma requisição.
+    __slots__ = ("id", "_usuario")
+
+    def __init__(self, usuario_id, usuario=None):
+        self.id = usuario_id
+        self._usuario = usuario
+
+    def carregar(self):
+        # Uma única busca por requisição (depois disso vem do identity map)
+        if self._usuario is None:
+            self._usuario = db.session.get(Usuario, self.id)
+        return self._usuario
+
+
+def cache_usuarios():
+    return current_app.extensions["cache_usuarios"]
+
+
+def resolver_usuario_atual(identidade):
+    try:
+        usuario_id = int(identidade)
+    except (TypeError, ValueError):
+        return None
+
+    cache = cache_usuarios()
+    if cache.contem(usuario_id):
+        return UsuarioAtual(usuario_id)
+
+    usuario = db.session.get(Usuario, usuario_id)
+    if usuario is None:
+        return None
+    cache.adicionar(usuario_id)
+    return UsuarioAtual(usuario_id, usuario)
+
+
+def invalidar_usuario(usuario_id):
+    if has_app_context() and "cache_usuarios" in current_app.extensions:
+        cache_usuarios().invalidar(usuario_id)
+
+
+@event.listens_for(Usuario, "after_delete")
+def _usuario_removido(mapper, connection, usuario):
+    # Qualquer remoção de conta (rota, script, cascade) tira o id do cache
+    invalidar_usuario(usuario.id)
+######################################## USUÁRIO ATUAL ########################################
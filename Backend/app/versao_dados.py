@@ -0,0 +1,144 @@
+import hashlib
+from datetime import date
+from flask import g, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from sqlalchemy import event, select
+from app.extensions import SessaoRoteada, db
+from app.models import VersaoDadosUsuario
+
+# GETs cujas respostas dependem só dos dados do usuário (e da data, pelos cronogramas)
+BLUEPRINTS_VERSIONADOS = {"dashboard", "registro", "parcelas", "contas_fixas"}
+ENDPOINTS_VERSIONADOS = {"auth.get_user_info"}
+
+
+######################################## VERSÃO DOS DADOS ########################################
+# versao_dados_usuario.versao sobe a cada commit que escreveu algo durante uma
+# requisição autenticada, na mesma transação da escrita: quem lê a versão
+# (primário ou réplica) vê sempre os dados correspondentes a ela.
+def _identidade_atual():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        return None
+
+
+def _upsert_versao(session, usuario_id):
+    # Primeira escrita do usuário cria a linha; as seguintes incrementam (atômico)
+    tabela = VersaoDadosUsuario.__table__
+    dialeto = session.get_bind().dialect.name
+    if dialeto == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialeto == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+
+    if insert is not None:
+        stmt = insert(tabela).values(usuario_id=usuario_id, versao=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["usuario_id"], set_={"versao": tabela.c.versao + 1}
+        )
+        session.execute(stmt)
+        return
+
+    atualizadas = session.execute(
+        tabela.update().where(tabela.c.usuario_id == usuario_id).values(versao=tabela.c.versao + 1)
+    ).rowcount
+    if not atualizadas:
+        session.execute(tabela.insert().values(usuario_id=usuario_id, versao=1))
+
+
+def incrementar_versoes(usuario_ids, session=None):
+    # Escritas fora de requisição (comandos flask) não têm identidade JWT: quem
+    # escreve informa os usuários afetados, antes do commit. Ordem fixa evita
+    # deadlock entre duas rotinas sobre os mesmos usuários.
+    session = session or db.session
+    for usuario_id in sorted(set(usuario_ids)):
+        _upsert_versao(session, usuario_id)
+
+
+def _marcar_escrita(session):
+    session.info["escreveu"] = True
+
+
+@event.listens_for(SessaoRoteada, "after_flush")
+def _escrita_orm(session, flush_context):
+    _marcar_escrita(session)
+
+
+@event.listens_for(SessaoRoteada, "do_orm_execute")
+def _escrita_direta(estado):
+    # INSERT/UPDATE/DELETE emitidos por session.execute (lotes, UPDATE ... RETURNING)
+    if estado.is_insert or estado.is_update or estado.is_delete:
+        _marcar_escrita(estado.session)
+
+
+@event.listens_for(SessaoRoteada, "before_commit")
+def _incrementar_versao(session):
+    # O flush das mudanças pendentes acontece depois deste evento: elas também contam
+    if not (session.info.get("escreveu") or session.new or session.dirty or session.deleted):
+        return
+    usuario_id = _identidade_atual()
+    if usuario_id is None:
+        return
+    _upsert_versao(session, int(usuario_id))
+
+
+@event.listens_for(SessaoRoteada, "after_commit")
+@event.listens_for(SessaoRoteada, "after_rollback")
+def _limpar_marca(session):
+    session.info.pop("escreveu", None)
+######################################## VERSÃO DOS DADOS ########################################
+
+
+######################################## ETAG / IF-NONE-MATCH ########################################
+def gerar_etag(usuario_id, versao, hoje=None):
+    # A data entra na ETag: parcelamentos automáticos mudam de um dia para o outro
+    hoje = hoje or date.today()
+    return hashlib.sha256(f"{usuario_id}:{versao}:{hoje.isoformat()}".encode()).hexdigest()[:32]
+
+
+def _versionada():
+    return request.method == "GET" and (
+        request.blueprint in BLUEPRINTS_VERSIONADOS or request.endpoint in ENDPOINTS_VERSIONADOS
+    )
+
+
+def instalar_versao_dados(app):
+    # Registrado depois do roteamento de réplica: a versão é lida do mesmo banco que os dados
+    @app.before_request
+    def responder_nao_modificado():
+        g.etag_dados = g.versao_dados = None
+        if not _versionada():
+            return None
+        try:
+            verify_jwt_in_request()
+            usuario_id = int(get_jwt_identity())
+        except Exception:
+            return None  # a própria rota responde 401
+
+        # Uma busca por chave primária antes de qualquer agregado da rota
+        g.versao_dados = versao = db.session.execute(
+            select(VersaoDadosUsuario.versao).where(VersaoDadosUsuario.usuario_id == usuario_id)
+        ).scalar() or 0
+
+        g.etag_dados = gerar_etag(usuario_id, versao)
+        if request.if_none_match.contains_weak(g.etag_dados):
+            resposta = app.response_class(status=304)
+            _cabecalhos_cache(resposta, g.etag_dados)
+            return resposta
+        return None
+
+    @app.after_request
+    def anexar_etag(response):
+        if g.get("etag_dados") and request.method == "GET" and response.status_code == 200:
+            _cabecalhos_cache(response, g.etag_dados)
+        return response
+
+
+def _cabecalhos_cache(resposta, etag):
+    # Cache só no cliente, sempre revalidado com If-None-Match
+    resposta.set_etag(etag, weak=True)
+    resposta.cache_control.private = True
+    resposta.cache_control.no_cache = True
+######################################## ETAG / IF-NONE-MATCH ########################################
@@ -0,0 +1,90 @@
+import threading
+import time
+
+
+######################################## TELEMETRIA ########################################
+class TelemetriaRespostas:
+    # Contadores deste worker para os agregados com cache (expostos em /health/respostas)
+    CAMPOS = ("hits", "calculos", "coalescidas", "coalescidas_entre_processos", "esperas_expiradas")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        for campo in self.CAMPOS:
+            setattr(self, campo, 0)
+
+    def registrar(self, campo):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def resumo(self):
+        with self._lock:
+            return {campo: getattr(self, campo) for campo in self.CAMPOS}
+######################################## TELEMETRIA ########################################
+
+
+######################################## VOO ÚNICO ########################################
+# Requisições idênticas e simultâneas (mesma chave de cache) esperam o cálculo da
+# primeira e recebem o mesmo resultado, em vez de repetir o agregado em paralelo.
+# Aqui a coordenação é entre as threads do processo; entre processos ela fica com
+# o backend Redis do cache (reservar_calculo), usado pela própria função de cálculo.
+class _Voo:
+    __slots__ = ("pronto", "resultado", "falhou")
+
+    def __init__(self):
+        self.pronto = threading.Event()
+        self.resultado = None
+        self.falhou = False
+
+
+class VooUnico:
+    def __init__(self, espera=10, telemetria=None, intervalo=0.02):
+        self.espera = espera          # segundos que uma requisição aguarda o cálculo alheio
+        self.intervalo = intervalo    # consulta ao cache compartilhado durante a espera
+        self.telemetria = telemetria or TelemetriaRespostas()
+        self._voos = {}
+        self._lock = threading.Lock()
+
+    def executar(self, chave, calcular):
+        with self._lock:
+            voo = self._voos.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._voos[chave] = _Voo()
+
+        if not lider:
+            if not voo.pronto.wait(self.espera):
+                self.telemetria.registrar("esperas_expiradas")
+                return calcular()
+            if voo.falhou:
+                return calcular()  # o erro do líder não é repassado: cada uma tenta de novo
+            self.telemetria.registrar("coalescidas")
+            return voo.resultado
+
+        try:
+            voo.resultado = calcular()
+        except BaseException:
+            voo.falhou = True
+            raise
+        finally:
+            with self._lock:
+                self._voos.pop(chave, None)
+            voo.pronto.set()
+        return voo.resultado
+
+    def aguardar_outro_processo(self, obter, em_andamento):
+        # Outro worker reservou o cálculo: espera o resultado aparecer no cache
+        # compartilhado; None se a reserva sumir sem resultado ou o prazo acabar
+        limite = time.monotonic() + self.espera
+        while time.monotonic() < limite:
+            # A reserva é liberada depois de guardar: lida antes do cache, não perde o resultado
+            ativo = em_andamento()
+            corpo = obter()
+            if corpo is not None:
+                self.telemetria.registrar("coalescidas_entre_processos")
+                return corpo
+            if not ativo:
+                return None
+            time.sleep(self.intervalo)
+        self.telemetria.registrar("esperas_expiradas")
+        return None
+######################################## VOO ÚNICO ########################################
@@ -0,0 +1,124 @@
+"""Compara a leitura de parcelamentos via ORM (Parcelamento.query...all()) com a
+leitura projetada (SELECT de colunas + serializar_linha) usada nas rotas GET.
+
+Uso (a partir de Backend/):
+    python -m scripts.benchmark_serializacao [--linhas 10000] [--repeticoes 5]
+"""
+import argparse
+import calendar
+import time
+from datetime import date
+from app import create_app, db
+from app.cronograma import filtro_parcelas_ativas, progresso_parcela
+from app.models import Parcelamento, Usuario
+from app.routes import projecao_parcela, selecionar, serializar_linhas
+
+
+def _somar_meses(data, meses):
+    # Mesmo corte no fim do mês de cronograma.somar_meses
+    total = data.year * 12 + data.month - 1 + meses
+    ano, mes = divmod(total, 12)
+    return date(ano, mes + 1, min(data.day, calendar.monthrange(ano, mes + 1)[1]))
+
+
+def caminho_orm(usuario_id):
+    # Mesmo payload de /parcelas/mostrar, com o progresso calculado em Python
+    hoje = date.today()
+    parcelas = Parcelamento.query.filter(
+        Parcelamento.usuario_id == usuario_id,
+        filtro_parcelas_ativas(hoje)
+    ).all()
+    resultado = []
+    for parcela in parcelas:
+        if parcela.automatico and parcela.data_inicio:
+            pagas, restantes = progresso_parcela(parcela.data_inicio, parcela.parcelas_totais, hoje)
+        else:
+            restantes = parcela.parcelas_restantes
+            pagas = parcela.parcelas_totais - restantes
+        ativo = bool(parcela.ativo) and (not parcela.automatico or restantes > 0)
+        resultado.append({
+            "id": parcela.id,
+            "descricao": parcela.descricao,
+            "valor_total": round(float(parcela.valor_total), 2),
+            "valor_parcela": round(float(parcela.valor_parcela), 2),
+            "parcelas_totais": parcela.parcelas_totais,
+            "parcelas_restantes": restantes,
+            "parcelas_pagas": pagas,
+            "proximo_vencimento": (
+                _somar_meses(parcela.data_inicio, pagas).isoformat() if ativo and restantes > 0 else None
+            ),
+            "data_inicio": parcela.data_inicio.isoformat() if parcela.data_inicio else None,
+            "ativo": ativo,
+            "automatico": parcela.automatico,
+        })
+    return resultado
+
+
+def caminho_projetado(usuario_id):
+    projecao = projecao_parcela()
+    stmt = selecionar(projecao).where(
+        Parcelamento.usuario_id == usuario_id,
+        filtro_parcelas_ativas()
+    )
+    return serializar_linhas(projecao, stmt)
+
+
+def medir(funcao, usuario_id, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        db.session.expire_all()
+        db.session.expunge_all()
+        inicio = time.perf_counter()
+        resultado = funcao(usuario_id)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--linhas", type=int, default=10000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "JWT_SECRET_KEY": "benchmark",
+    })
+
+    with app.app_context():
+        db.create_all()
+        usuario = Usuario(nome="Benchmark", email="bench@test.com", senha_hash="x", salario_mensal=0)
+        db.session.add(usuario)
+        db.session.commit()
+        usuario_id = usuario.id
+
+        db.session.execute(Parcelamento.__table__.insert(), [
+            {
+                "usuario_id": usuario_id,
+                "descricao": f"Parcela {i}",
+                "valor_total": 1200,
+                "valor_parcela": 100,
+                "parcelas_totais": 12,
+                "parcelas_restantes": 12,
+                # Metade segue o cronograma automático (dia 31: exercita o corte no fim do mês)
+                "data_inicio": date(2026, 1, 31) if i % 2 else date(2026, 1, 1),
+                "ativo": True,
+                "automatico": bool(i % 2),
+            }
+            for i in range(args.linhas)
+        ])
+        db.session.commit()
+
+        tempo_orm, resultado_orm = medir(caminho_orm, usuario_id, args.repeticoes)
+        tempo_proj, resultado_proj = medir(caminho_projetado, usuario_id, args.repeticoes)
+        assert resultado_orm == resultado_proj
+
+        print(f"linhas: {args.linhas}")
+        print(f"ORM (query.all + dict):      {tempo_orm * 1000:8.1f} ms")
+        print(f"Projetado (select + serial.): {tempo_proj * 1000:8.1f} ms")
+        print(f"ganho: {tempo_orm / tempo_proj:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
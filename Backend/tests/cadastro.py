@@ -37,6 +37,121 @@ def test_db_connection(client):
         except Exception as e:
             pytest.fail(f"Falha na conexão com o banco de dados: {e}")
 
+# Telemetria do pool de conexões
+def test_health_db_pool(client):
+    client.get("/health-db")
+    response = client.get("/health-db/pool")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["checkouts"] >= 1
+    assert data["em_uso"] == 0
+    assert set(data["espera_ms"]) == {"total", "max", "media"}
+
+
+def test_opcoes_engine_por_worker():
+    from app.conexoes import opcoes_engine, PoolMonitorado
+
+    assert opcoes_engine("sqlite:///:memory:", env={"DB_POOL_SIZE": "20"}) == {}
+
+    opcoes = opcoes_engine("postgresql://u:p@db/app", env={
+        "DB_MAX_CONEXOES": "40", "WEB_CONCURRENCY": "4", "DB_STATEMENT_TIMEOUT_MS": "5000"
+    })
+    assert opcoes["poolclass"] is PoolMonitorado
+    assert opcoes["pool_size"] == 10
+    assert opcoes["max_overflow"] == 0
+    assert opcoes["pool_pre_ping"] is True
+    assert opcoes["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+
+def test_pool_monitorado_conta_timeout():
+    from sqlalchemy import create_engine
+    from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+    from app.conexoes import PoolMonitorado, TelemetriaPool
+
+    engine = create_engine("sqlite://", poolclass=PoolMonitorado, pool_size=1, max_overflow=0, pool_timeout=0.05)
+    telemetria = TelemetriaPool()
+    engine.pool.telemetria = telemetria
+
+    with engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+
+    resumo = telemetria.resumo(engine.pool)
+    assert resumo["timeouts"] == 1
+    assert resumo["tamanho"] == 1
+    assert resumo["espera_ms"]["max"] >= 50
+    engine.dispose()
+
+
+# Esquema versionado: o boot não cria tabelas, `flask migrar` sim
+def test_create_app_nao_cria_esquema(tmp_path):
+    from sqlalchemy import inspect
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'boot.db'}"})
+    with app.app_context():
+        assert inspect(db.engine).get_table_names() == []
+        db.engine.dispose()
+
+
+def test_migrar_banco_novo_igual_aos_models(tmp_path):
+    from sqlalchemy import inspect
+    from app.migracoes import MIGRACOES
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'novo.db'}"})
+    runner = app.test_cli_runner()
+
+    resultado = runner.invoke(args=["migrar"])
+    assert resultado.exit_code == 0, resultado.output
+    assert f"{len(MIGRACOES)} migração(ões) aplicada(s)." in resultado.output
+
+    with app.app_context():
+        inspetor = inspect(db.engine)
+        assert set(inspetor.get_table_names()) == set(db.metadata.tables) | {"versao_schema"}
+        for nome, tabela in db.metadata.tables.items():
+            assert {c["name"] for c in inspetor.get_columns(nome)} == set(tabela.c.keys())
+            assert {i["name"] for i in inspetor.get_indexes(nome)} >= {i.name for i in tabela.indexes}
+        db.engine.dispose()
+
+    # Idempotente: a segunda execução não tem o que aplicar
+    resultado = runner.invoke(args=["migrar"])
+    assert "0 migração(ões) aplicada(s)." in resultado.output
+    assert "0 migração(ões) pendente(s)." in runner.invoke(args=["migrar", "--pendentes"]).output
+
+
+def test_migrar_banco_legado_preenche_contadores(tmp_path):
+    from sqlalchemy import create_engine, inspect
+    from app.migracoes import aplicar_migracoes
+    from app.models import GastoCategoriaMes
+
+    uri = f"sqlite:///{tmp_path / 'legado.db'}"
+    engine = create_engine(uri)
+    aplicar_migracoes(engine, ate=1)  # só as tabelas originais
+    with engine.begin() as conexao:
+        conexao.execute(text("DELETE FROM versao_schema"))  # como um banco do antigo create_all
+        conexao.execute(text(
+            "INSERT INTO usuario (id, nome, email, senha_hash, salario_mensal) VALUES (1, 'a', 'a@a.com', 'x', 1000)"
+        ))
+        conexao.execute(text(
+            "INSERT INTO registro_diario (usuario_id, descricao, categoria, valor, data_registro) VALUES "
+            "(1, 'a', 'Lazer', 10.50, '2026-03-02'), (1, 'b', 'Lazer', 4.50, '2026-03-20'), "
+            "(1, 'c', NULL, 7.00, '2026-04-01')"
+        ))
+    engine.dispose()
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": uri})
+    resultado = app.test_cli_runner().invoke(args=["migrar"])
+    assert resultado.exit_code == 0, resultado.output
+
+    with app.app_context():
+        assert "hash_conteudo" in {c["name"] for c in inspect(db.engine).get_columns("registro_diario")}
+        contadores = {
+            (c.ano, c.mes, c.categoria): (float(c.total), c.quantidade)
+            for c in GastoCategoriaMes.query.all()
+        }
+        assert contadores == {(2026, 3, "Lazer"): (15.0, 2), (2026, 4, ""): (7.0, 1)}
+        db.session.remove()
+        db.engine.dispose()
+
 # Teste de registro de usuário
 def test_register_success(client):
     response = client.post("/auth/register", json={
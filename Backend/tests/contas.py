@@ -249,6 +249,30 @@ def test_minhascontas_sql_injection(client):
     assert response.status_code in [200, 400, 404]
 
 
+def test_minhascontas_stream(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    user_id = client.get("/auth/info", headers=headers).get_json()["usuario"]["id"]
+    create_conta_fixa(client, headers, user_id)
+    create_conta_fixa(client, headers, user_id, nome="Internet", valor=120.0)
+
+    response = client.get("/contas-fixas/minhascontas?stream=1", headers=headers)
+    assert response.status_code == 200
+    assert response.is_streamed
+    data = response.get_json()
+    assert [conta["nome"] for conta in data] == ["Internet", "Aluguel"]
+
+
+def test_contas_ativas_usam_indice_parcial(client):
+    from sqlalchemy import select, func
+
+    with client.application.app_context():
+        stmt = select(func.sum(ContaFixa.valor)).where(ContaFixa.usuario_id == 1, ContaFixa.ativa == True)
+        sql = str(stmt.compile(db.engine, compile_kwargs={"literal_binds": True}))
+        plano = " ".join(str(linha[-1]) for linha in db.session.execute(text("EXPLAIN QUERY PLAN " + sql)))
+
+    assert "ix_conta_fixa_usuario_ativa" in plano
+
+
 ######################################## CONTAS FIXAS /alterar ########################################
 
 def test_alterar_conta_fixa_success(client):
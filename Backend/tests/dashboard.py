@@ -231,4 +231,186 @@ def test_soma_contas_fixas_race_condition(client):
         t.join()
 
     response = client.get("/dashboard/somacontasfixas", headers=headers)
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+
+######################################## DASHBOARD /resumo ########################################
+
+def test_resumo_dashboard_success(client):
+    from datetime import date
+    headers = create_user_and_login(client, "Iago", "iago@test.com", "123456", 5000)
+    hoje = date.today().isoformat()
+
+    client.post("/contas-fixas/create", headers=headers, json={"nome": "Aluguel", "valor": 1200, "dia_vencimento": 5})
+    client.post("/contas-fixas/create", headers=headers, json={"nome": "Antiga", "valor": 99, "dia_vencimento": 5, "ativa": False})
+    client.post("/registro/adicionar", headers=headers, json={
+        "descricao": "Mercado", "valor": 150.5, "categoria": "Alimentação", "data_registro": hoje
+    })
+    client.post("/parcelas/criar", headers=headers, json={
+        "descricao": "Notebook", "valor_total": 3000, "valor_parcela": 250, "parcelas_totais": 12, "data_inicio": hoje
+    })
+
+    response = client.get("/dashboard/resumo", headers=headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["salario_mensal"] == 5000.0
+    assert data["soma_contas_fixas"] == 1200.0
+    assert data["total_gasto_mes"] == 150.5
+    assert data["gastos_mes"] == 1
+    assert data["parcelamentos"]["quantidade_ativos"] == 1
+    assert data["parcelamentos"]["soma_total_mensal"] == 250.0
+
+
+def test_resumo_dashboard_uma_consulta(client):
+    from sqlalchemy import event
+    headers = get_auth_header(client)
+
+    with client.application.app_context():
+        engine = db.engine
+    statements = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", contar)
+    try:
+        response = client.get("/dashboard/resumo", headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", contar)
+
+    assert response.status_code == 200
+    # Busca da versão dos dados (ETag) por chave primária + o resumo em um statement
+    assert len(statements) == 2
+    assert "versao_dados" in statements[0]
+
+
+def test_resumo_dashboard_no_token(client):
+    response = client.get("/dashboard/resumo")
+    assert response.status_code == 401
+
+
+def test_resumo_dashboard_user_isolation(client):
+    headers_a = create_user_and_login(client, "UserA", "a@test.com", "123", 5000)
+    headers_b = create_user_and_login(client, "UserB", "b@test.com", "456", 8000)
+    client.post("/contas-fixas/create", headers=headers_a, json={"nome": "Luz", "valor": 100, "dia_vencimento": 10})
+
+    data_a = client.get("/dashboard/resumo", headers=headers_a).get_json()
+    data_b = client.get("/dashboard/resumo", headers=headers_b).get_json()
+
+    assert data_a["soma_contas_fixas"] == 100.0
+    assert data_b["soma_contas_fixas"] == 0.0
+    assert data_b["salario_mensal"] == 8000.0
+
+
+# ETag pela versão dos dados do usuário
+def _etag(client, headers, rota="/dashboard/resumo"):
+    response = client.get(rota, headers=headers)
+    assert response.status_code == 200
+    return response.headers["ETag"]
+
+
+def test_etag_304_sem_agregados(client):
+    from sqlalchemy import event
+
+    headers = get_auth_header(client)
+    etag = _etag(client, headers)
+    assert "private" in client.get("/dashboard/resumo", headers=headers).headers["Cache-Control"]
+
+    with client.application.app_context():
+        engine = db.engine
+    statements = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", contar)
+    try:
+        response = client.get("/dashboard/resumo", headers={**headers, "If-None-Match": etag})
+    finally:
+        event.remove(engine, "before_cursor_execute", contar)
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.data == b""
+    assert len(statements) == 1
+    assert "versao_dados_usuario" in statements[0]
+
+
+def test_etag_muda_a_cada_escrita(client):
+    headers = get_auth_header(client)
+    etags = [_etag(client, headers)]
+
+    escritas = [
+        lambda: client.post("/contas-fixas/create", headers=headers, json={"nome": "Luz", "valor": 100, "dia_vencimento": 10}),
+        lambda: client.post("/registro/adicionar", headers=headers, json={
+            "descricao": "Almoço", "valor": 30, "categoria": "Alimentação", "data_registro": "2026-05-05"
+        }),
+        lambda: client.post("/registro/adicionar-lote", headers=headers, json={"gastos": [
+            {"descricao": "Uber", "valor": 20, "categoria": "Transporte", "data_registro": "2026-05-06"}
+        ]}),
+        lambda: client.put("/auth/alterar", headers=headers, json={"salario_mensal": 6000}),
+    ]
+    for escrita in escritas:
+        assert escrita().status_code < 300
+        etags.append(_etag(client, headers))
+
+    assert len(set(etags)) == len(etags)
+    response = client.get("/dashboard/resumo", headers={**headers, "If-None-Match": etags[0]})
+    assert response.status_code == 200
+
+
+def test_etag_escrita_invalida_nao_muda_versao(client):
+    headers = get_auth_header(client)
+    etag = _etag(client, headers)
+
+    response = client.post("/registro/adicionar", headers=headers, json={"descricao": "", "valor": -1})
+    assert response.status_code == 400
+    assert client.get("/dashboard/resumo", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+
+def test_etag_por_usuario(client):
+    headers_a = get_auth_header(client, "UserA", "123")
+    headers_b = get_auth_header(client, "UserB", "456")
+
+    etag_a = _etag(client, headers_a)
+    assert _etag(client, headers_b) != etag_a
+    assert client.get("/dashboard/resumo", headers={**headers_b, "If-None-Match": etag_a}).status_code == 200
+
+
+def test_etag_muda_com_a_data():
+    from datetime import date
+    from app.versao_dados import gerar_etag
+
+    assert gerar_etag(1, 5, date(2026, 5, 5)) != gerar_etag(1, 5, date(2026, 5, 6))
+    assert gerar_etag(1, 5, date(2026, 5, 5)) == gerar_etag(1, 5, date(2026, 5, 5))
+
+
+def test_etag_muda_apos_comandos_de_manutencao(client):
+    from datetime import date
+    from app.models import Parcelamento
+
+    # Cliente fora do `with`: nenhuma identidade JWT sobra de uma requisição
+    # anterior para o comando, como num `flask ...` de verdade
+    cliente = client.application.test_client()
+    headers = get_auth_header(cliente)
+    headers_outro = get_auth_header(cliente, "UserB", "456")
+    assert cliente.post("/registro/adicionar", headers=headers, json={
+        "descricao": "Almoço", "valor": 30, "categoria": "Alimentação", "data_registro": "2025-03-05"
+    }).status_code == 201
+    with client.application.app_context():
+        usuario_id = Usuario.query.filter_by(nome="Iago").one().id
+        db.session.add(Parcelamento(
+            usuario_id=usuario_id, descricao="TV", valor_total=1200, valor_parcela=100,
+            parcelas_totais=12, parcelas_restantes=12, data_inicio=date(2025, 1, 10), automatico=True
+        ))
+        db.session.commit()
+
+    runner = client.application.test_cli_runner()
+    etag_outro = _etag(cliente, headers_outro)
+    for comando in (["fechar-meses"], ["contadores-categoria", "--reconstruir"], ["parcelas-cronograma"]):
+        etag = _etag(cliente, headers)
+        resultado = runner.invoke(args=comando)
+        assert resultado.exit_code == 0, resultado.output
+        assert _etag(cliente, headers) != etag, comando
+
+    # Quem não foi afetado mantém a versão
+    assert _etag(cliente, headers_outro) == etag_outro
@@ -197,6 +197,401 @@ def test_adicionar_gasto_race_condition(client):
     assert response.status_code == 200
 
 
+######################################## REGISTRO /adicionar-lote ########################################
+
+def test_adicionar_lote_success(client):
+    from app.contadores import verificar_contadores
+    headers = get_auth_header(client, "Iago", "123456")
+    gastos = [
+        {"descricao": f"Item {i}", "valor": 10, "categoria": "Lazer" if i % 2 else "Outros",
+         "data_registro": "2026-05-0%d" % (i % 9 + 1)}
+        for i in range(1200)
+    ]
+
+    response = client.post("/registro/adicionar-lote", headers=headers, json=gastos)
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data["inseridos"] == 1200
+    assert len({r["id"] for r in data["resultados"]}) == 1200
+
+    total = client.get("/registro/total-gasto-categoria?mes=5&ano=2026", headers=headers).get_json()["total_por_categoria"]
+    assert total["Lazer"] == 6000.0
+    assert total["Outros"] == 6000.0
+    with client.application.app_context():
+        assert verificar_contadores() == []
+        primeiro = db.session.get(RegistroDiario, data["resultados"][0]["id"])
+        assert primeiro.descricao == "Item 0"
+
+
+def test_adicionar_lote_parcial(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    response = client.post("/registro/adicionar-lote", headers=headers, json={"gastos": [
+        {"descricao": "Ok", "valor": 10, "categoria": "Lazer", "data_registro": "2026-05-05"},
+        {"descricao": "Ruim", "valor": -1, "categoria": "Lazer", "data_registro": "2026-05-05"},
+        {"descricao": "Ruim", "valor": 1, "categoria": "Hacker", "data_registro": "2026-05-05"},
+        "texto",
+    ]})
+    assert response.status_code == 207
+    resultados = response.get_json()["resultados"]
+    assert [r["status"] for r in resultados] == [201, 400, 400, 400]
+    assert resultados[1]["error"] == "Valor não pode ser negativo"
+
+
+def test_adicionar_lote_invalido(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    assert client.post("/registro/adicionar-lote", headers=headers, json=[]).status_code == 400
+    assert client.post("/registro/adicionar-lote", headers=headers, json={"descricao": "x"}).status_code == 400
+    assert client.post("/registro/adicionar-lote", json=[]).status_code == 401
+
+    todos_invalidos = client.post("/registro/adicionar-lote", headers=headers, json=[{"descricao": "x"}])
+    assert todos_invalidos.status_code == 400
+    assert todos_invalidos.get_json()["rejeitados"] == 1
+
+
+######################################## REGISTRO /importar ########################################
+
+EXTRATO_OFX = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20260505120000[-3:BRT]<TRNAMT>-50.00<FITID>A1<MEMO>IFOOD *PIZZA</STMTTRN>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20260506<TRNAMT>-80,00<FITID>A2<NAME>FARMACIA SAO JOAO</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260506<TRNAMT>1000.00<FITID>A3<NAME>SALARIO</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>"""
+
+
+def test_importar_csv_deduplica(client):
+    import io
+    from app.contadores import verificar_contadores
+    headers = get_auth_header(client, "Iago", "123456")
+    linhas = ["Data;Histórico;Valor"] + [
+        f"{dia:02d}/05/2026;UBER *TRIP;-{dia},50" for dia in range(1, 31) for _ in range(100)
+    ] + ["31/05/2026;PIX RECEBIDO;500,00", "xx/05/2026;ERRO;-1,00"]
+    conteudo = ("\n".join(linhas)).encode("utf-8")
+
+    response = client.post("/registro/importar", headers=headers, data={
+        "arquivo": (io.BytesIO(conteudo), "extrato.csv")
+    }, content_type="multipart/form-data")
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data["importados"] == 3000
+    assert data["ignorados"] == 2
+    assert data["erros"][0]["linha"] == 3003
+
+    total = client.get("/registro/total-gasto-categoria?mes=5&ano=2026", headers=headers).get_json()["total_por_categoria"]
+    assert total["Transporte"] == sum((dia + 0.5) * 100 for dia in range(1, 31))
+
+    # Reimportar o mesmo arquivo não duplica nada
+    response = client.post("/registro/importar", headers=headers, data={
+        "arquivo": (io.BytesIO(conteudo), "extrato.csv")
+    }, content_type="multipart/form-data")
+    assert response.status_code == 200
+    assert response.get_json()["duplicados"] == 3000
+    with client.application.app_context():
+        assert RegistroDiario.query.count() == 3000
+        assert verificar_contadores() == []
+
+
+def test_importar_csv_mesmo_dia_em_blocos_conta_ocorrencias(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    # O mesmo dia aparece em dois blocos: a segunda compra igual não pode virar duplicata
+    conteudo = "\n".join([
+        "Data;Histórico;Valor",
+        "05/05/2026;PADARIA;-10,00",
+        "06/05/2026;UBER *TRIP;-20,00",
+        "05/05/2026;PADARIA;-10,00",
+    ]).encode("utf-8")
+
+    response = client.post("/registro/importar?formato=csv", headers=headers,
+                           data=conteudo, content_type="text/csv")
+    assert response.status_code == 201
+    assert response.get_json()["importados"] == 3
+
+    repetido = client.post("/registro/importar?formato=csv", headers=headers,
+                           data=conteudo, content_type="text/csv")
+    assert repetido.get_json()["duplicados"] == 3
+
+
+def test_importar_ofx_corpo_bruto(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    response = client.post("/registro/importar?formato=ofx", headers=headers,
+                           data=EXTRATO_OFX.encode(), content_type="application/x-ofx")
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data["importados"] == 2
+    assert data["ignorados"] == 1
+
+    gastos = client.get("/registro/mostrar", headers=headers).get_json()["gastos"]
+    assert {(g["descricao"], g["categoria"], g["valor"]) for g in gastos} == {
+        ("IFOOD *PIZZA", "Alimentação", 50.0), ("FARMACIA SAO JOAO", "Saúde", 80.0)
+    }
+
+    repetido = client.post("/registro/importar?formato=ofx", headers=headers,
+                           data=EXTRATO_OFX.encode(), content_type="application/x-ofx")
+    assert repetido.get_json()["duplicados"] == 2
+
+
+def test_importar_extrato_invalido(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    assert client.post("/registro/importar", headers=headers, data=b"x").status_code == 400
+    response = client.post("/registro/importar?formato=csv", headers=headers,
+                           data=b"a;b\n1;2\n", content_type="text/csv")
+    assert response.status_code == 400
+    assert client.post("/registro/importar?formato=csv").status_code == 401
+
+
+def test_importar_erro_interno_nao_vaza_mensagem(client, monkeypatch):
+    import app.importacao
+
+    def falhar(*args, **kwargs):
+        raise ValueError("detalhe interno da biblioteca")
+
+    monkeypatch.setattr(app.importacao, "categorizar", falhar)
+    headers = get_auth_header(client, "Iago", "123456")
+    response = client.post("/registro/importar?formato=csv", headers=headers,
+                           data="Data;Histórico;Valor\n05/05/2026;PADARIA;-10,00".encode(), content_type="text/csv")
+    assert response.status_code == 500
+    assert "detalhe interno" not in response.get_data(as_text=True)
+
+######################################## REGISTRO /exportar ########################################
+
+def test_exportar_csv_gzip(client):
+    import csv, gzip, io
+    headers = get_auth_header(client, "Iago", "123456")
+    create_gasto(client, headers, descricao="Abril", valor=10, data_registro="2026-04-30")
+    create_gasto(client, headers, descricao="Maio", valor=20.5, data_registro="2026-05-01")
+    client.post("/contas-fixas/create", headers=headers, json={"nome": "Aluguel", "valor": 1500, "dia_vencimento": 5})
+    client.post("/parcelas/criar", headers=headers, json={
+        "descricao": "TV", "valor_total": 3000, "valor_parcela": 250, "parcelas_totais": 12, "data_inicio": "2026-05-05"
+    })
+
+    response = client.get("/registro/exportar?formato=csv&de=2026-05-01&ate=2026-05-31", headers=headers)
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "application/gzip"
+
+    linhas = list(csv.DictReader(io.StringIO(gzip.decompress(response.data).decode("utf-8"))))
+    assert [(linha["tipo"], linha["descricao"]) for linha in linhas] == [
+        ("registro", "Maio"), ("conta_fixa", "Aluguel"), ("parcelamento", "TV")
+    ]
+    assert linhas[0]["valor"] == "20.50"
+    assert linhas[2]["parcelas_totais"] == "12"
+
+
+def test_exportar_parquet_row_groups(client, monkeypatch):
+    import io
+    import pyarrow.parquet as pq
+    import app.exportacao as exportacao
+    monkeypatch.setattr(exportacao, "EXPORTACAO_LOTE", 2)
+
+    headers = get_auth_header(client, "Iago", "123456")
+    for dia in range(1, 6):
+        create_gasto(client, headers, descricao=f"Dia {dia}", valor=dia, data_registro=f"2026-05-0{dia}")
+
+    response = client.get("/registro/exportar?formato=parquet", headers=headers)
+    assert response.status_code == 200
+
+    arquivo = pq.ParquetFile(io.BytesIO(response.data))
+    assert arquivo.metadata.num_row_groups == 3
+    tabela = arquivo.read()
+    assert tabela.column("descricao").to_pylist() == [f"Dia {dia}" for dia in range(1, 6)]
+    assert [float(v) for v in tabela.column("valor").to_pylist()] == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_exportar_ate_data_maxima(client):
+    import csv, gzip, io
+    headers = get_auth_header(client, "Iago", "123456")
+    create_gasto(client, headers, descricao="Maio", data_registro="2026-05-31")
+
+    response = client.get("/registro/exportar?formato=csv&ate=9999-12-31", headers=headers)
+    assert response.status_code == 200
+    linhas = list(csv.DictReader(io.StringIO(gzip.decompress(response.data).decode("utf-8"))))
+    assert [linha["descricao"] for linha in linhas] == ["Maio"]
+
+
+def test_exportar_parametros_invalidos(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    assert client.get("/registro/exportar?formato=xlsx", headers=headers).status_code == 400
+    assert client.get("/registro/exportar?de=05-2026", headers=headers).status_code == 400
+    assert client.get("/registro/exportar").status_code == 401
+
+
+######################################## REGISTRO réplica de leitura ########################################
+
+@pytest.fixture
+def client_replica(tmp_path):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'primario.db'}",
+        "DATABASE_REPLICA_URL": f"sqlite:///{tmp_path / 'replica.db'}",
+        "JWT_SECRET_KEY": os.getenv("JWT_SECRET_KEY", "test_secret_key_only_for_testing_2026")
+    })
+
+    with app.app_context():
+        db.create_all()
+        db.metadata.create_all(app.extensions["engine_replica"])
+
+    with app.test_client() as client:
+        yield client
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.metadata.drop_all(app.extensions["engine_replica"])
+
+
+def _gastos_na_replica(client, descricao):
+    with client.application.app_context():
+        with client.application.extensions["engine_replica"].begin() as conexao:
+            conexao.execute(RegistroDiario.__table__.insert(), [{
+                "usuario_id": 1, "descricao": descricao, "categoria": "Outros",
+                "valor": 1, "data_registro": date(2026, 5, 5)
+            }])
+
+
+def test_replica_leitura_e_leia_suas_escritas(client_replica):
+    headers = get_auth_header(client_replica, "Iago", "123456")
+    _gastos_na_replica(client_replica, "Só na réplica")
+
+    # Escrita vai para o primário; dentro da janela a leitura do autor também
+    assert create_gasto(client_replica, headers, descricao="No primário").status_code == 201
+    gastos = client_replica.get("/registro/mostrar", headers=headers).get_json()["gastos"]
+    assert [g["descricao"] for g in gastos] == ["No primário"]
+
+    # Fora da janela, GETs dos blueprints de dados leem da réplica
+    client_replica.application.extensions["janela_escritas"].segundos = 0
+    client_replica.application.extensions["janela_escritas"]._ate.clear()
+    gastos = client_replica.get("/registro/mostrar", headers=headers).get_json()["gastos"]
+    assert [g["descricao"] for g in gastos] == ["Só na réplica"]
+
+    # Rotas fora dos blueprints de dados continuam no primário
+    assert client_replica.get("/auth/info", headers=headers).status_code == 200
+
+
+def test_replica_janela_compartilhada_entre_workers(client_replica):
+    from app.replica import JanelaEscritasRedis
+
+    # Dois workers (apps) sobre os mesmos bancos; a janela fica no "Redis" comum
+    app_a = client_replica.application
+    app_b = create_app(dict(app_a.config))
+    redis_local = RedisLocal()
+    for app in (app_a, app_b):
+        app.extensions["janela_escritas"] = JanelaEscritasRedis(redis_local, segundos=5)
+
+    headers = get_auth_header(client_replica, "Iago", "123456")
+    _gastos_na_replica(client_replica, "Só na réplica")
+    assert create_gasto(client_replica, headers, descricao="No primário").status_code == 201
+
+    # A escrita foi no worker A; a leitura logo depois, no B, ainda vai ao primário
+    gastos = app_b.test_client().get("/registro/mostrar", headers=headers).get_json()["gastos"]
+    assert [g["descricao"] for g in gastos] == ["No primário"]
+
+    redis_local.valores.clear()  # janela expirou
+    gastos = app_b.test_client().get("/registro/mostrar", headers=headers).get_json()["gastos"]
+    assert [g["descricao"] for g in gastos] == ["Só na réplica"]
+
+
+def test_replica_escrita_sempre_no_primario(client_replica):
+    from flask import g
+    app = client_replica.application
+    with app.test_request_context("/registro/mostrar"):
+        g.usar_replica = True
+        usuario = Usuario(nome="Iago", email="iago@test.com", salario_mensal=0)
+        usuario.set_password("123456")
+        db.session.add(usuario)
+        db.session.commit()
+        assert db.session.get_bind(Usuario) is client_replica.application.extensions["engine_replica"]
+
+    with app.app_context():
+        assert Usuario.query.count() == 1
+        with client_replica.application.extensions["engine_replica"].connect() as conexao:
+            assert conexao.execute(text("SELECT COUNT(*) FROM usuario")).scalar() == 0
+
+
+######################################## REGISTRO particionamento ########################################
+
+def test_faixas_particao_mes_e_ano():
+    from app.particionamento import faixas_particao
+
+    assert faixas_particao(date(2026, 11, 15), date(2027, 2, 1), "mes") == [
+        ("registro_diario_p2026_11", date(2026, 11, 1), date(2026, 12, 1)),
+        ("registro_diario_p2026_12", date(2026, 12, 1), date(2027, 1, 1)),
+        ("registro_diario_p2027_01", date(2027, 1, 1), date(2027, 2, 1)),
+    ]
+    assert faixas_particao(date(2026, 5, 1), date(2027, 1, 1), "ano") == [
+        ("registro_diario_p2026", date(2026, 1, 1), date(2027, 1, 1)),
+    ]
+
+
+def test_ddl_migracao_anexa_tabela_existente():
+    from app.particionamento import ddl_migracao, ddl_nova_particao
+
+    ddl = ddl_migracao(date(2026, 5, 1), "mes")
+    assert "PARTITION BY RANGE (data_registro)" in " ".join(ddl)
+    assert ddl[-3].endswith("FOR VALUES FROM (MINVALUE) TO ('2026-05-01')")
+    assert any("PRIMARY KEY (id, data_registro)" in comando for comando in ddl)
+
+    nova = ddl_nova_particao("registro_diario_p2026_05", date(2026, 5, 1), date(2026, 6, 1))
+    assert nova[-1].endswith("FOR VALUES FROM ('2026-05-01') TO ('2026-06-01')")
+
+
+class _ConexaoGravada:
+    # Conexão falsa: tabela ainda não particionada e sem partições; guarda o DDL emitido
+    def __init__(self):
+        self.comandos = []
+
+    def execute(self, comando, parametros=None):
+        self.comandos.append(str(comando))
+        return self
+
+    def scalar(self):
+        return None
+
+    def scalars(self):
+        return []
+
+
+def test_manter_particoes_migrar_gera_ddl():
+    import click
+    from app.particionamento import manter_particoes
+
+    conexao = _ConexaoGravada()
+    atual, criadas, antigas = manter_particoes(conexao, "mes", migrar=True, periodos_futuros=1, hoje=date(2026, 5, 10))
+    ddl = [comando for comando in conexao.comandos if not comando.startswith("SELECT")]
+
+    assert atual == "mes"
+    assert criadas == ["registro_diario_p2026_05", "registro_diario_p2026_06"]
+    assert antigas == []
+    assert ddl[0] == "LOCK TABLE registro_diario IN ACCESS EXCLUSIVE MODE"
+    assert "ALTER TABLE registro_diario RENAME TO registro_diario_historico" in ddl
+    assert ("CREATE UNIQUE INDEX uq_registro_diario_usuario_hash ON registro_diario "
+            "(usuario_id, hash_conteudo, data_registro) WHERE hash_conteudo IS NOT NULL") in ddl
+    assert ("ALTER TABLE registro_diario ATTACH PARTITION registro_diario_historico "
+            "FOR VALUES FROM (MINVALUE) TO ('2026-05-01')") in ddl
+    assert "CREATE TABLE registro_diario_padrao PARTITION OF registro_diario DEFAULT" in ddl
+    assert ddl[-1] == ("ALTER TABLE registro_diario ATTACH PARTITION registro_diario_p2026_06 "
+                       "FOR VALUES FROM ('2026-06-01') TO ('2026-07-01')")
+
+    # Sem --migrar, uma tabela comum é recusada antes de qualquer DDL
+    conexao = _ConexaoGravada()
+    with pytest.raises(click.ClickException):
+        manter_particoes(conexao, hoje=date(2026, 5, 10))
+    assert all(comando.startswith("SELECT") for comando in conexao.comandos)
+
+
+def test_hash_conteudo_inclui_data_tambem_com_fitid():
+    # O índice único particionado inclui data_registro: o hash precisa determinar a data
+    from app.importacao import hash_conteudo
+
+    assert hash_conteudo(date(2026, 5, 1), 10, "Mercado", "F1") == hash_conteudo(date(2026, 5, 1), 99, "Outro", "F1")
+    assert hash_conteudo(date(2026, 5, 1), 10, "Mercado", "F1") != hash_conteudo(date(2026, 5, 2), 10, "Mercado", "F1")
+
+
+def test_particoes_registro_exige_postgres(client):
+    from app.particionamento import particoes_registro_command
+    resultado = client.application.test_cli_runner().invoke(particoes_registro_command, ["--migrar"])
+    assert resultado.exit_code != 0
+    assert "PostgreSQL" in resultado.output
+
+
 ######################################## REGISTRO /mostrar ########################################
 
 def test_mostrar_gastos_success(client):
@@ -255,6 +650,73 @@ def test_mostrar_gastos_multiple_requests(client):
         assert response.status_code == 200
 
 
+def test_mostrar_gastos_paginacao_keyset(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    for dia in range(1, 8):
+        create_gasto(client, headers, descricao=f"Dia {dia}", valor=dia, data_registro=f"2026-05-0{dia}")
+    create_gasto(client, headers, descricao="Dia 7b", valor=7, data_registro="2026-05-07")
+
+    vistos = []
+    cursor = None
+    paginas = 0
+    while True:
+        url = "/registro/mostrar?limite=3" + (f"&cursor={cursor}" if cursor else "")
+        data = client.get(url, headers=headers).get_json()
+        vistos += [g["descricao"] for g in data["gastos"]]
+        paginas += 1
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+
+    assert paginas == 3
+    assert vistos == ["Dia 7b", "Dia 7", "Dia 6", "Dia 5", "Dia 4", "Dia 3", "Dia 2", "Dia 1"]
+
+
+def test_mostrar_gastos_filtro_datas(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    create_gasto(client, headers, descricao="Abril", data_registro="2026-04-30")
+    create_gasto(client, headers, descricao="Maio", data_registro="2026-05-15")
+    create_gasto(client, headers, descricao="Junho", data_registro="2026-06-01")
+
+    data = client.get("/registro/mostrar?de=2026-05-01&ate=2026-05-31", headers=headers).get_json()
+    assert [g["descricao"] for g in data["gastos"]] == ["Maio"]
+    assert data["next_cursor"] is None
+
+
+def test_mostrar_gastos_ate_inclusivo_e_data_maxima(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    create_gasto(client, headers, descricao="Último dia", data_registro="2026-05-31")
+
+    data = client.get("/registro/mostrar?ate=2026-05-31", headers=headers).get_json()
+    assert [g["descricao"] for g in data["gastos"]] == ["Último dia"]
+
+    response = client.get("/registro/mostrar?de=2026-01-01&ate=9999-12-31", headers=headers)
+    assert response.status_code == 200
+    assert len(response.get_json()["gastos"]) == 1
+
+
+def test_mostrar_gastos_parametros_invalidos(client):
+    headers = get_auth_header(client)
+    assert client.get("/registro/mostrar?limite=0", headers=headers).status_code == 400
+    assert client.get("/registro/mostrar?limite=100000", headers=headers).status_code == 400
+    assert client.get("/registro/mostrar?cursor=lixo", headers=headers).status_code == 400
+    assert client.get("/registro/mostrar?de=ontem", headers=headers).status_code == 400
+
+
+def test_mostrar_gastos_stream(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    for dia in range(1, 6):
+        create_gasto(client, headers, descricao=f"Dia {dia}", valor=dia, data_registro=f"2026-05-0{dia}")
+
+    normal = client.get("/registro/mostrar", headers=headers)
+    response = client.get("/registro/mostrar?stream=1&limite=2", headers=headers)
+    assert response.status_code == 200
+    assert response.is_streamed
+    data = response.get_json()
+    assert data["gastos"] == normal.get_json()["gastos"]
+    assert data["next_cursor"] is None
+
+
 ######################################## REGISTRO /alterar ########################################
 
 def test_alterar_gasto_success(client):
@@ -361,6 +823,34 @@ def test_alterar_gasto_race_condition(client):
     assert response.status_code == 200
 
 
+def test_alterar_e_deletar_gasto_leem_com_for_update(client):
+    # O delta dos contadores parte do valor gravado: a linha é lida com FOR UPDATE
+    from sqlalchemy import event
+    from app.contadores import verificar_contadores
+    from app.extensions import SessaoRoteada
+
+    headers = get_auth_header(client)
+    gasto_id = create_gasto(client, headers, valor=10, categoria="Lazer").get_json()["gasto_diario"]["id"]
+    bloqueios = []
+
+    def registrar(estado):
+        entidades = [d["entity"] for d in estado.statement.column_descriptions] if estado.is_select else []
+        if RegistroDiario in entidades and estado.statement._for_update_arg is not None:
+            bloqueios.append(estado.statement)
+
+    event.listen(SessaoRoteada, "do_orm_execute", registrar)
+    try:
+        client.put(f"/registro/alterar/{gasto_id}", headers=headers, json={"valor": 30, "categoria": "Transporte"})
+        client.put(f"/registro/alterar/{gasto_id}", headers=headers, json={"categoria": "Alimentação"})
+        client.delete(f"/registro/deletar/{gasto_id}", headers=headers)
+    finally:
+        event.remove(SessaoRoteada, "do_orm_execute", registrar)
+
+    assert len(bloqueios) == 3  # uma leitura bloqueante por requisição
+    with client.application.app_context():
+        assert verificar_contadores() == []
+
+
 ######################################## REGISTRO /deletar ########################################
 
 def test_deletar_gasto_success(client):
@@ -512,6 +1002,33 @@ def test_percentual_gasto_categoria_no_gastos(client):
     assert all(v == 0.0 for v in data["percentual_por_categoria"].values())
 
 
+def test_percentual_gasto_categoria_completo(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    create_gasto(client, headers, valor=60, categoria="Lazer", data_registro="2026-05-05")
+    create_gasto(client, headers, valor=40, categoria="Saúde", data_registro="2026-05-06")
+
+    response = client.get("/registro/percentual-gasto-categoria/5/2026?completo=true", headers=headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["total"] == 100.0
+    assert data["total_por_categoria"]["Lazer"] == 60.0
+    assert data["percentual_por_categoria"]["Lazer"] == 60.0
+    assert data["percentual_por_categoria"]["Saúde"] == 40.0
+
+
+def test_total_gasto_categoria_completo(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    create_gasto(client, headers, valor=30, categoria="Compras", data_registro="2026-05-05")
+
+    response = client.get("/registro/total-gasto-categoria/5/2026?completo=1", headers=headers)
+    data = response.get_json()
+    assert data["total_por_categoria"]["Compras"] == 30.0
+    assert data["percentual_por_categoria"]["Compras"] == 100.0
+
+    response = client.get("/registro/total-gasto-categoria/5/2026", headers=headers)
+    assert "percentual_por_categoria" not in response.get_json()
+
+
 ######################################## REGISTRO /total-gasto-ano ########################################
 
 def test_total_gasto_ano_success(client):
@@ -543,6 +1060,50 @@ def test_total_gasto_ano_invalid_ano(client):
     assert response.status_code == 400
 
 
+def test_total_gasto_ano_estatisticas(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    create_gasto(client, headers, valor=10, data_registro="2026-01-15")
+    create_gasto(client, headers, valor=30, data_registro="2026-06-20")
+
+    response = client.get("/registro/total-gasto-ano?ano=2026", headers=headers)
+    data = response.get_json()
+    assert data["minimo"] == 10.0
+    assert data["maximo"] == 30.0
+    assert data["media"] == 20.0
+
+
+######################################## REGISTRO /resumo-periodo ########################################
+
+def test_resumo_periodo_success(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    create_gasto(client, headers, valor=10, data_registro="2026-05-01")
+    create_gasto(client, headers, valor=20, data_registro="2026-05-10")
+    create_gasto(client, headers, valor=90, data_registro="2026-05-11")
+
+    response = client.get("/registro/resumo-periodo?de=2026-05-01&ate=2026-05-10", headers=headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["total"] == 30.0
+    assert data["gastos"] == 2
+    assert data["minimo"] == 10.0
+    assert data["maximo"] == 20.0
+    assert data["media"] == 15.0
+
+
+def test_resumo_periodo_invalid_params(client):
+    headers = get_auth_header(client)
+    assert client.get("/registro/resumo-periodo", headers=headers).status_code == 400
+    assert client.get("/registro/resumo-periodo?de=abc&ate=2026-05-10", headers=headers).status_code == 400
+    assert client.get("/registro/resumo-periodo?de=2026-06-01&ate=2026-05-10", headers=headers).status_code == 400
+    assert client.get("/registro/resumo-periodo?de=2026-06-01&ate=9999-12-31", headers=headers).status_code == 400
+    assert client.get("/registro/resumo-periodo?de=2026-06-01&ate=9999-12-30", headers=headers).status_code == 200
+
+
+def test_resumo_periodo_no_token(client):
+    response = client.get("/registro/resumo-periodo?de=2026-05-01&ate=2026-05-10")
+    assert response.status_code == 401
+
+
 ######################################## REGISTRO /total-gasto-mes-ano ########################################
 
 def test_total_gasto_mes_ano_success(client):
@@ -570,4 +1131,595 @@ def test_total_gasto_mes_ano_missing_params(client):
 def test_total_gasto_mes_ano_invalid_ano(client):
     headers = get_auth_header(client)
     response = client.get("/registro/total-gasto-mes-ano?ano=1800", headers=headers)
-    assert response.status_code == 400
\ No newline at end of file
+    assert response.status_code == 400
+
+######################################## REGISTRO /matriz-anual ########################################
+
+def test_matriz_anual_success(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    create_gasto(client, headers, valor=100, categoria="Alimentação", data_registro="2026-01-10")
+    create_gasto(client, headers, valor=50, categoria="Alimentação", data_registro="2026-01-20")
+    create_gasto(client, headers, valor=50, categoria="Lazer", data_registro="2026-01-25")
+    create_gasto(client, headers, valor=30, categoria="Transporte", data_registro="2026-12-31")
+    create_gasto(client, headers, valor=999, categoria="Lazer", data_registro="2025-12-31")
+
+    response = client.get("/registro/matriz-anual?ano=2026", headers=headers)
+    assert response.status_code == 200
+    data = response.get_json()
+
+    categorias = data["categorias"]
+    assert data["meses"] == list(range(1, 13))
+    assert len(data["valores"]) == 12
+    assert all(len(linha) == len(categorias) == 7 for linha in data["valores"])
+    assert data["valores"][0][categorias.index("Alimentação")] == 150.0
+    assert data["valores"][0][categorias.index("Lazer")] == 50.0
+    assert data["valores"][11][categorias.index("Transporte")] == 30.0
+    assert data["total_por_mes"][0] == 200.0
+    assert data["total_por_mes"][1:11] == [0.0] * 10
+    assert data["total_por_categoria"][categorias.index("Alimentação")] == 150.0
+    assert data["total"] == 230.0
+    assert "percentuais" not in data
+
+    # Mesmos números que as chamadas por mês que a matriz substitui
+    por_mes = client.get("/registro/total-gasto-categoria/1/2026", headers=headers).get_json()["total_por_categoria"]
+    assert dict(zip(categorias, data["valores"][0])) == por_mes
+
+
+def test_matriz_anual_percentuais(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    create_gasto(client, headers, valor=75, categoria="Alimentação", data_registro="2026-03-10")
+    create_gasto(client, headers, valor=25, categoria="Saúde", data_registro="2026-03-11")
+
+    data = client.get("/registro/matriz-anual?ano=2026&completo=true", headers=headers).get_json()
+    categorias = data["categorias"]
+    assert data["percentuais"][2][categorias.index("Alimentação")] == 75.0
+    assert data["percentuais"][2][categorias.index("Saúde")] == 25.0
+    assert data["percentuais"][0] == [0.0] * 7
+
+
+def test_matriz_anual_uma_consulta(client):
+    from sqlalchemy import event
+
+    headers = get_auth_header(client)
+    create_gasto(client, headers, valor=10, data_registro="2026-02-02")
+    with client.application.app_context():
+        engine = db.engine
+    statements = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", contar)
+    try:
+        response = client.get("/registro/matriz-anual?ano=2026", headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", contar)
+
+    assert response.status_code == 200
+    assert len(statements) == 2  # versão dos dados (ETag) + a matriz
+    assert "GROUP BY" in statements[1]
+
+
+def test_matriz_anual_invalid_and_no_token(client):
+    headers = get_auth_header(client)
+    assert client.get("/registro/matriz-anual?ano=1800", headers=headers).status_code == 400
+    assert client.get("/registro/matriz-anual?ano=2026").status_code == 401
+
+######################################## REGISTRO índice (usuario_id, data_registro) ########################################
+
+def test_agregado_mes_usa_indice_usuario_data(client):
+    from sqlalchemy import select, func
+    from app.services import intervalo_mes, filtro_registros_periodo
+
+    with client.application.app_context():
+        inicio, fim = intervalo_mes(5, 2026)
+        stmt = select(func.sum(RegistroDiario.valor)).where(*filtro_registros_periodo(1, inicio, fim))
+        sql = str(stmt.compile(db.engine, compile_kwargs={"literal_binds": True}))
+        plano = " ".join(str(linha[-1]) for linha in db.session.execute(text("EXPLAIN QUERY PLAN " + sql)))
+
+    assert "ix_registro_diario_usuario_data" in plano
+    assert "data_registro>" in plano.replace(" ", "")
+
+
+def test_total_gasto_mes_intervalo_semiaberto(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    create_gasto(client, headers, valor=10, data_registro="2026-04-30")
+    create_gasto(client, headers, valor=20, data_registro="2026-05-01")
+    create_gasto(client, headers, valor=30, data_registro="2026-05-31")
+    create_gasto(client, headers, valor=40, data_registro="2026-06-01")
+
+    response = client.get("/registro/total-gasto-mes/5/2026", headers=headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["total"] == 50.0
+    assert data["gastos"] == 2
+
+
+
+######################################## REGISTRO fechamento de mês (historico_fatura) ########################################
+
+def test_fechar_meses_consolida_historico(client):
+    from app.fechamento import fechar_meses_pendentes
+    from app.models import HistoricoFatura
+    headers = get_auth_header(client, "Iago", "123456")
+    create_gasto(client, headers, valor=100, data_registro="2025-03-10")
+    create_gasto(client, headers, valor=50, data_registro="2025-03-20")
+
+    with client.application.app_context():
+        criados = fechar_meses_pendentes(hoje=date(2025, 6, 15))
+        linhas = {h.mes: h for h in HistoricoFatura.query.filter_by(ano=2025).all()}
+
+        assert criados == 5
+        assert sorted(linhas) == [1, 2, 3, 4, 5]
+        assert float(linhas[3].total_gastos_registro) == 150.0
+        # Só o mês recém-encerrado tem retrato; os fechados com atraso ficam nulos
+        assert linhas[3].saldo_final is None
+        assert linhas[3].total_contas_fixas is None
+        assert float(linhas[5].salario_mensal) == 5000.0
+        assert float(linhas[5].saldo_final) == 5000.0
+        assert fechar_meses_pendentes(hoje=date(2025, 6, 15)) == 0
+
+
+def test_fechar_meses_retrato_ignora_parcelas_encerradas(client):
+    from app.fechamento import fechar_meses_pendentes
+    from app.models import HistoricoFatura, Parcelamento, Usuario
+    headers = get_auth_header(client, "Iago", "123456")
+    create_gasto(client, headers, valor=100, data_registro="2025-05-10")
+
+    with client.application.app_context():
+        usuario_id = Usuario.query.one().id
+        comum = dict(usuario_id=usuario_id, valor_total=1000, valor_parcela=100, parcelas_totais=10,
+                     data_inicio=date(2025, 1, 5))
+        db.session.add_all([
+            Parcelamento(descricao="Em andamento", parcelas_restantes=6, ativo=True, **comum),
+            Parcelamento(descricao="Excluído", parcelas_restantes=6, ativo=False, **comum),
+            Parcelamento(descricao="Quitado antes", parcelas_restantes=0, ativo=False, **comum),
+        ])
+        db.session.commit()
+
+        fechar_meses_pendentes(hoje=date(2025, 6, 15), usuario_id=usuario_id)
+        maio = HistoricoFatura.query.filter_by(ano=2025, mes=5).one()
+        assert float(maio.total_parcelamentos) == 100.0
+        assert float(maio.saldo_final) == 5000.0 - 100.0 - 100.0
+
+
+def test_total_gasto_mes_ano_le_consolidado(client):
+    from app.fechamento import fechar_meses_pendentes
+    from app.models import HistoricoFatura
+    headers = get_auth_header(client, "Iago", "123456")
+    create_gasto(client, headers, valor=100, data_registro="2025-03-10")
+
+    with client.application.app_context():
+        fechar_meses_pendentes()
+        # Altera o consolidado diretamente para provar que a leitura vem dele
+        HistoricoFatura.query.filter_by(ano=2025, mes=3).update({"total_gastos_registro": 777})
+        db.session.commit()
+
+    response = client.get("/registro/total-gasto-mes-ano?ano=2025", headers=headers)
+    assert response.get_json()["total_por_mes"]["3"] == 777.0
+
+
+def test_gasto_em_mes_fechado_invalida_consolidado(client):
+    from app.fechamento import fechar_meses_pendentes
+    from app.models import HistoricoFatura
+    headers = get_auth_header(client, "Iago", "123456")
+    create_gasto(client, headers, valor=100, data_registro="2025-03-10")
+
+    with client.application.app_context():
+        fechar_meses_pendentes()
+
+    create_gasto(client, headers, valor=20, data_registro="2025-03-11")
+
+    with client.application.app_context():
+        assert HistoricoFatura.query.filter_by(ano=2025, mes=3).one().total_gastos_registro is None
+
+    response = client.get("/registro/total-gasto-mes-ano?ano=2025", headers=headers)
+    assert response.get_json()["total_por_mes"]["3"] == 120.0
+
+
+def test_refechar_mes_preserva_retrato(client):
+    from app.fechamento import fechar_meses_pendentes
+    from app.models import HistoricoFatura
+    headers = get_auth_header(client, "Iago", "123456")
+    create_gasto(client, headers, valor=100, data_registro="2025-05-10")
+
+    with client.application.app_context():
+        fechar_meses_pendentes(hoje=date(2025, 6, 1))
+
+    create_gasto(client, headers, valor=20, data_registro="2025-05-11")
+    assert client.put("/auth/alterar", json={"salario_mensal": 9000}, headers=headers).status_code == 200
+
+    with client.application.app_context():
+        assert fechar_meses_pendentes(hoje=date(2025, 7, 1)) == 2  # maio refeito + junho
+        maio = HistoricoFatura.query.filter_by(ano=2025, mes=5).one()
+        assert float(maio.total_gastos_registro) == 120.0
+        assert float(maio.salario_mensal) == 5000.0
+        assert float(maio.saldo_final) == 4880.0
+
+
+######################################## REGISTRO contadores por categoria ########################################
+
+def test_contadores_acompanham_escritas(client):
+    from app.contadores import verificar_contadores
+    from app.models import GastoCategoriaMes
+    headers = get_auth_header(client, "Iago", "123456")
+    g1 = create_gasto(client, headers, valor=100, categoria="Lazer", data_registro="2026-05-05").get_json()["gasto_diario"]["id"]
+    g2 = create_gasto(client, headers, valor=40, categoria="Lazer", data_registro="2026-05-06").get_json()["gasto_diario"]["id"]
+
+    # Mudança de valor e de categoria: delta antigo -> novo
+    client.put(f"/registro/alterar/{g1}", headers=headers, json={"valor": 70, "categoria": "Saúde"})
+    client.put(f"/registro/alterar/{g2}", headers=headers, json={"valor": 45})
+    create_gasto(client, headers, valor=10, categoria="Compras", data_registro="2026-05-07")
+    g4 = create_gasto(client, headers, valor=5, categoria="Compras", data_registro="2026-05-08").get_json()["gasto_diario"]["id"]
+    client.delete(f"/registro/deletar/{g4}", headers=headers)
+
+    with client.application.app_context():
+        contadores = {c.categoria: (float(c.total), c.quantidade) for c in GastoCategoriaMes.query.all()}
+        assert contadores["Lazer"] == (45.0, 1)
+        assert contadores["Saúde"] == (70.0, 1)
+        assert contadores["Compras"] == (10.0, 1)
+        assert verificar_contadores() == []
+
+    data = client.get("/registro/total-gasto-categoria/5/2026?completo=1", headers=headers).get_json()
+    assert data["total"] == 125.0
+    assert data["total_por_categoria"]["Saúde"] == 70.0
+
+
+def test_contadores_verificar_e_reconstruir(client):
+    from app.contadores import verificar_contadores, reconstruir_contadores
+    from app.models import GastoCategoriaMes
+    headers = get_auth_header(client, "Iago", "123456")
+    create_gasto(client, headers, valor=30, categoria="Outros", data_registro="2026-05-05")
+
+    with client.application.app_context():
+        GastoCategoriaMes.query.update({"total": 999})
+        db.session.commit()
+        assert len(verificar_contadores()) == 1
+
+        assert reconstruir_contadores() == 1
+        assert verificar_contadores() == []
+
+######################################## CACHE DE RESPOSTAS DOS AGREGADOS ########################################
+
+class RedisLocal:
+    # Substituto em memória com o subconjunto de comandos usado pelo backend Redis
+    def __init__(self):
+        self.valores = {}
+        self.conjuntos = {}
+        self.lock = threading.Lock()
+
+    def get(self, chave):
+        return self.valores.get(chave)
+
+    def set(self, chave, valor, ex=None, px=None, nx=False):
+        with self.lock:
+            if nx and chave in self.valores:
+                return None
+            self.valores[chave] = valor
+            return True
+
+    def sadd(self, chave, *membros):
+        self.conjuntos.setdefault(chave, set()).update(membros)
+
+    def smembers(self, chave):
+        return set(self.conjuntos.get(chave, ()))
+
+    def expire(self, chave, segundos):
+        return chave in self.conjuntos or chave in self.valores
+
+    def delete(self, *chaves):
+        for chave in chaves:
+            self.valores.pop(chave, None)
+            self.conjuntos.pop(chave, None)
+
+
+def _contar_statements(client, rota, headers):
+    from sqlalchemy import event
+
+    with client.application.app_context():
+        engine = db.engine
+    statements = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", contar)
+    try:
+        response = client.get(rota, headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", contar)
+    return response, statements
+
+
+def test_cache_agregado_segunda_leitura_sem_consulta(client):
+    headers = get_auth_header(client)
+    create_gasto(client, headers, valor=80, categoria="Lazer", data_registro="2026-05-05")
+
+    primeira = client.get("/registro/total-gasto-categoria?mes=5&ano=2026", headers=headers)
+    segunda, statements = _contar_statements(client, "/registro/total-gasto-categoria?mes=5&ano=2026", headers)
+
+    assert segunda.status_code == 200
+    assert segunda.get_json() == primeira.get_json()
+    assert len(statements) == 1  # só a versão dos dados
+    assert "versao_dados_usuario" in statements[0]
+
+    # Outros parâmetros, outra chave
+    outra, statements = _contar_statements(client, "/registro/total-gasto-categoria?mes=6&ano=2026", headers)
+    assert outra.get_json()["total_por_categoria"]["Lazer"] == 0.0
+    assert len(statements) > 1
+
+
+def test_cache_invalidado_por_escritas(client):
+    headers = get_auth_header(client)
+    rota = "/registro/total-gasto-mes?mes=5&ano=2026"
+    gasto_id = create_gasto(client, headers, valor=100).get_json()["gasto_diario"]["id"]
+    assert client.get(rota, headers=headers).get_json()["total"] == 100.0
+
+    client.put(f"/registro/alterar/{gasto_id}", headers=headers, json={"valor": 150.0})
+    assert client.get(rota, headers=headers).get_json()["total"] == 150.0
+
+    create_gasto(client, headers, valor=25)
+    assert client.get(rota, headers=headers).get_json()["total"] == 175.0
+
+    client.delete(f"/registro/deletar/{gasto_id}", headers=headers)
+    assert client.get(rota, headers=headers).get_json()["total"] == 25.0
+
+    assert client.get("/dashboard/somacontasfixas", headers=headers).get_json()["soma_contas_fixas"] == 0.0
+    client.post("/contas-fixas/create", headers=headers, json={"nome": "Luz", "valor": 120, "dia_vencimento": 10})
+    assert client.get("/dashboard/somacontasfixas", headers=headers).get_json()["soma_contas_fixas"] == 120.0
+
+
+def test_cache_invalida_so_o_usuario_que_escreveu(client):
+    headers_a = get_auth_header(client, "UserA", "123")
+    headers_b = get_auth_header(client, "UserB", "456")
+    client.get("/registro/total-gasto-ano?ano=2026", headers=headers_a)
+    client.get("/registro/total-gasto-ano?ano=2026", headers=headers_b)
+
+    cache = client.application.extensions["cache_respostas"]
+    assert len(cache) == 2
+    create_gasto(client, headers_a, valor=10)
+    assert len(cache) == 1
+    _, statements = _contar_statements(client, "/registro/total-gasto-ano?ano=2026", headers_b)
+    assert len(statements) == 1
+
+
+def test_cache_nao_guarda_erros(client):
+    headers = get_auth_header(client)
+    assert client.get("/registro/total-gasto-ano?ano=1800", headers=headers).status_code == 400
+    assert len(client.application.extensions["cache_respostas"]) == 0
+
+
+def test_cache_lru_ttl_e_limite():
+    from app.cache_respostas import CacheRespostasLRU
+
+    cache = CacheRespostasLRU(ttl=60, tamanho_maximo=2)
+    cache.guardar(1, "a", b"1")
+    cache.guardar(1, "b", b"2")
+    assert cache.obter(1, "a") == b"1"  # "a" passa a ser o mais recente
+    cache.guardar(2, "c", b"3")
+    assert cache.obter(1, "b") is None
+    assert cache.obter(1, "a") == b"1"
+
+    cache.invalidar_usuario(1)
+    assert cache.obter(1, "a") is None
+    assert cache.obter(2, "c") == b"3"
+
+    expirado = CacheRespostasLRU(ttl=-1)
+    expirado.guardar(1, "a", b"1")
+    assert expirado.obter(1, "a") is None
+    assert len(expirado) == 0
+
+
+def test_cache_backend_redis(client):
+    from app.cache_respostas import CacheRespostasRedis
+
+    redis_local = RedisLocal()
+    client.application.extensions["cache_respostas"] = CacheRespostasRedis(redis_local, ttl=60)
+    headers_a = get_auth_header(client, "UserA", "123")
+    headers_b = get_auth_header(client, "UserB", "456")
+    rota = "/registro/total-gasto-mes?mes=5&ano=2026"
+
+    create_gasto(client, headers_a, valor=40)
+    assert client.get(rota, headers=headers_a).get_json()["total"] == 40.0
+    assert client.get(rota, headers=headers_b).get_json()["total"] == 0.0
+    assert len(redis_local.valores) == 2
+    _, statements = _contar_statements(client, rota, headers_a)
+    assert len(statements) == 1
+
+    create_gasto(client, headers_a, valor=2)
+    assert len(redis_local.valores) == 1
+    assert client.get(rota, headers=headers_a).get_json()["total"] == 42.0
+
+
+def test_cache_desligado_e_configuracao_invalida():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "RESPOSTAS_CACHE": "desligado",
+    })
+    assert "cache_respostas" not in app.extensions
+
+    for config in ({"RESPOSTAS_CACHE": "memcached"}, {"RESPOSTAS_CACHE": "redis"}):
+        with pytest.raises(RuntimeError):
+            create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", **config})
+
+
+######################################## VOO ÚNICO (COALESCÊNCIA) ########################################
+
+@pytest.fixture
+def client_arquivo(tmp_path):
+    # Banco em arquivo: cada thread usa a própria conexão (o :memory: é uma só)
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'gastos.db'}",
+        "SQLALCHEMY_ENGINE_OPTIONS": {"connect_args": {"timeout": 30}},
+        "JWT_SECRET_KEY": os.getenv("JWT_SECRET_KEY", "test_secret_key_only_for_testing_2026")
+    })
+
+    with app.app_context():
+        db.create_all()
+
+    with app.test_client() as client:
+        yield client
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def _calculo_lento(monkeypatch, segundos=0.5):
+    # Conta e atrasa o cálculo de /total-gasto-mes-ano (meses consolidados)
+    import time
+    import app.routes as rotas
+
+    original = rotas.gastos_consolidados_ano
+    chamadas = []
+
+    def lento(*args, **kwargs):
+        chamadas.append(args)
+        time.sleep(segundos)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(rotas, "gastos_consolidados_ano", lento)
+    return chamadas
+
+
+def _disparar(clientes, rota, headers):
+    barreira = threading.Barrier(len(clientes))
+    respostas = []
+    lock = threading.Lock()
+
+    def buscar(app):
+        cliente = app.test_client()
+        barreira.wait()
+        response = cliente.get(rota, headers=headers)
+        with lock:
+            respostas.append((response.status_code, response.get_json()))
+
+    workers = [threading.Thread(target=buscar, args=(app,)) for app in clientes]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return respostas
+
+
+def test_voo_unico_threads_compartilham_calculo():
+    from app.voo_unico import VooUnico
+    import time
+
+    voo = VooUnico(espera=5)
+    liberar = threading.Event()
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        liberar.wait(5)
+        return (b"{}", 200, "application/json")
+
+    resultados = []
+    workers = [threading.Thread(target=lambda: resultados.append(voo.executar("k", calcular))) for _ in range(8)]
+    for worker in workers:
+        worker.start()
+    time.sleep(0.2)
+    liberar.set()
+    for worker in workers:
+        worker.join()
+
+    assert len(chamadas) == 1
+    assert resultados == [(b"{}", 200, "application/json")] * 8
+    assert voo.telemetria.resumo()["coalescidas"] == 7
+
+    # Terminado o voo, a mesma chave calcula de novo
+    assert voo.executar("k", calcular) == (b"{}", 200, "application/json")
+    assert len(chamadas) == 2
+
+
+def test_voo_unico_falha_ou_espera_expirada_calcula_de_novo():
+    from app.voo_unico import VooUnico
+    import time
+
+    voo = VooUnico(espera=5)
+    entrou = threading.Event()
+    chamadas = []
+
+    def falhar():
+        chamadas.append("lider")
+        entrou.set()
+        time.sleep(0.2)
+        raise RuntimeError("banco indisponível")
+
+    def seguir():
+        entrou.wait(5)
+        resultados.append(voo.executar("k", lambda: chamadas.append("seguidora") or "ok"))
+
+    resultados = []
+    seguidora = threading.Thread(target=seguir)
+    seguidora.start()
+    with pytest.raises(RuntimeError):
+        voo.executar("k", falhar)
+    seguidora.join()
+    assert resultados == ["ok"]
+    assert chamadas == ["lider", "seguidora"]
+
+    curto = VooUnico(espera=0.05)
+    liberar = threading.Event()
+    lider = threading.Thread(target=lambda: curto.executar("k", lambda: liberar.wait(5)))
+    lider.start()
+    time.sleep(0.05)
+    assert curto.executar("k", lambda: "sozinha") == "sozinha"
+    liberar.set()
+    lider.join()
+    assert curto.telemetria.resumo()["esperas_expiradas"] == 1
+
+
+def test_voo_unico_total_gasto_mes_ano(client_arquivo, monkeypatch):
+    headers = get_auth_header(client_arquivo)
+    create_gasto(client_arquivo, headers, valor=30, data_registro="2026-03-03")
+    chamadas = _calculo_lento(monkeypatch)
+
+    app = client_arquivo.application
+    respostas = _disparar([app] * 6, "/registro/total-gasto-mes-ano?ano=2026", headers)
+
+    assert len(chamadas) == 1
+    assert {status for status, _ in respostas} == {200}
+    assert all(corpo == respostas[0][1] for _, corpo in respostas)
+    assert respostas[0][1]["total_por_mes"]["3"] == 30.0
+
+    contadores = client_arquivo.get("/health/respostas").get_json()
+    assert contadores["calculos"] == 1
+    assert contadores["coalescidas"] + contadores["hits"] == 5
+    assert contadores["coalescidas"] >= 1
+
+
+def test_voo_unico_entre_processos(client_arquivo, monkeypatch):
+    from app.cache_respostas import CacheRespostasRedis
+
+    # Dois "workers" (apps) sobre o mesmo banco e o mesmo Redis
+    app_a = client_arquivo.application
+    app_b = create_app(dict(app_a.config))
+    redis_local = RedisLocal()
+    for app in (app_a, app_b):
+        app.extensions["cache_respostas"] = CacheRespostasRedis(redis_local, ttl=60)
+
+    headers = get_auth_header(client_arquivo)
+    create_gasto(client_arquivo, headers, valor=12, data_registro="2026-04-04")
+    chamadas = _calculo_lento(monkeypatch)
+
+    respostas = _disparar([app_a, app_b] * 3, "/registro/total-gasto-mes-ano?ano=2026", headers)
+
+    assert len(chamadas) == 1
+    assert all(corpo == respostas[0][1] for _, corpo in respostas)
+    contadores = [app.extensions["telemetria_respostas"].resumo() for app in (app_a, app_b)]
+    assert sum(c["calculos"] for c in contadores) == 1
+    assert sum(c["coalescidas_entre_processos"] for c in contadores) >= 1
+    assert not any(chave.endswith(":calculando") for chave in redis_local.valores)
+
+
+def test_voo_unico_desligado(client):
+    app = client.application
+    app.extensions.pop("voo_unico")
+    headers = get_auth_header(client)
+    assert client.get("/registro/total-gasto-mes-ano?ano=2026", headers=headers).status_code == 200
+    assert client.get("/registro/total-gasto-mes-ano?ano=2026", headers=headers).status_code == 200
+    assert app.extensions["telemetria_respostas"].resumo()["hits"] == 1
@@ -212,4 +212,43 @@ def test_token_is_generated(client):
 
     assert token is not None
     assert isinstance(token, str)
-    assert len(token) > 10
\ No newline at end of file
+    assert len(token) > 10
+
+# current_user: ids válidos ficam em cache entre requisições
+def test_usuario_atual_cacheado_entre_requisicoes(client):
+    from sqlalchemy import event
+
+    client.post("/auth/register", json={"nome": "Iago", "email": "iago@test.com", "senha_hash": "123456"})
+    token = client.post("/auth/login", json={"nome": "Iago", "senha_hash": "123456"}).get_json()["usuario"]["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/contas-fixas/minhascontas", headers=headers).status_code == 200
+
+    consultas = []
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        consultas.append(statement)
+
+    with client.application.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        assert client.get("/contas-fixas/minhascontas", headers=headers).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
+
+    assert not [sql for sql in consultas if "FROM usuario" in sql]
+
+
+def test_usuario_removido_invalida_token(client):
+    client.post("/auth/register", json={"nome": "Iago", "email": "iago@test.com", "senha_hash": "123456"})
+    token = client.post("/auth/login", json={"nome": "Iago", "senha_hash": "123456"}).get_json()["usuario"]["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/auth/info", headers=headers).status_code == 200
+
+    with client.application.app_context():
+        db.session.delete(Usuario.query.filter_by(nome="Iago").one())
+        db.session.commit()
+
+    response = client.get("/contas-fixas/minhascontas", headers=headers)
+    assert response.status_code == 401
+    assert response.get_json()["error"] == "Usuário não encontrado ou sessão expirada"
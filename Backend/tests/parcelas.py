@@ -208,6 +208,73 @@ def test_criar_parcela_duplicate_different_user(client):
     assert response.status_code == 201
 
 
+def test_criar_parcela_duplicate_apos_deletar(client):
+    # O índice único parcial só vale para ativos: descrição volta a ficar livre
+    headers = get_auth_header(client, "Iago", "123456")
+    parcela_id = post_parcela(client, headers, descricao="TV").get_json()["parcela"]["id"]
+    client.delete(f"/parcelas/deletar/{parcela_id}", headers=headers)
+
+    response = post_parcela(client, headers, descricao="TV")
+    assert response.status_code == 201
+
+
+def test_editar_parcela_descricao_duplicada(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    post_parcela(client, headers, descricao="TV")
+    parcela_id = post_parcela(client, headers, descricao="Geladeira").get_json()["parcela"]["id"]
+
+    response = client.put(f"/parcelas/editar/{parcela_id}", headers=headers, json={"descricao": "TV"})
+    assert response.status_code == 409
+
+
+def test_parcela_sem_data_inicio_e_400(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    response = post_parcela(client, headers, data_inicio=None)
+    assert response.status_code == 400
+    assert "obrigatória" in response.get_json()["error"]
+
+    parcela_id = post_parcela(client, headers).get_json()["parcela"]["id"]
+    response = client.put(f"/parcelas/editar/{parcela_id}", headers=headers, json={"data_inicio": ""})
+    assert response.status_code == 400
+
+
+def test_integrity_error_so_e_409_para_descricao_duplicada(client):
+    from sqlalchemy.exc import IntegrityError
+    from app.routes import descricao_parcela_duplicada
+
+    with client.application.app_context():
+        usuario = Usuario(nome="Iago", email="iago@test.com", senha_hash="x", salario_mensal=0)
+        db.session.add(usuario)
+        db.session.commit()
+
+        def erro_ao_inserir(**campos):
+            valores = dict(usuario_id=usuario.id, descricao="TV", valor_total=10, valor_parcela=1,
+                           parcelas_totais=10, parcelas_restantes=10, data_inicio=date(2026, 5, 5), ativo=True)
+            valores.update(campos)
+            db.session.add(Parcelamento(**valores))
+            try:
+                db.session.commit()
+            except IntegrityError as erro:
+                db.session.rollback()
+                return erro
+            return None
+
+        assert erro_ao_inserir() is None
+        assert descricao_parcela_duplicada(erro_ao_inserir())
+        assert not descricao_parcela_duplicada(erro_ao_inserir(descricao="Geladeira", data_inicio=None))
+
+
+def test_parcelas_ativas_usam_indice_parcial(client):
+    from sqlalchemy import select
+
+    with client.application.app_context():
+        stmt = select(Parcelamento.id).where(Parcelamento.usuario_id == 1, Parcelamento.ativo == True)
+        sql = str(stmt.compile(db.engine, compile_kwargs={"literal_binds": True}))
+        plano = " ".join(str(linha[-1]) for linha in db.session.execute(text("EXPLAIN QUERY PLAN " + sql)))
+
+    assert "ix_parcelamento_usuario_ativo" in plano or "uq_parcelamento_usuario_descricao_ativo" in plano
+
+
 def test_criar_parcela_mass_assignment(client):
     headers = get_auth_header(client)
     response = client.post("/parcelas/criar", headers=headers, json={
@@ -288,6 +355,17 @@ def test_mostrar_parcelas_user_isolation(client):
     assert data_b[0]["descricao"] == "Parcela B"
 
 
+def test_mostrar_parcelas_stream(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    create_parcela(client, headers)
+    create_parcela(client, headers, descricao="Geladeira", valor_total=2000)
+
+    response = client.get("/parcelas/mostrar?stream=true", headers=headers)
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.get_json() == client.get("/parcelas/mostrar", headers=headers).get_json()
+
+
 ######################################## PARCELAS /deletar ########################################
 
 def test_deletar_parcela_success(client):
@@ -467,6 +545,33 @@ def test_pagar_parcela_all_paid(client):
     assert response.status_code == 400
 
 
+def test_pagar_parcela_excluida(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    parcela_id = create_parcela(client, headers, parcelas_restantes=5).get_json()["parcela"]["id"]
+    assert client.delete(f"/parcelas/deletar/{parcela_id}", headers=headers).status_code == 200
+
+    response = client.post(f"/parcelas/pagar/{parcela_id}", headers=headers)
+    assert response.status_code == 404
+    with client.application.app_context():
+        parcela = db.session.get(Parcelamento, parcela_id)
+        assert parcela.ativo is False
+        assert parcela.parcelas_restantes == 5
+
+
+def test_pagar_parcela_excluida_com_homonima_ativa(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    antiga = create_parcela(client, headers, descricao="TV", parcelas_restantes=5).get_json()["parcela"]["id"]
+    assert client.delete(f"/parcelas/deletar/{antiga}", headers=headers).status_code == 200
+    nova = create_parcela(client, headers, descricao="TV", parcelas_restantes=5).get_json()["parcela"]["id"]
+
+    # Reativar a excluída violaria o índice único de descrição entre os ativos
+    assert client.post(f"/parcelas/pagar/{antiga}", headers=headers).status_code == 404
+    assert client.post(f"/parcelas/pagar/{nova}", headers=headers).status_code == 200
+    with client.application.app_context():
+        assert db.session.get(Parcelamento, antiga).ativo is False
+        assert db.session.get(Parcelamento, nova).parcelas_restantes == 4
+
+
 def test_pagar_parcela_updates_status(client):
     headers = get_auth_header(client, "Iago", "123456")
     parcela_id = create_parcela(client, headers, parcelas_restantes=1).get_json()["parcela"]["id"]
@@ -476,6 +581,346 @@ def test_pagar_parcela_updates_status(client):
     assert response.get_json() == []
 
 
+
+def test_pagar_parcela_returns_updated_row(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    parcela_id = create_parcela(client, headers, parcelas_restantes=2).get_json()["parcela"]["id"]
+
+    primeira = client.post(f"/parcelas/pagar/{parcela_id}", headers=headers).get_json()["parcela"]
+    assert primeira["parcelas_restantes"] == 1
+    assert primeira["ativo"] is True
+
+    ultima = client.post(f"/parcelas/pagar/{parcela_id}", headers=headers).get_json()["parcela"]
+    assert ultima["parcelas_restantes"] == 0
+    assert ultima["ativo"] is False
+
+    response = client.post(f"/parcelas/pagar/{parcela_id}", headers=headers)
+    assert response.status_code == 400
+
+
+@pytest.fixture
+def client_arquivo(tmp_path):
+    # Banco em arquivo: cada thread usa a própria conexão (o :memory: é uma só)
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'parcelas.db'}",
+        "SQLALCHEMY_ENGINE_OPTIONS": {"connect_args": {"timeout": 30}},
+        "JWT_SECRET_KEY": os.getenv("JWT_SECRET_KEY", "test_secret_key_only_for_testing_2026")
+    })
+
+    with app.app_context():
+        db.create_all()
+
+    with app.test_client() as client:
+        yield client
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def test_pagar_parcela_concurrent_no_lost_update(client_arquivo):
+    from sqlalchemy import event
+
+    headers = get_auth_header(client_arquivo, "Iago", "123456")
+    parcela_id = create_parcela(
+        client_arquivo, headers, valor_total=10000.0, parcelas_totais=40, parcelas_restantes=40
+    ).get_json()["parcela"]["id"]
+
+    threads, tentativas = 8, 7  # 56 toques para 40 parcelas
+    status = []
+    lock = threading.Lock()
+
+    def pagar():
+        cliente = client_arquivo.application.test_client()
+        for _ in range(tentativas):
+            response = cliente.post(f"/parcelas/pagar/{parcela_id}", headers=headers)
+            with lock:
+                status.append(response.status_code)
+
+    # Vazão sem depender do relógio: cada toque é uma única ida ao banco sobre
+    # parcelamento (o UPDATE ... RETURNING), sem SELECT prévio nem retentativa
+    with client_arquivo.application.app_context():
+        engine = db.engine
+    instrucoes = []
+
+    def registrar(conn, cursor, statement, *args):
+        if "parcelamento" in statement:
+            with lock:
+                instrucoes.append(statement.lstrip().split(None, 1)[0].upper())
+
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        workers = [threading.Thread(target=pagar) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
+
+    # Cada parcela é paga exatamente uma vez; o excedente recebe 400, nunca 500
+    assert status.count(200) == 40
+    assert status.count(400) == 16
+    assert len(status) == threads * tentativas
+
+    # Um UPDATE por toque; o SELECT de diagnóstico só nos 16 que não pagaram
+    assert instrucoes.count("UPDATE") == threads * tentativas
+    assert instrucoes.count("SELECT") == 16
+    assert len(instrucoes) == threads * tentativas + 16
+
+    with client_arquivo.application.app_context():
+        parcela = db.session.get(Parcelamento, parcela_id)
+        assert parcela.parcelas_restantes == 0
+        assert parcela.ativo is False
+
+######################################## CRONOGRAMA AUTOMÁTICO ########################################
+
+def _meses_atras(hoje, meses, dia):
+    total = hoje.year * 12 + hoje.month - 1 - meses
+    return date(total // 12, total % 12 + 1, dia)
+
+
+def test_cronograma_sql_igual_ao_python(client):
+    from sqlalchemy import select
+    from app.cronograma import parcelas_pagas_cronograma, progresso_parcela, somar_meses
+
+    inicios = [date(2026, 1, 31), date(2026, 1, 15), date(2025, 11, 30), date(2026, 2, 28), date(2026, 3, 1)]
+    dias = [date(2026, 1, 30), date(2026, 2, 27), date(2026, 2, 28), date(2026, 3, 31),
+            date(2026, 4, 30), date(2026, 11, 30), date(2027, 6, 15)]
+
+    with client.application.app_context():
+        usuario = Usuario(nome="Crono", email="crono@test.com", salario_mensal=1000)
+        usuario.set_password("123")
+        db.session.add(usuario)
+        db.session.flush()
+        for inicio in inicios:
+            db.session.add(Parcelamento(
+                usuario_id=usuario.id, descricao=f"P{inicio}", valor_total=1200, valor_parcela=100,
+                parcelas_totais=12, parcelas_restantes=12, data_inicio=inicio, automatico=True
+            ))
+        db.session.commit()
+
+        for hoje in dias:
+            linhas = db.session.execute(select(Parcelamento.data_inicio, parcelas_pagas_cronograma(hoje))).all()
+            for inicio, pagas in linhas:
+                assert pagas == progresso_parcela(inicio, 12, hoje)[0], (inicio, hoje)
+
+        # Fim de mês é cortado para o último dia do mês seguinte
+        um_mes = dict(db.session.execute(select(
+            Parcelamento.data_inicio, somar_meses(Parcelamento.data_inicio, 1)
+        )).all())
+        assert str(um_mes[date(2026, 1, 31)]) == "2026-02-28"
+        assert str(um_mes[date(2025, 11, 30)]) == "2025-12-30"
+
+
+def test_criar_parcela_automatica_calcula_progresso(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    hoje = date.today()
+    inicio = _meses_atras(hoje, 3, 1)
+
+    response = create_parcela(client, headers, data_inicio=inicio.isoformat(), parcelas_restantes=None)
+    assert response.status_code == 201
+    parcela_id = response.get_json()["parcela"]["id"]
+
+    response = client.post("/parcelas/criar", headers=headers, json={
+        "descricao": "Auto", "valor_total": 3000.0, "valor_parcela": 250.0,
+        "parcelas_totais": 12, "data_inicio": inicio.isoformat(), "automatico": True
+    })
+    assert response.status_code == 201
+    criada = response.get_json()["parcela"]
+    assert criada["automatico"] is True
+    assert criada["parcelas_restantes"] == 8  # 4 vencidas: meses -3, -2, -1 e o atual (dia 1)
+
+    listadas = {p["descricao"]: p for p in client.get("/parcelas/mostrar", headers=headers).get_json()}
+    auto = listadas["Auto"]
+    assert auto["parcelas_pagas"] == 4
+    assert auto["parcelas_restantes"] == 8
+    assert auto["proximo_vencimento"] == _meses_atras(hoje, -1, 1).isoformat()
+
+    # Parcelamento manual também informa o próximo vencimento pelo cronograma
+    assert listadas["TV"]["parcelas_pagas"] == 0
+    assert listadas["TV"]["proximo_vencimento"] == inicio.isoformat()
+
+    # Progresso automático não aceita pagamento manual
+    response = client.post(f"/parcelas/pagar/{auto['id']}", headers=headers)
+    assert response.status_code == 409
+    assert client.post(f"/parcelas/pagar/{parcela_id}", headers=headers).status_code == 200
+
+
+def test_criar_parcela_automatica_sem_data(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    response = client.post("/parcelas/criar", headers=headers, json={
+        "descricao": "Auto", "valor_total": 3000.0, "valor_parcela": 250.0,
+        "parcelas_totais": 12, "automatico": True
+    })
+    assert response.status_code == 400
+
+
+def test_parcela_automatica_quitada_vai_para_historico(client):
+    headers = get_auth_header(client, "Iago", "123456")
+    inicio = _meses_atras(date.today(), 5, 1)
+    client.post("/parcelas/criar", headers=headers, json={
+        "descricao": "Auto", "valor_total": 750.0, "valor_parcela": 250.0,
+        "parcelas_totais": 3, "data_inicio": inicio.isoformat(), "automatico": True
+    })
+
+    assert client.get("/parcelas/mostrar", headers=headers).get_json() == []
+    historico = client.get("/parcelas/historico", headers=headers).get_json()
+    assert [(p["descricao"], p["parcelas_restantes"], p["ativo"]) for p in historico] == [("Auto", 0, False)]
+    assert client.get("/parcelas/resumo", headers=headers).get_json()["quantidade_ativos"] == 0
+
+
+def test_atualizar_cronogramas_update_unico(client):
+    from sqlalchemy import event
+    from app.cronograma import atualizar_cronogramas
+
+    with client.application.app_context():
+        usuario = Usuario(nome="Crono", email="crono@test.com", salario_mensal=1000)
+        usuario.set_password("123")
+        db.session.add(usuario)
+        db.session.flush()
+        for descricao, inicio, automatico in [
+            ("A", date(2026, 1, 10), True), ("B", date(2025, 1, 10), True), ("C", date(2026, 1, 10), False)
+        ]:
+            db.session.add(Parcelamento(
+                usuario_id=usuario.id, descricao=descricao, valor_total=1200, valor_parcela=100,
+                parcelas_totais=12, parcelas_restantes=12, data_inicio=inicio, automatico=automatico
+            ))
+        db.session.commit()
+
+        statements = []
+
+        def registrar(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", registrar)
+        try:
+            assert atualizar_cronogramas(hoje=date(2026, 3, 10)) == 2
+        finally:
+            event.remove(db.engine, "before_cursor_execute", registrar)
+        updates = [sql for sql in statements if sql.lstrip().upper().startswith("UPDATE")]
+        assert len(updates) == 1
+
+        estado = {p.descricao: (p.parcelas_restantes, p.ativo) for p in Parcelamento.query.all()}
+        assert estado == {"A": (9, True), "B": (0, False), "C": (12, True)}
+
+        # Nada mudou desde a última execução: nenhuma linha regravada
+        assert atualizar_cronogramas(hoje=date(2026, 3, 20)) == 0
+        assert atualizar_cronogramas(hoje=date(2026, 4, 10)) == 1
+
+def test_fechamento_conta_ultima_parcela_automatica(client):
+    from app.cronograma import atualizar_cronogramas
+    from app.fechamento import fechar_meses_pendentes
+    from app.models import HistoricoFatura, RegistroDiario
+
+    with client.application.app_context():
+        usuario = Usuario(nome="Crono", email="crono@test.com", salario_mensal=1000)
+        usuario.set_password("123")
+        db.session.add(usuario)
+        db.session.flush()
+        for descricao, parcelas in [("Termina em maio", 5), ("Excluída", 12)]:
+            db.session.add(Parcelamento(
+                usuario_id=usuario.id, descricao=descricao, valor_total=100 * parcelas, valor_parcela=100,
+                parcelas_totais=parcelas, parcelas_restantes=parcelas, data_inicio=date(2025, 1, 10), automatico=True
+            ))
+        db.session.add(RegistroDiario(usuario_id=usuario.id, valor=10, data_registro=date(2025, 5, 2)))
+        db.session.commit()
+
+        # O job noturno encerra o plano no dia da última parcela; o outro é excluído
+        atualizar_cronogramas(hoje=date(2025, 5, 10))
+        Parcelamento.query.filter_by(descricao="Excluída").update({"ativo": False})
+        db.session.commit()
+
+        fechar_meses_pendentes(hoje=date(2025, 6, 1))
+        maio = HistoricoFatura.query.filter_by(usuario_id=usuario.id, ano=2025, mes=5).one()
+        assert float(maio.total_parcelamentos) == 100.0
+
+######################################## PARCELAS /projecao ########################################
+
+def test_matriz_obrigacoes_igual_ao_laco():
+    import numpy as np
+    from app.projecao import matriz_obrigacoes
+
+    gerador = np.random.default_rng(7)
+    inicio = gerador.integers(0, 30, size=40)
+    restantes = gerador.integers(0, 48, size=40)
+    valores = gerador.uniform(10, 1000, size=40).round(2)
+
+    matriz = matriz_obrigacoes(inicio, restantes, valores, 60)
+    for m in range(60):
+        esperado = sum(v for i, r, v in zip(inicio, restantes, valores) if i <= m < i + r)
+        assert matriz[m].sum() == pytest.approx(esperado)
+
+
+def test_projetar_fluxo_igual_ao_laco():
+    import numpy as np
+    from app.projecao import projetar_fluxo
+
+    inicio = np.arange(48) % 12
+    restantes = np.full(48, 24)
+    valores = np.full(48, 99.9)
+    parcelas, saldo, acumulado = projetar_fluxo(inicio, restantes, valores, 60, 5000.0, 1200.0)
+    assert parcelas.shape == saldo.shape == acumulado.shape == (60,)
+
+    corrente = 0.0
+    for m in range(60):
+        esperado = sum(v for i, r, v in zip(inicio, restantes, valores) if i <= m < i + r)
+        corrente += 5000.0 - 1200.0 - esperado
+        assert parcelas[m] == pytest.approx(esperado)
+        assert saldo[m] == pytest.approx(5000.0 - 1200.0 - esperado)
+        assert acumulado[m] == pytest.approx(corrente)
+
+
+def test_projecao_parcelas_success(client):
+    from app.models import ContaFixa
+
+    headers = get_auth_header(client, "Iago", "123456")
+    hoje = date.today()
+    # Em dia: 2 de 6 pagas desde 2 meses atrás => parcelas nos meses 0..3
+    create_parcela(client, headers, descricao="TV", valor_total=1500.0, valor_parcela=250.0,
+                   parcelas_totais=6, parcelas_restantes=4, data_inicio=_meses_atras(hoje, 2, 1).isoformat())
+    # Atrasado: 3 pagas de 6 desde 5 meses atrás => as 3 restantes a partir do mês atual
+    create_parcela(client, headers, descricao="Celular", valor_total=300.0, valor_parcela=50.0,
+                   parcelas_totais=6, parcelas_restantes=3, data_inicio=_meses_atras(hoje, 5, 1).isoformat())
+    # Automático começando no mês que vem => meses 1..3
+    client.post("/parcelas/criar", headers=headers, json={
+        "descricao": "Curso", "valor_total": 300.0, "valor_parcela": 100.0, "parcelas_totais": 3,
+        "data_inicio": _meses_atras(hoje, -1, 1).isoformat(), "automatico": True
+    })
+    with client.application.app_context():
+        db.session.add(ContaFixa(usuario_id=1, nome="Aluguel", valor=1000, dia_vencimento=5, ativa=True))
+        db.session.add(ContaFixa(usuario_id=1, nome="Antiga", valor=999, dia_vencimento=5, ativa=False))
+        db.session.commit()
+
+    response = client.get("/parcelas/projecao?meses=6", headers=headers)
+    assert response.status_code == 200
+    data = response.get_json()
+
+    assert data["salario_mensal"] == 5000.0
+    assert data["soma_contas_fixas"] == 1000.0
+    assert [m["parcelas"] for m in data["meses"]] == [300.0, 400.0, 400.0, 350.0, 0.0, 0.0]
+    assert [m["saldo_previsto"] for m in data["meses"]] == [3700.0, 3600.0, 3600.0, 3650.0, 4000.0, 4000.0]
+    assert data["meses"][-1]["saldo_acumulado"] == 22550.0
+    assert data["meses"][0]["mes"] == f"{hoje.year:04d}-{hoje.month:02d}"
+    assert data["total_parcelas"] == 1450.0
+
+
+def test_projecao_parcelas_default_and_invalid(client):
+    headers = get_auth_header(client, "Iago", "123456")
+
+    response = client.get("/parcelas/projecao", headers=headers)
+    assert response.status_code == 200
+    assert len(response.get_json()["meses"]) == 12
+    assert response.get_json()["total_parcelas"] == 0.0
+
+    for meses in ("0", "121", "abc"):
+        assert client.get(f"/parcelas/projecao?meses={meses}", headers=headers).status_code == 400
+
+
+def test_projecao_parcelas_no_token(client):
+    assert client.get("/parcelas/projecao").status_code == 401
+
 ######################################## PARCELAS /resumo ########################################
 
 def test_resumo_parcelas_success(client):
@@ -51,27 +51,21 @@ type Trimestre = {
   total: number;
 };
 
-type SalarioMensalResponse = {
+type ResumoDashboardResponse = {
   salario_mensal?: number | string | null;
-};
-
-type SomaContasFixasResponse = {
   soma_contas_fixas?: number | string | null;
-};
-
-type RegistroDiarioMesResponse = {
-  total?: number | string | null;
+  total_gasto_mes?: number | string | null;
+  gastos_mes?: number | string | null;
+  parcelamentos?: {
+    quantidade_ativos?: number | string | null;
+    soma_total_mensal?: number | string | null;
+  };
 };
 
 type TotalPorMesAnoResponse = {
   total_por_mes?: Record<string, number | string | null>;
 };
 
-type ResumoParcelamentosResponse = {
-  quantidade_ativos?: number | string | null;
-  soma_total_mensal?: number | string | null;
-};
-
 export default function DashboardFinanceiro() {
   const { theme, toggleTheme } = useTheme();
   const flatListRef = useRef<FlatList>(null);
@@ -144,79 +138,35 @@ export default function DashboardFinanceiro() {
     },
   ];
 
-  /* ================= SALÁRIO ================= */
-
-  useEffect(() => {
-    async function carregarSalario() {
-      try {
-        const userId = await AsyncStorage.getItem("id");
-        const token = await SecureStore.getItemAsync(TOKEN_KEY);
-        if (!userId || !token) return;
-        const response = await fetch(`${API_URL}/dashboard/salariomensal`, {
-          headers: {
-            Authorization: `Bearer ${token}`,
-          },
-        });
-
-        const data = await parseResponseSafely<SalarioMensalResponse>(response);
-        if (response.ok) setSalarioMensal(Number(data.salario_mensal || 0));
-      } catch (e) {
-        console.error("Erro ao carregar salário:", e);
-      }
-    }
-
-    carregarSalario();
-  }, []);
-
+  /* ================= RESUMO (SALÁRIO, CONTAS, GASTOS, PARCELAS) ================= */
 
   useEffect(() => {
-    async function carregarSomaContasFixas() {
+    async function carregarResumo() {
       try {
         const userId = await AsyncStorage.getItem("id");
         const token = await SecureStore.getItemAsync(TOKEN_KEY);
         if (!userId || !token) return;
 
-        const response = await fetch(`${API_URL}/dashboard/somacontasfixas`, {
+        const response = await fetch(`${API_URL}/dashboard/resumo`, {
           headers: {
             Authorization: `Bearer ${token}`,
           },
         });
 
-        const data = await parseResponseSafely<SomaContasFixasResponse>(response);
-        if (response.ok) setSomaContasFixas(Number(data.soma_contas_fixas || 0));
-      } catch (e) {
-        console.error("Erro ao carregar soma das contas fixas:", e);
-      }
-    }
-
-    carregarSomaContasFixas();
-  }, []);
-
-
-  useEffect(() => {
-    async function carregarRegistrosDiariosdomes() {
-      try {
-        const mes = new Date().getMonth() + 1;
-        const userId = await AsyncStorage.getItem("id");
-        const token = await SecureStore.getItemAsync(TOKEN_KEY);
-        if (!userId || !token) return;
-
-        const response = await fetch(`${API_URL}/dashboard/total-gasto-mes-dashboard`, {
-          headers: {
-            Authorization: `Bearer ${token}`,
-          },
-        });
-
-        const data = await parseResponseSafely<RegistroDiarioMesResponse>(response);
+        const data = await parseResponseSafely<ResumoDashboardResponse>(response);
         if (response.ok) {
-          setRegistroDiario(Number(data.total || 0));
+          setSalarioMensal(Number(data.salario_mensal || 0));
+          setSomaContasFixas(Number(data.soma_contas_fixas || 0));
+          setRegistroDiario(Number(data.total_gasto_mes || 0));
+          setParcelamentosAtivos(Number(data.parcelamentos?.quantidade_ativos || 0));
+          setSomaParcelamentosMensal(Number(data.parcelamentos?.soma_total_mensal || 0));
         }
       } catch (e) {
-        console.error("Erro ao carregar soma dos registros:", e);
+        console.error("Erro ao carregar resumo do dashboard:", e);
       }
     }
 
-    carregarRegistrosDiariosdomes();
+    carregarResumo();
   }, []);
 
   /* ================= TOTAL ANUAL (GRÁFICO) ================= */
@@ -254,31 +204,6 @@ export default function DashboardFinanceiro() {
   }, []);
 
 
-  useEffect(() => {
-    async function carregarResumoParcelamentos() {
-      try {
-        const token = await SecureStore.getItemAsync(TOKEN_KEY);
-        if (!token) return;
-               const response = await fetch(`${API_URL}/parcelas/resumo`, {
-          headers: {
-            Authorization: `Bearer ${token}`,
-          },
-        });
-
-        const data = await parseResponseSafely<ResumoParcelamentosResponse>(response);
-
-        if (response.ok) {
-          setParcelamentosAtivos(Number(data.quantidade_ativos || 0));
-          setSomaParcelamentosMensal(Number(data.soma_total_mensal || 0));
-        }
-      } catch (e) {
-        console.error("Erro ao carregar resumo de parcelamentos:", e);
-      }
-    }
-
-    carregarResumoParcelamentos();
-  }, []);
-
   function formatarMoeda(valor: number) {
     return valor.toLocaleString("pt-BR", {
       style: "currency",
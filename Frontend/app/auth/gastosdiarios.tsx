@@ -1,11 +1,12 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import {
   View,
   Text,
   StyleSheet,
   TouchableOpacity,
   StatusBar,
-  ScrollView,
+  FlatList,
+  ActivityIndicator,
   Alert,
 } from "react-native";
 import { SafeAreaView } from "react-native-safe-area-context";
@@ -39,6 +40,12 @@ type GastoPayload = {
 
 type BuscarGastosResponse = {
   gastos?: GastoDiario[];
+  next_cursor?: string | null;
+  error?: string;
+};
+
+type ResumoPeriodoResponse = {
+  total?: number;
   error?: string;
 };
 
@@ -63,6 +70,11 @@ const GastosDiarios = () => {
 
   const [modalVisible, setModalVisible] = useState(false);
   const [gastos, setGastos] = useState<GastoDiario[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [carregando, setCarregando] = useState(false);
+  const [totalGeral, setTotalGeral] = useState(0);
+  // Evita buscar a mesma página duas vezes (onEndReached dispara em rajadas)
+  const carregandoRef = useRef(false);
   const [gastoSelecionado, setGastoSelecionado] =
     useState<GastoDiario | null>(null);
 
@@ -79,13 +91,20 @@ const GastosDiarios = () => {
     });
   };
 
-  async function buscarGastos() {
+  // A API pagina por cursor: a primeira página vem na abertura da tela e as
+  // seguintes só quando a lista chega ao fim (onEndReached)
+  async function buscarPagina(cursor: string | null) {
+    if (carregandoRef.current) return;
+    carregandoRef.current = true;
+    setCarregando(true);
     try {
       const userId = await AsyncStorage.getItem("id");
       const token = await SecureStore.getItemAsync(TOKEN_KEY);
 
       if (!userId || !token) throw new Error("Sessao invalida. Faca login novamente.");
-      const response = await fetch(`${API_URL}/registro/mostrar`, {
+
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+      const response = await fetch(`${API_URL}/registro/mostrar${query}`, {
         headers: {
           Authorization: `Bearer ${token}`,
         },
@@ -96,15 +115,51 @@ const GastosDiarios = () => {
       if (!response.ok)
         throw new Error(data.error || "Erro ao buscar gastos.");
 
-      const gastosOrdenados = ordenarGastosPorData(data.gastos || []);
-      setGastos(gastosOrdenados);
+      const pagina = data.gastos || [];
+      setGastos((prev) => {
+        // Gastos criados nesta tela podem reaparecer numa página seguinte
+        const base = cursor ? prev : [];
+        const ids = new Set(base.map((g) => g.id));
+        return ordenarGastosPorData([...base, ...pagina.filter((g) => !ids.has(g.id))]);
+      });
+      setNextCursor(data.next_cursor ?? null);
     } catch (error: unknown) {
       Alert.alert("Erro", getErrorMessage(error, "Erro ao buscar gastos."));
+    } finally {
+      carregandoRef.current = false;
+      setCarregando(false);
+    }
+  }
+
+  function carregarMais() {
+    if (nextCursor) buscarPagina(nextCursor);
+  }
+
+  // O total cobre todos os registros, não só as páginas já carregadas
+  async function buscarTotal() {
+    try {
+      const token = await SecureStore.getItemAsync(TOKEN_KEY);
+      if (!token) return;
+
+      const response = await fetch(
+        `${API_URL}/registro/resumo-periodo?de=2000-01-01&ate=2100-12-31`,
+        {
+          headers: {
+            Authorization: `Bearer ${token}`,
+          },
+        }
+      );
+
+      const data: ResumoPeriodoResponse = await response.json();
+      if (response.ok) setTotalGeral(data.total ?? 0);
+    } catch {
+      // Mantém o último total exibido
     }
   }
 
   useEffect(() => {
-    buscarGastos();
+    buscarPagina(null);
+    buscarTotal();
   }, []);
 
   async function criarGastoDiario(payload: GastoPayload): Promise<GastoDiario> {
@@ -194,6 +249,7 @@ const GastosDiarios = () => {
                 const novosGastos = prev.filter((g) => g.id !== id);
                 return ordenarGastosPorData(novosGastos);
               });
+              buscarTotal();
             } catch {
               Alert.alert("Erro", "Falha ao excluir.");
             }
@@ -203,11 +259,6 @@ const GastosDiarios = () => {
     );
   }
 
-  const totalMes = gastos.reduce(
-    (total, gasto) => total + gasto.valor,
-    0
-  );
-
   return (
     <SafeAreaView style={[styles.container, theme.container]}>
       <StatusBar
@@ -240,115 +291,122 @@ const GastosDiarios = () => {
           </TouchableOpacity>
         </View>
 
-        <ScrollView
+        <FlatList
+          data={gastos}
+          keyExtractor={(gasto) => String(gasto.id)}
           showsVerticalScrollIndicator={false}
           contentContainerStyle={styles.scrollContent}
-        >
-          <View style={[styles.totalCard, theme.card]}>
-            <View style={styles.totalRow}>
-              <View>
-                <Text style={[styles.totalLabel, theme.subText]}>
-                  Total gasto em Registros Diários
-                </Text>
-                <Text style={[styles.totalValue, theme.text]}>
-                  R$ {totalMes.toFixed(2).replace(".", ",")}
-                </Text>
-              </View>
-              <TouchableOpacity
-                style={styles.addButton}
-                onPress={() => router.push("/auth/graficos")}
-              >
-                <Feather name="table" size={18} color="#FFF" />
-                <Text style={styles.addButtonText}>
-                  Ver Gráficos
-                </Text>
-              </TouchableOpacity>
-            </View>
-          </View>
-
-          {gastos.length === 0 ? (
-            <View style={styles.emptyState}>
-              <Text style={[styles.emptyStateText, theme.subText]}>
-                Nenhum gasto registrado neste mês
-              </Text>
-            </View>
-          ) : (
-            gastos.map((gasto) => (
-              <TouchableOpacity
-                key={gasto.id}
-                style={[styles.gastoCard, theme.card]}
-                activeOpacity={0.85}
-                onPress={() => {
-                  setGastoSelecionado(gasto);
-                  setModalVisible(true);
-                }}
-              >
-                <View style={{ flex: 1 }}>
-                  <Text
-                    style={[
-                      styles.gastoDescricao,
-                      theme.text,
-                    ]}
-                  >
-                    {gasto.descricao}
-                  </Text>
-                  <Text
-                    style={[
-                      styles.gastoCategoria,
-                      theme.subText,
-                    ]}
-                  >
-                    {gasto.categoria}
+          onEndReached={carregarMais}
+          onEndReachedThreshold={0.5}
+          ListHeaderComponent={
+            <View style={[styles.totalCard, theme.card]}>
+              <View style={styles.totalRow}>
+                <View>
+                  <Text style={[styles.totalLabel, theme.subText]}>
+                    Total gasto em Registros Diários
                   </Text>
-                  {/* Opcional: mostra a data do gasto */}
-                  <Text
-                    style={[
-                      styles.gastoData,
-                      theme.subText,
-                    ]}
-                  >
-                    {new Date(gasto.data_registro).toLocaleDateString('pt-BR')}
+                  <Text style={[styles.totalValue, theme.text]}>
+                    R$ {totalGeral.toFixed(2).replace(".", ",")}
                   </Text>
                 </View>
-
+                <TouchableOpacity
+                  style={styles.addButton}
+                  onPress={() => router.push("/auth/graficos")}
+                >
+                  <Feather name="table" size={18} color="#FFF" />
+                  <Text style={styles.addButtonText}>
+                    Ver Gráficos
+                  </Text>
+                </TouchableOpacity>
+              </View>
+            </View>
+          }
+          ListEmptyComponent={
+            carregando ? null : (
+              <View style={styles.emptyState}>
+                <Text style={[styles.emptyStateText, theme.subText]}>
+                  Nenhum gasto registrado neste mês
+                </Text>
+              </View>
+            )
+          }
+          ListFooterComponent={
+            carregando ? <ActivityIndicator style={styles.loadingMore} color="#2D5F3F" /> : null
+          }
+          renderItem={({ item: gasto }) => (
+            <TouchableOpacity
+              style={[styles.gastoCard, theme.card]}
+              activeOpacity={0.85}
+              onPress={() => {
+                setGastoSelecionado(gasto);
+                setModalVisible(true);
+              }}
+            >
+              <View style={{ flex: 1 }}>
                 <Text
                   style={[
-                    styles.gastoValor,
+                    styles.gastoDescricao,
                     theme.text,
                   ]}
                 >
-                  R$ {gasto.valor.toFixed(2).replace(".", ",")}
+                  {gasto.descricao}
+                </Text>
+                <Text
+                  style={[
+                    styles.gastoCategoria,
+                    theme.subText,
+                  ]}
+                >
+                  {gasto.categoria}
+                </Text>
+                {/* Opcional: mostra a data do gasto */}
+                <Text
+                  style={[
+                    styles.gastoData,
+                    theme.subText,
+                  ]}
+                >
+                  {new Date(gasto.data_registro).toLocaleDateString('pt-BR')}
                 </Text>
+              </View>
 
-                {/* AÃ‡Ã•ES */}
-                <View style={styles.actions}>
-                  <TouchableOpacity
-                    onPress={() => {
-                      setGastoSelecionado(gasto);
-                      setModalVisible(true);
-                    }}
-                  >
-                    <Feather
-                      name="edit"
-                      size={18}
-                      color="#2D5F3F"
-                    />
-                  </TouchableOpacity>
-
-                  <TouchableOpacity
-                    onPress={() => excluirGastoDiario(gasto.id)}
-                  >
-                    <Feather
-                      name="trash-2"
-                      size={18}
-                      color="#D11A2A"
-                    />
-                  </TouchableOpacity>
-                </View>
-              </TouchableOpacity>
-            ))
+              <Text
+                style={[
+                  styles.gastoValor,
+                  theme.text,
+                ]}
+              >
+                R$ {gasto.valor.toFixed(2).replace(".", ",")}
+              </Text>
+
+              {/* AÃ‡Ã•ES */}
+              <View style={styles.actions}>
+                <TouchableOpacity
+                  onPress={() => {
+                    setGastoSelecionado(gasto);
+                    setModalVisible(true);
+                  }}
+                >
+                  <Feather
+                    name="edit"
+                    size={18}
+                    color="#2D5F3F"
+                  />
+                </TouchableOpacity>
+
+                <TouchableOpacity
+                  onPress={() => excluirGastoDiario(gasto.id)}
+                >
+                  <Feather
+                    name="trash-2"
+                    size={18}
+                    color="#D11A2A"
+                  />
+                </TouchableOpacity>
+              </View>
+            </TouchableOpacity>
           )}
-        </ScrollView>
+        />
       </View>
 
       <ModalGastoDiario
@@ -390,6 +448,7 @@ const GastosDiarios = () => {
               });
             }
 
+            buscarTotal();
             setModalVisible(false);
           } catch (error: unknown) {
             Alert.alert("Erro", getErrorMessage(error, "Erro ao salvar gasto."));
@@ -514,6 +573,10 @@ const styles = StyleSheet.create({
     marginTop: 40,
   },
 
+  loadingMore: {
+    marginVertical: 16,
+  },
+
   emptyStateText: {
     fontSize: 14,
   },